@@ -35,6 +35,11 @@ from ._version import __version__
 
 import sys
 
+from rospkg.os_detect import OS_ALMALINUX, OS_ALPINE, OS_ARCH, OS_CENTOS, OS_CYGWIN, OS_DEBIAN, \
+    OS_ELEMENTARY, OS_FEDORA, OS_FREEBSD, OS_GENTOO, OS_LINARO, OS_MANJARO, OS_MX, OS_NIXOS, \
+    OS_OPENEMBEDDED, OS_OPENSUSE, OS_ORACLE, OS_OSX, OS_POP, OS_RASPBIAN, OS_RHEL, OS_ROCKY, \
+    OS_UBUNTU, OS_ZORIN
+
 from .installers import InstallerContext, Installer, \
     PackageManagerInstaller
 from .core import RosdepInternalError, InstallFailed, UnsupportedOs, \
@@ -52,41 +57,36 @@ except ImportError:
           file=sys.stderr)
 
 
-def create_default_installer_context(verbose=False):
-    from .platforms import alpine
-    from .platforms import arch
-    from .platforms import cygwin
-    from .platforms import debian
-    from .platforms import gentoo
-    from .platforms import nix
-    from .platforms import openembedded
-    from .platforms import opensuse
-    from .platforms import osx
-    from .platforms import pip
-    from .platforms import npm
-    from .platforms import gem
-    from .platforms import redhat
-    from .platforms import freebsd
-    from .platforms import slackware
-    from .platforms import source
-
-    platform_mods = [alpine, arch, cygwin, debian, gentoo, nix, openembedded, opensuse, osx, redhat, slackware, freebsd]
-    installer_mods = [source, pip, gem, npm] + platform_mods
+# platform modules with the installer keys, OS keys and aliases of
+# detected OSes that they register.  The modules are only imported
+# once one of their keys is used.
+_PLATFORM_MODULES = [
+    ('source', ['source'], [], []),
+    ('pip', ['pip'], [], []),
+    ('gem', ['gem'], [], []),
+    ('npm', ['npm'], [], []),
+    ('alpine', ['apk'], [OS_ALPINE], []),
+    ('arch', ['pacman'], [OS_ARCH], [OS_MANJARO]),
+    ('cygwin', ['apt-cyg'], [OS_CYGWIN], []),
+    ('debian', ['apt'], [OS_DEBIAN, OS_UBUNTU], [OS_ELEMENTARY, OS_LINARO, OS_MX, OS_POP, OS_RASPBIAN, OS_ZORIN]),
+    ('gentoo', ['portage'], [OS_GENTOO], []),
+    ('nix', ['nix'], [OS_NIXOS], []),
+    ('openembedded', ['opkg'], [OS_OPENEMBEDDED], []),
+    ('opensuse', ['zypper'], [OS_OPENSUSE], []),
+    ('osx', ['macports', 'homebrew'], [OS_OSX], []),
+    ('redhat', ['dnf', 'yum'], [OS_FEDORA, OS_RHEL], [OS_ALMALINUX, OS_CENTOS, OS_ORACLE, OS_ROCKY]),
+    ('slackware', ['sbotools', 'slackpkg'], ['slackware'], []),
+    ('freebsd', ['pkg'], [OS_FREEBSD], []),
+]
 
+
+def create_default_installer_context(verbose=False):
     context = InstallerContext()
     context.set_verbose(verbose)
 
-    # setup installers
-    for m in installer_mods:
-        if verbose:
-            print('registering installers for %s' % (m.__name__))
-        m.register_installers(context)
-
-    # setup platforms
-    for m in platform_mods:
-        if verbose:
-            print('registering platforms for %s' % (m.__name__))
-        m.register_platforms(context)
+    # setup installers and platforms, registered on first use
+    for name, installer_keys, os_keys, os_aliases in _PLATFORM_MODULES:
+        context.add_lazy_module('%s.platforms.%s' % (__name__, name), installer_keys, os_keys, os_aliases)
 
     return context
 
@@ -37,6 +37,10 @@ except ImportError:
     import pickle
 
 PICKLE_CACHE_EXT = '.pickle'
+# extension of the file storing the HTTP cache validators of a cache file
+VALIDATORS_CACHE_EXT = '.validators'
+# extension of the key index of a cache file, see rosdep2.key_index
+KEY_INDEX_CACHE_EXT = '.keys'
 
 
 def compute_filename_hash(key_filenames):
@@ -49,30 +53,65 @@ def compute_filename_hash(key_filenames):
     return sha_hash.hexdigest()
 
 
-def write_cache_file(source_cache_d, key_filenames, rosdep_data):
+def get_cache_filepath(source_cache_d, key_filenames):
+    """
+    :param source_cache_d: cache directory
+    :param key_filenames: filename (or list of filenames) to be used in hashing
+    :returns: path of the cache file for *key_filenames*, without extension
+    """
+    return os.path.join(source_cache_d, compute_filename_hash(key_filenames))
+
+
+def write_cache_file(source_cache_d, key_filenames, rosdep_data, validators=None):
     """
     :param source_cache_d: directory to write cache file to
     :param key_filenames: filename (or list of filenames) to be used in hashing
     :param rosdep_data: dictionary of data to serialize as YAML
+    :param validators: (optional) HTTP cache validators of the
+      downloaded data, see :func:`rosdep2.url_utils.get_cache_validators`
     :returns: name of file where cache is stored
     :raises: :exc:`OSError` if cannot write to cache file/directory
     :raises: :exc:`IOError` if cannot write to cache file/directory
     """
     if not os.path.exists(source_cache_d):
         os.makedirs(source_cache_d)
-    key_hash = compute_filename_hash(key_filenames)
-    filepath = os.path.join(source_cache_d, key_hash)
+    filepath = get_cache_filepath(source_cache_d, key_filenames)
     try:
-        write_atomic(filepath + PICKLE_CACHE_EXT, pickle.dumps(rosdep_data, 2), True)
+        write_atomic_if_changed(filepath + PICKLE_CACHE_EXT, pickle.dumps(rosdep_data, 2), True)
+        if validators:
+            write_atomic_if_changed(filepath + VALIDATORS_CACHE_EXT, pickle.dumps(validators, 2), True)
     except OSError as e:
         raise CachePermissionError('Failed to write cache file: ' + str(e))
     try:
         os.unlink(filepath)
     except OSError:
         pass
+    if not validators:
+        # validators of older data must not be used to revalidate this data
+        try:
+            os.unlink(filepath + VALIDATORS_CACHE_EXT)
+        except OSError:
+            pass
     return filepath
 
 
+def read_cache_validators(source_cache_d, key_filenames):
+    """
+    :param source_cache_d: cache directory
+    :param key_filenames: filename (or list of filenames) to be used in hashing
+    :returns: HTTP cache validators stored alongside the cache file, or
+      ``None`` if there are none or the cache file itself is missing
+    """
+    filepath = get_cache_filepath(source_cache_d, key_filenames)
+    if not os.path.exists(filepath + PICKLE_CACHE_EXT):
+        return None
+    try:
+        with open(filepath + VALIDATORS_CACHE_EXT, 'rb') as f:
+            return pickle.loads(f.read())
+    except (IOError, OSError, pickle.UnpicklingError, EOFError):
+        return None
+
+
 def write_atomic(filepath, data, binary=False):
     # write data to new file
     fd, filepath_tmp = tempfile.mkstemp(prefix=os.path.basename(filepath) + '.tmp.', dir=os.path.dirname(filepath))
@@ -99,3 +138,22 @@ def write_atomic(filepath, data, binary=False):
             os.rename(filepath_tmp, filepath)
         except OSError:
             os.unlink(filepath_tmp)
+
+
+def write_atomic_if_changed(filepath, data, binary=False):
+    """
+    Write *data* to *filepath* with :func:`write_atomic` unless the
+    file already has exactly that content.  Unchanged files keep their
+    modification time, so consumers that check it see a stable cache.
+
+    :returns: ``True`` if the file has been written
+    """
+    try:
+        with open(filepath, 'rb' if binary else 'r') as f:
+            # files of a different size cannot have the same content
+            if (not binary or os.fstat(f.fileno()).st_size == len(data)) and f.read() == data:
+                return False
+    except (IOError, OSError, UnicodeDecodeError):
+        pass
+    write_atomic(filepath, data, binary)
+    return True
@@ -1,13 +1,6 @@
 import os
 import sys
 
-try:
-    from catkin_pkg.packages import find_packages
-except ImportError:
-    print('catkin_pkg was not detected, please install it.',
-          file=sys.stderr)
-    sys.exit(1)
-
 _catkin_workspace_packages = []
 _catkin_packages_cache = {}
 
@@ -29,6 +22,12 @@ def find_catkin_packages_in(path, verbose=False):
         if verbose:
             print('found in cache.', file=sys.stderr)
         return _catkin_packages_cache[path]
+    try:
+        from catkin_pkg.packages import find_packages
+    except ImportError:
+        print('catkin_pkg was not detected, please install it.',
+              file=sys.stderr)
+        sys.exit(1)
     packages = find_packages(path)
     if type(packages) is dict and packages != {}:
         package_names = [package.name for package in packages.values()]
@@ -59,11 +59,11 @@ def get_ubuntu_targets(rosdistro):
     :raises: :exc:`ValidationFailed`
     """
     targets_data = get_targets()
-    legacy_targets = download_targets_data()
-    if 'fuerte' in legacy_targets:
-        targets_data['fuerte'] = {'ubuntu': legacy_targets['fuerte']}
-    if 'electric' in legacy_targets:
-        targets_data['electric'] = {'ubuntu': legacy_targets['electric']}
+    # only the requested distribution is loaded from the index
+    if rosdistro in ('fuerte', 'electric'):
+        legacy_targets = download_targets_data()
+        if rosdistro in legacy_targets:
+            targets_data[rosdistro] = {'ubuntu': legacy_targets[rosdistro]}
     return targets_data[rosdistro]['ubuntu']
 
 
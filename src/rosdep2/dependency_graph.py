@@ -67,17 +67,52 @@ class DependencyGraph(defaultdict):
 
     def detect_cycles(self, rosdep_key, traveled_keys):
         """
-        Recursive function to detect cycles in the dependency graph.
+        Detect cycles in the part of the dependency graph reachable from a rosdep key.
 
         :param rosdep_key: This is the rosdep key to use as the root in the cycle exploration.
-        :param traveled_keys: A list of rosdep_keys that have been traversed thus far.
+        :param traveled_keys: A list of rosdep_keys that lead to *rosdep_key*.
 
         :raises: :exc:`AssertionError` if the rosdep_key is in the traveled keys, indicating a cycle has occurred.
         """
-        assert rosdep_key not in traveled_keys, 'A cycle in the dependency graph occurred with key `%s`.' % rosdep_key
-        traveled_keys.append(rosdep_key)
-        for dependency in self[rosdep_key]['dependencies']:
-            self.detect_cycles(dependency, traveled_keys)
+        for _ in self._iter_post_order([rosdep_key], set(), set(traveled_keys)):
+            pass
+
+    def _iter_post_order(self, rosdep_keys, finished, path=None):
+        """
+        Iterative depth-first traversal of the dependency graph, which
+        yields each rosdep key after all of its dependencies.
+
+        :param rosdep_keys: rosdep keys to start the traversal from, in order.
+        :param finished: set of rosdep keys which have already been yielded.  They are not
+          traversed again, and the yielded keys are added to it.
+        :param path: set of rosdep keys that lead to the traversed keys.
+
+        :raises: :exc:`AssertionError` if a cycle is detected.
+        """
+        if path is None:
+            path = set()
+        for rosdep_key in rosdep_keys:
+            if rosdep_key in finished:
+                continue
+            if rosdep_key in path:
+                raise AssertionError('A cycle in the dependency graph occurred with key `%s`.' % rosdep_key)
+            path.add(rosdep_key)
+            stack = [(rosdep_key, iter(self[rosdep_key]['dependencies']))]
+            while stack:
+                key, dependencies = stack[-1]
+                for dependency in dependencies:
+                    if dependency in finished:
+                        continue
+                    if dependency in path:
+                        raise AssertionError('A cycle in the dependency graph occurred with key `%s`.' % dependency)
+                    path.add(dependency)
+                    stack.append((dependency, iter(self[dependency]['dependencies'])))
+                    break
+                else:
+                    stack.pop()
+                    path.discard(key)
+                    finished.add(key)
+                    yield key
 
     def validate(self):
         """
@@ -95,14 +130,100 @@ class DependencyGraph(defaultdict):
                         'Invalid Graph Structure: rosdep key `%s` does not exist in the dictionary of resolutions.'
                         % dependency)
                 self[dependency]['is_root'] = False
-        # Check each entry for cyclical dependencies
-        for rosdep_key in self:
-            self.detect_cycles(rosdep_key, [])
+        # Check each entry for cyclical dependencies, visiting every key once
+        for _ in self._iter_post_order(list(self), set()):
+            pass
 
-    def get_ordered_dependency_list(self):
+    def _get_installer_levels(self, ordered_keys):
+        """
+        Group rosdep keys into levels, so that each key only depends on keys of another
+        installer in lower levels.  Dependencies handled by the same installer do not raise
+        the level, since one installer invocation installs them in order.
+
+        :param ordered_keys: rosdep keys, each after its dependencies.
+        :returns: rosdep keys of each level, each after its dependencies, ``[[str]]``
+        """
+        levels = {}
+        ordered_levels = []
+        for rosdep_key in ordered_keys:
+            installer_key = self[rosdep_key]['installer_key']
+            level = 0
+            for dependency in self[rosdep_key]['dependencies']:
+                if self[dependency]['installer_key'] == installer_key:
+                    level = max(level, levels[dependency])
+                else:
+                    level = max(level, levels[dependency] + 1)
+            levels[rosdep_key] = level
+            if level == len(ordered_levels):
+                ordered_levels.append([])
+            ordered_levels[level].append(rosdep_key)
+        return ordered_levels
+
+    def _group_by_installer(self, ordered_keys):
+        """
+        Group rosdep keys level by level by installer.  The installer of the last group of a
+        level comes first in the next level, so that both groups can be squashed into one.
+
+        :param ordered_keys: rosdep keys, each after its dependencies.
+        :returns: groups of each level, ``[[(installer_key, [rosdep_keys])]]``.  The groups of a
+          level do not depend on each other, and the rosdep keys of each group follow their
+          dependencies.
+        """
+        result = []
+        previous_installer_key = None
+        for level in self._get_installer_levels(ordered_keys):
+            groups = {}
+            for rosdep_key in level:
+                groups.setdefault(self[rosdep_key]['installer_key'], []).append(rosdep_key)
+            installer_keys = list(groups)
+            if previous_installer_key in groups:
+                installer_keys.remove(previous_installer_key)
+                installer_keys.insert(0, previous_installer_key)
+            result.append([(installer_key, groups[installer_key]) for installer_key in installer_keys])
+            previous_installer_key = installer_keys[-1]
+        return result
+
+    def _get_unique_resolutions(self, rosdep_keys, seen, seen_unhashable):
+        """
+        :param seen: set of resolutions already returned, which is updated.
+        :param seen_unhashable: list of resolutions with unhashable install keys already
+          returned, which is updated.
+        :returns: *(installer_key, [install_keys])* of the rosdep keys, without empty entries and
+          entries that have been returned before.
+        """
+        result = []
+        for rosdep_key in rosdep_keys:
+            item = (self[rosdep_key]['installer_key'], self[rosdep_key]['install_keys'])
+            if item[1] == []:
+                continue
+            try:
+                marker = (item[0], tuple(item[1]))
+                if marker in seen:
+                    continue
+                seen.add(marker)
+            except TypeError:
+                if item in seen_unhashable:
+                    continue
+                seen_unhashable.append(item)
+            result.append(item)
+        return result
+
+    def _get_ordered_keys(self):
+        # Validate the graph
+        self.validate()
+        # Generate the dependency list, each key after its dependencies, in the order of the roots
+        roots = [rosdep_key for rosdep_key in self if self[rosdep_key]['is_root']]
+        return list(self._iter_post_order(roots, set()))
+
+    def get_ordered_dependency_list(self, group_by_installer=False):
         """
         Generates an ordered list of dependencies using the dependency graph.
 
+        :param group_by_installer: If ``True``, minimize the number of installer invocations:
+          the keys are ordered in levels, so that keys only depend on keys of another installer
+          in lower levels, and the keys of each level are grouped by installer.  Otherwise
+          each key directly follows its dependencies, in the order of the roots.
+
         :returns: *[(installer_key, [install_keys])]*, ``[(str, [str])]``.  *installer_key* is the key
          that denotes which installed the accompanying *install_keys* are for.  *installer_key* are something
          like ``apt`` or ``homebrew``.  *install_keys* are something like ``boost`` or ``ros-fuerte-ros_comm``.
@@ -110,18 +231,14 @@ class DependencyGraph(defaultdict):
         :raises: :exc:`AssertionError` if a cycle is detected.
         :raises: :exc:`KeyError` if an invalid rosdep_key is found in the dependency graph.
         """
-        # Validate the graph
-        self.validate()
-        # Generate the dependency list
-        dep_list = []
-        for rosdep_key in self:
-            if self[rosdep_key]['is_root']:
-                dep_list.extend(self.__get_ordered_uninstalled(rosdep_key))
+        ordered_keys = self._get_ordered_keys()
+        if group_by_installer:
+            ordered_keys = [
+                rosdep_key
+                for level in self._group_by_installer(ordered_keys)
+                for _, rosdep_keys in level for rosdep_key in rosdep_keys]
         # Make the list unique and remove empty entries
-        result = []
-        for item in dep_list:
-            if item not in result and item[1] != []:
-                result.append(item)
+        result = self._get_unique_resolutions(ordered_keys, set(), [])
         # Squash the results by installer_key
         squashed_result = []
         previous_installer_key = None
@@ -132,9 +249,28 @@ class DependencyGraph(defaultdict):
             squashed_result[-1][1].extend(resolved)
         return squashed_result
 
-    def __get_ordered_uninstalled(self, key):
-        uninstalled = []
-        for dependency in self[key]['dependencies']:
-            uninstalled.extend(self.__get_ordered_uninstalled(dependency))
-        uninstalled.append((self[key]['installer_key'], self[key]['install_keys']))
-        return uninstalled
+    def get_ordered_dependency_levels(self):
+        """
+        Generates the dependencies level by level, with one entry per installer in each level.
+        The entries of a level do not depend on each other, so they can be installed
+        concurrently once the entries of the previous levels have been installed.
+
+        :returns: *[[(installer_key, [install_keys])]]*, ``[[(str, [str])]]``.  Flattening the
+          levels gives the result of :meth:`get_ordered_dependency_list` with *group_by_installer*,
+          before adjacent entries of the same installer are squashed.
+
+        :raises: :exc:`AssertionError` if a cycle is detected.
+        :raises: :exc:`KeyError` if an invalid rosdep_key is found in the dependency graph.
+        """
+        seen = set()
+        seen_unhashable = []
+        result = []
+        for level in self._group_by_installer(self._get_ordered_keys()):
+            level_result = []
+            for installer_key, rosdep_keys in level:
+                resolved = [r for _, install_keys in self._get_unique_resolutions(rosdep_keys, seen, seen_unhashable) for r in install_keys]
+                if resolved:
+                    level_result.append((installer_key, resolved))
+            if level_result:
+                result.append(level_result)
+        return result
@@ -1,24 +1,26 @@
-import yaml
 try:
     import urlparse
 except ImportError:
     import urllib.parse as urlparse  # py3k
 import os
 
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
 from rospkg.os_detect import OS_DEBIAN
 from rospkg.os_detect import OS_FEDORA
 from rospkg.os_detect import OS_OSX
 from rospkg.os_detect import OS_UBUNTU
 
 from .core import InvalidData, DownloadFailure
-from .platforms.debian import APT_INSTALLER
-from .platforms.osx import BREW_INSTALLER
-from .platforms.redhat import YUM_INSTALLER
 from .rosdistrohelper import get_targets, get_release_file, PreRep137Warning
 
 from .rep3 import download_targets_data  # deprecated, will output warning
 
 from .url_utils import urlopen_gzip
+from . import yaml_utils
 
 import warnings
 
@@ -70,6 +72,9 @@ def gbprepo_to_rosdep_data(gbpdistro_data, targets_data, url=''):
     """
 
     warnings.warn('deprecated: see REP137 and rosdistro', PreRep137Warning)
+    # platform modules are only imported when their installers are used
+    from .platforms.debian import APT_INSTALLER
+    from .platforms.osx import BREW_INSTALLER
     # Error reporting for this isn't nearly as good as it could be
     # (e.g. doesn't separate gbpdistro vs. targets, nor provide
     # origin), but rushing this implementation a bit.
@@ -140,45 +145,89 @@ def gbprepo_to_rosdep_data(gbpdistro_data, targets_data, url=''):
 
 # REP137 compliant
 
+class RosDistroRosdepData(Mapping):
+    """
+    Read-only mapping of the packages of a distribution to their rosdep
+    definitions.  All packages of a distribution share the same rules,
+    which only differ in the package names, so the rules are stored
+    once per distribution and the definition of a package is generated
+    when it is accessed.
+    """
+
+    def __init__(self, release_name, packages, platforms, homebrew_tap):
+        """
+        :param release_name: name of the distribution
+        :param packages: repository name of each package, ``{str: str}``
+        :param platforms: default installer key and OS code names of
+          each OS, ``{str: (str, [str])}``
+        :param homebrew_tap: name of the Homebrew tap of the packages
+        """
+        self.release_name = release_name
+        self.packages = packages
+        self.platforms = platforms
+        self.homebrew_tap = homebrew_tap
+
+    def __getitem__(self, pkg):
+        from .platforms.osx import BREW_INSTALLER
+        rosdep_key = self.packages[pkg]
+        # Do generation for empty OS X entries
+        homebrew_name = '%s/%s/%s' % (self.homebrew_tap, self.release_name, rosdep_key)
+        data = {
+            OS_OSX: {BREW_INSTALLER: {'packages': [homebrew_name]}},
+        }
+
+        # - package name: underscores must be dashes
+        package_name = 'ros-%s-%s' % (self.release_name, pkg)
+        package_name = package_name.replace('_', '-')
+
+        for os_name, (installer_key, os_code_names) in self.platforms.items():
+            os_data = data.setdefault(os_name, {})
+            for os_code_name in os_code_names:
+                os_data[os_code_name] = {installer_key: {'packages': [package_name]}}
+
+        data['_is_ros'] = True
+        return data
+
+    def __contains__(self, pkg):
+        return pkg in self.packages
+
+    def __iter__(self):
+        return iter(self.packages)
+
+    def __len__(self):
+        return len(self.packages)
+
+    def __repr__(self):
+        return 'RosDistroRosdepData(%r, %d packages)' % (self.release_name, len(self.packages))
+
+    def copy(self):
+        # the data is immutable, so it can be shared
+        return self
+
+
 def get_gbprepo_as_rosdep_data(gbpdistro):
     """
+    :returns: rosdep data of the packages of the distribution,
+      :class:`RosDistroRosdepData`
     :raises: :exc:`InvalidData`
     """
     distro_file = get_release_file(gbpdistro)
-    ctx = create_default_installer_context()
     release_name = gbpdistro
 
-    rosdep_data = {}
-    default_installers = {}
-    gbp_repos = distro_file.repositories
-    for rosdep_key, repo in gbp_repos.items():
+    packages = {}
+    for rosdep_key, repo in distro_file.repositories.items():
         for pkg in repo.package_names:
-            rosdep_data[pkg] = {}
-
-            # following rosdep pull #17, use env var instead of github organization name
-            tap = os.environ.get('ROSDEP_HOMEBREW_TAP', 'ros')
-            # Do generation for empty OS X entries
-            homebrew_name = '%s/%s/%s' % (tap, release_name, rosdep_key)
-            rosdep_data[pkg][OS_OSX] = {
-                BREW_INSTALLER: {'packages': [homebrew_name]}
-            }
-
-            # - package name: underscores must be dashes
-            package_name = 'ros-%s-%s' % (release_name, pkg)
-            package_name = package_name.replace('_', '-')
-
-            for os_name in distro_file.platforms:
-                if os_name not in rosdep_data[pkg]:
-                    rosdep_data[pkg][os_name] = {}
-                if os_name not in default_installers:
-                    default_installers[os_name] = ctx.get_default_os_installer_key(os_name)
-                for os_code_name in distro_file.platforms[os_name]:
-                    rosdep_data[pkg][os_name][os_code_name] = {
-                        default_installers[os_name]: {'packages': [package_name]}
-                    }
+            packages[pkg] = rosdep_key
+
+    platforms = {}
+    if packages:
+        ctx = create_default_installer_context()
+        for os_name, os_code_names in distro_file.platforms.items():
+            platforms[os_name] = (ctx.get_default_os_installer_key(os_name), list(os_code_names))
 
-            rosdep_data[pkg]['_is_ros'] = True
-    return rosdep_data
+    # following rosdep pull #17, use env var instead of github organization name
+    tap = os.environ.get('ROSDEP_HOMEBREW_TAP', 'ros')
+    return RosDistroRosdepData(release_name, packages, platforms, tap)
 
 
 def download_gbpdistro_as_rosdep_data(gbpdistro_url, targets_url=None):
@@ -202,7 +251,7 @@ def download_gbpdistro_as_rosdep_data(gbpdistro_url, targets_url=None):
         f = urlopen_gzip(gbpdistro_url, timeout=DOWNLOAD_TIMEOUT)
         text = f.read()
         f.close()
-        gbpdistro_data = yaml.safe_load(text)
+        gbpdistro_data = yaml_utils.safe_load(text)
         # will output a warning
         return gbprepo_to_rosdep_data(gbpdistro_data,
                                       targets_data,
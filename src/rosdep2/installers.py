@@ -27,9 +27,12 @@
 
 # Author Tully Foote/tfoote@willowgarage.com, Ken Conley/kwc@willowgarage.com
 
+import importlib
 import os
 import subprocess
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 from rospkg.os_detect import OsDetect
 
@@ -60,12 +63,12 @@ class InstallerContext(object):
           used.
         """
         # platform configuration
-        self.installers = {}
-        self.os_installers = {}
-        self.default_os_installer = {}
+        self._installers = {}
+        self._os_installers = {}
+        self._default_os_installer = {}
 
         # stores configuration of which value to use for the OS version key (version number or codename)
-        self.os_version_type = {}
+        self._os_version_type = {}
 
         # OS detection and override
         if os_detect is None:
@@ -73,8 +76,41 @@ class InstallerContext(object):
         self.os_detect = os_detect
         self.os_override = None
 
+        # modules that register installers and platforms on first use
+        # {key: module name} of installer keys, OS keys and OS aliases
+        self.lazy_installers = {}
+        self.lazy_os_keys = {}
+        self.lazy_os_aliases = {}
+
         self.verbose = False
 
+    # the registration tables, including modules that are not loaded yet
+    @property
+    def installers(self):
+        """
+        :returns: ``{str: Installer}`` of all registered installers
+        """
+        self._load_all()
+        return self._installers
+
+    @property
+    def os_installers(self):
+        """
+        :returns: ``{str: [str]}`` of the installer keys of all registered OSes
+        """
+        self._load_all()
+        return self._os_installers
+
+    @property
+    def default_os_installer(self):
+        self._load_all()
+        return self._default_os_installer
+
+    @property
+    def os_version_type(self):
+        self._load_all()
+        return self._os_version_type
+
     def set_verbose(self, verbose):
         self.verbose = verbose
 
@@ -90,13 +126,63 @@ class InstallerContext(object):
             print('overriding OS to [%s:%s]' % (os_name, os_version))
         self.os_override = os_name, os_version
 
+    def add_lazy_module(self, module_name, installer_keys=(), os_keys=(), os_aliases=()):
+        """
+        Register the installers and platforms of the module
+        *module_name* when one of their keys is first used, rather than
+        importing the module up front.  The module is imported and its
+        ``register_installers(context)`` and, if it has one,
+        ``register_platforms(context)`` functions are called.
+
+        :param module_name: absolute name of the module, ``str``
+        :param installer_keys: installer keys the module registers, ``[str]``
+        :param os_keys: OS keys the module registers, ``[str]``
+        :param os_aliases: names of detected OSes that the module
+          aliases to one of its OS keys, ``[str]``
+        """
+        for key in installer_keys:
+            self.lazy_installers[key] = module_name
+        for key in os_keys:
+            self.lazy_os_keys[key] = module_name
+        for key in os_aliases:
+            self.lazy_os_aliases[key] = module_name
+
+    def _load_module(self, module_name):
+        # forget all keys of the module first, as its registration uses them
+        for lazy in (self.lazy_installers, self.lazy_os_keys, self.lazy_os_aliases):
+            for key in [k for k, v in lazy.items() if v == module_name]:
+                del lazy[key]
+        module = importlib.import_module(module_name)
+        if self.verbose:
+            print('registering installers for %s' % (module_name))
+        module.register_installers(self)
+        if hasattr(module, 'register_platforms'):
+            if self.verbose:
+                print('registering platforms for %s' % (module_name))
+            module.register_platforms(self)
+
+    def _load_installer_key(self, installer_key):
+        if installer_key in self.lazy_installers:
+            self._load_module(self.lazy_installers[installer_key])
+
+    def _load_os_key(self, os_key):
+        if os_key in self.lazy_os_keys:
+            self._load_module(self.lazy_os_keys[os_key])
+
+    def _load_all(self):
+        for lazy in (self.lazy_installers, self.lazy_os_keys, self.lazy_os_aliases):
+            while lazy:
+                self._load_module(next(iter(lazy.values())))
+
     def get_os_version_type(self, os_name):
-        return self.os_version_type.get(os_name, OsDetect.get_version)
+        self._load_os_key(os_name)
+        return self._os_version_type.get(os_name, OsDetect.get_version)
 
     def set_os_version_type(self, os_name, version_type):
         if not hasattr(version_type, '__call__'):
             raise ValueError('version type should be a method')
-        self.os_version_type[os_name] = version_type
+        self._load_os_key(os_name)
+        self._os_version_type[os_name] = version_type
 
     def get_os_name_and_version(self):
         """
@@ -111,6 +197,11 @@ class InstallerContext(object):
             return self.os_override
         else:
             os_name = self.os_detect.get_name()
+            if os_name in self.lazy_os_aliases:
+                # registering the alias may override the OS
+                self._load_module(self.lazy_os_aliases[os_name])
+                if self.os_override:
+                    return self.os_override
             os_key = self.get_os_version_type(os_name)
             os_version = os_key(self.os_detect)
             return os_name, os_version
@@ -136,14 +227,15 @@ class InstallerContext(object):
         :raises: :exc:`TypeError` if *installer* is not a subclass of
           :class:`Installer`
         """
+        self._load_installer_key(installer_key)
         if installer is None:
-            del self.installers[installer_key]
+            del self._installers[installer_key]
             return
         if not isinstance(installer, Installer):
             raise TypeError('installer must be a instance of Installer')
         if self.verbose:
             print('registering installer [%s]' % (installer_key))
-        self.installers[installer_key] = installer
+        self._installers[installer_key] = installer
 
     def get_installer(self, installer_key):
         """
@@ -151,7 +243,8 @@ class InstallerContext(object):
         :raises: :exc:`KeyError` If not associated installer
         :raises: :exc:`InstallFailed` If installer cannot produce an install command (e.g. if installer is not installed)
         """
-        return self.installers[installer_key]
+        self._load_installer_key(installer_key)
+        return self._installers[installer_key]
 
     def get_installer_keys(self):
         """
@@ -178,12 +271,13 @@ class InstallerContext(object):
         """
         # validate, will throw KeyError
         self.get_installer(installer_key)
+        self._load_os_key(os_key)
         if self.verbose:
             print('add installer [%s] to OS [%s]' % (installer_key, os_key))
-        if os_key in self.os_installers:
-            self.os_installers[os_key].append(installer_key)
+        if os_key in self._os_installers:
+            self._os_installers[os_key].append(installer_key)
         else:
-            self.os_installers[os_key] = [installer_key]
+            self._os_installers[os_key] = [installer_key]
 
     def get_os_installer_keys(self, os_key):
         """
@@ -194,8 +288,9 @@ class InstallerContext(object):
         :param os_key: Key for OS
         :raises: :exc:`KeyError`: if no information for OS *os_key* is registered.
         """
-        if os_key in self.os_installers:
-            return self.os_installers[os_key][:]
+        self._load_os_key(os_key)
+        if os_key in self._os_installers:
+            return self._os_installers[os_key][:]
         else:
             raise KeyError(os_key)
 
@@ -210,15 +305,16 @@ class InstallerContext(object):
         :raises: :exc:`KeyError`: if installer for *installer_key*
           is not set or if OS for *os_key* has no associated installers.
         """
-        if os_key not in self.os_installers:
+        self._load_os_key(os_key)
+        if os_key not in self._os_installers:
             raise KeyError('unknown OS: %s' % (os_key))
         if not hasattr(installer_key, '__call__'):
             raise ValueError('version type should be a method')
-        if not installer_key(self.os_detect) in self.os_installers[os_key]:
+        if not installer_key(self.os_detect) in self._os_installers[os_key]:
             raise KeyError('installer [%s] is not associated with OS [%s]. call add_os_installer_key() first' % (installer_key(self.os_detect), os_key))
         if self.verbose:
             print('set default installer [%s] for OS [%s]' % (installer_key(self.os_detect), os_key,))
-        self.default_os_installer[os_key] = installer_key
+        self._default_os_installer[os_key] = installer_key
 
     def get_default_os_installer_key(self, os_key):
         """
@@ -229,11 +325,12 @@ class InstallerContext(object):
         :returns: :class:`Installer`
         :raises: :exc:`KeyError`: if no information for OS *os_key* is registered.
         """
-        if os_key not in self.os_installers:
+        self._load_os_key(os_key)
+        if os_key not in self._os_installers:
             raise KeyError('unknown OS: %s' % (os_key))
         try:
-            installer_key = self.default_os_installer[os_key](self.os_detect)
-            if installer_key not in self.os_installers[os_key]:
+            installer_key = self._default_os_installer[os_key](self.os_detect)
+            if installer_key not in self._os_installers[os_key]:
                 raise KeyError('installer [%s] is not associated with OS [%s]. call add_os_installer_key() first' % (installer_key, os_key))
             # validate, will throw KeyError
             self.get_installer(installer_key)
@@ -309,6 +406,10 @@ class PackageManagerInstaller(Installer):
      - installer rosdep args spec is a list of package names stored with the key "packages"
      - a detect function exists that can return a list of packages that are installed
 
+    Package managers that can report the state of many packages with a
+    single query should implement their detect function with
+    :meth:`batch_detect`.
+
     Also, if *supports_depends* is set to ``True``:
 
      - installer rosdep args spec can also include dependency specification with the key "depends"
@@ -325,6 +426,24 @@ class PackageManagerInstaller(Installer):
         self.as_root = True
         self.sudo_command = 'sudo -H' if hasattr(os, 'geteuid') and os.geteuid() != 0 else ''
 
+    @staticmethod
+    def batch_detect(packages, query_fn):
+        """
+        Detect installed packages with one query of the package manager
+        rather than one query per package.
+
+        :param packages: list of package names
+        :param query_fn: function that takes the sorted list of unique
+          *packages*, queries the package manager once and returns the
+          collection of those that are installed
+        :returns: list of *packages* that are installed, in the order
+          given
+        """
+        if not packages:
+            return []
+        installed = query_fn(sorted(set(packages)))
+        return [p for p in packages if p in installed]
+
     def elevate_priv(self, cmd):
         """
         Prepend *self.sudo_command* to the command if *self.as_root* is ``True``.
@@ -413,11 +532,82 @@ def normalize_uninstalled_to_list(uninstalled):
     return uninstalled_dependencies
 
 
+class InstalledSnapshot(object):
+    """
+    Installed state of resolved packages.  The state is detected with
+    one call to the detect function of each
+    :class:`PackageManagerInstaller` for the union of its packages,
+    rather than once for each group of resolutions, and is kept until
+    it is invalidated.
+    """
+
+    def __init__(self):
+        # {installer_key: (installer, {package: installed})}
+        self._state = {}
+
+    @staticmethod
+    def uses_detect_fn(installer):
+        """
+        :returns: ``True`` if the packages of *installer* that need to
+          be installed are determined with its detect function alone
+        """
+        return isinstance(installer, PackageManagerInstaller) and \
+            type(installer).get_packages_to_install is PackageManagerInstaller.get_packages_to_install
+
+    def detect(self, installer_key, installer, packages):
+        """
+        Detect the installed state of those *packages* that are not in
+        the snapshot yet.
+
+        :param packages: packages of *installer*, ``[opaque]``
+        """
+        if installer_key not in self._state or self._state[installer_key][0] is not installer:
+            self._state[installer_key] = (installer, {})
+        state = self._state[installer_key][1]
+        # dict as an ordered set, resolutions are opaque but hashable
+        pending = list(dict.fromkeys(p for p in packages if p not in state))
+        if not pending:
+            return
+        detected = set(installer.detect_fn(pending))
+        for p in pending:
+            state[p] = p in detected
+
+    def get_packages_to_install(self, installer_key, installer, resolved):
+        """
+        :returns: list of packages (out of *resolved*) that are not
+          installed, or ``None`` if the snapshot does not cover all of
+          *resolved*
+        """
+        snapshot_installer, state = self._state.get(installer_key, (None, None))
+        if snapshot_installer is not installer or any(p not in state for p in resolved):
+            return None
+        return [p for p in resolved if not state[p]]
+
+    def invalidate(self, installer_key=None):
+        """
+        Discard the installed state of the packages of *installer_key*,
+        or of all installers if ``None``.
+        """
+        if installer_key is None:
+            self._state.clear()
+        else:
+            self._state.pop(installer_key, None)
+
+
 class RosdepInstaller(object):
 
     def __init__(self, installer_context, lookup):
         self.installer_context = installer_context
         self.lookup = lookup
+        self.installed_snapshot = InstalledSnapshot()
+        # installers never run more than one installation at a time
+        self._installer_locks = {}
+        self._installer_locks_lock = threading.Lock()
+        self._output_lock = threading.Lock()
+
+    def _get_installer_lock(self, installer_key):
+        with self._installer_locks_lock:
+            return self._installer_locks.setdefault(installer_key, threading.Lock())
 
     def get_uninstalled(self, resources, implicit=False, verbose=False):
         """
@@ -441,31 +631,95 @@ class RosdepInstaller(object):
         if verbose:
             print('resolving for resources [%s]' % (', '.join(resources)))
         resolutions, errors = self.lookup.resolve_all(resources, installer_context, implicit=implicit)
+        return self._get_uninstalled_resolutions(resolutions, verbose), errors
+
+    def get_uninstalled_levels(self, resources, implicit=False, verbose=False):
+        """
+        Get the system dependencies that have not been installed like
+        :meth:`get_uninstalled`, grouped into levels that can be
+        installed with :meth:`install_levels`.
+
+        :returns: (levels, errors), ``([[(str, [opaque])]], {str: ResolutionError})``.
+          Each level lists the uninstalled resolutions of each installer,
+          which only depend on the resolutions of the previous levels.
+        :raises: :exc:`RosdepInternalError`
+        """
+        if verbose:
+            print('resolving for resources [%s]' % (', '.join(resources)))
+        levels, errors = self.lookup.resolve_all_levels(resources, self.installer_context, implicit=implicit)
+        # detect the installed state of all levels at once
+        uninstalled = iter(self._get_uninstalled_resolutions(
+            [r for level in levels for r in level], verbose, keep_empty=True))
+        uninstalled_levels = []
+        for level in levels:
+            level = [r for r in [next(uninstalled) for _ in level] if r[1]]
+            if level:
+                uninstalled_levels.append(level)
+        return uninstalled_levels, errors
+
+    def _get_uninstalled_resolutions(self, resolutions, verbose, keep_empty=False):
+        """
+        :param keep_empty: If ``True``, keep the resolutions that are
+          already installed, with an empty list of packages.
+        :returns: uninstalled packages of *resolutions*, ``[(str, [opaque])]``
+        """
+        installer_context = self.installer_context
 
         # for each installer, figure out what is left to install
         uninstalled = []
         if resolutions == []:
-            return uninstalled, errors
-        for installer_key, resolved in resolutions:  # py3k
-            if verbose:
-                print('resolution: %s [%s]' % (installer_key, ', '.join([str(r) for r in resolved])))
+            return uninstalled
+
+        # the same installer often appears in several groups, so detect
+        # the installed state of all of its packages at once
+        snapshot = self.installed_snapshot
+        installer_packages = {}
+        for installer_key, resolved in resolutions:
+            installer_packages.setdefault(installer_key, []).extend(resolved)
+        detections = []
+        for installer_key, packages in installer_packages.items():
             try:
                 installer = installer_context.get_installer(installer_key)
             except KeyError as e:  # lookup has to be buggy to cause this
                 raise RosdepInternalError(e)
+            if snapshot.uses_detect_fn(installer):
+                detections.append((installer_key, installer, packages))
+
+        # different installers are independent, so detect them concurrently
+        def detect(installer_key, installer, packages):
+            try:
+                snapshot.detect(installer_key, installer, packages)
+            except Exception as e:
+                rd_debug(traceback.format_exc())
+                raise RosdepInternalError(e, message='Bad installer [%s]: %s' % (installer_key, e))
+        if len(detections) > 1:
+            with ThreadPoolExecutor(max_workers=len(detections)) as executor:
+                futures = [executor.submit(detect, *d) for d in detections]
+            # report errors in the order of the installers
+            for future in futures:
+                future.result()
+        elif detections:
+            detect(*detections[0])
+
+        for installer_key, resolved in resolutions:  # py3k
+            if verbose:
+                print('resolution: %s [%s]' % (installer_key, ', '.join([str(r) for r in resolved])))
+            installer = installer_context.get_installer(installer_key)
+            packages_to_install = snapshot.get_packages_to_install(installer_key, installer, resolved)
             try:
-                packages_to_install = installer.get_packages_to_install(resolved)
+                if packages_to_install is None:
+                    packages_to_install = installer.get_packages_to_install(resolved)
             except Exception as e:
                 rd_debug(traceback.format_exc())
                 raise RosdepInternalError(e, message='Bad installer [%s]: %s' % (installer_key, e))
 
             # only create key if there is something to do
-            if packages_to_install:
+            if packages_to_install or keep_empty:
                 uninstalled.append((installer_key, packages_to_install))
             if verbose:
                 print('uninstalled: [%s]' % (', '.join([str(p) for p in packages_to_install])))
 
-        return uninstalled, errors
+        return uninstalled
 
     def install(self, uninstalled, interactive=True, simulate=False,
                 continue_on_error=False, reinstall=False, verbose=False, quiet=False):
@@ -530,8 +784,87 @@ class RosdepInstaller(object):
         if failures:
             raise InstallFailed(failures=failures)
 
+    def install_levels(self, levels, interactive=True, simulate=False,
+                       continue_on_error=False, reinstall=False, verbose=False, quiet=False):
+        """
+        Install the uninstalled rosdeps level by level, running the
+        installers of a level concurrently.  The output of each
+        installer is printed once it has finished.  Interactive and
+        simulated installations run one installer at a time like
+        :meth:`install`, since prompts of concurrent commands cannot
+        be answered.  If concurrent installers elevate privileges, the
+        credentials of ``sudo`` are refreshed once before installing.
+
+        :param levels: uninstalled value from
+          :meth:`RosdepInstaller.get_uninstalled_levels`, ``[[(str, [opaque])]]``
+        :param interactive: If ``False``, suppress
+          interactive prompts (e.g. by passing '-y' to ``apt``).
+        :param simulate: If ``False`` simulate installation
+          without actually executing.
+        :param continue_on_error: If ``True``, continue installation
+          even if an install fails.  Otherwise, stop after the level
+          of the first installation failure.
+        :param reinstall: If ``True``, install dependencies if even
+          already installed (default ``False``).
+
+        :raises: :exc:`InstallFailed` if any rosdeps fail to install,
+          with the failures of all installers that have run.
+        :raises: :exc:`KeyError` If *levels* has invalid installer keys
+        """
+        if interactive or simulate:
+            self.install([r for level in levels for r in level], interactive=interactive, simulate=simulate,
+                         continue_on_error=continue_on_error, reinstall=reinstall, verbose=verbose, quiet=quiet)
+            return
+        if verbose:
+            print('install: installing %d levels with parallel installers' % (len(levels)))
+
+        failures = []
+        # concurrent sudo commands would compete for the terminal to
+        # prompt for the password, ask for it once beforehand
+        sudo_command = self._get_parallel_sudo_command(levels)
+        if sudo_command:
+            if self._run_command(sudo_command + ['-v'], 'sudo', failures, verbose, None) != 0:
+                raise InstallFailed(failures=failures)
+        for level in levels:
+            with ThreadPoolExecutor(max_workers=len(level)) as executor:
+                futures = [
+                    executor.submit(self.install_resolved, installer_key, resolved, interactive=False,
+                                    reinstall=reinstall, continue_on_error=continue_on_error,
+                                    verbose=verbose, quiet=quiet, capture_output=len(level) > 1)
+                    for installer_key, resolved in level]
+            # accumulate errors in the order of the installers
+            level_failures = []
+            for future in futures:
+                try:
+                    future.result()
+                except InstallFailed as e:
+                    level_failures.extend(e.failures)
+            failures.extend(level_failures)
+            if level_failures and not continue_on_error:
+                break
+        if failures:
+            raise InstallFailed(failures=failures)
+
+    def _get_parallel_sudo_command(self, levels):
+        """
+        :returns: the command to elevate privileges with used by the
+          installers of a level that run concurrently, ``[]`` if none
+          of them elevates privileges.
+        """
+        for level in levels:
+            if len(level) < 2:
+                continue
+            for installer_key, _ in level:
+                installer = self.installer_context.get_installer(installer_key)
+                if isinstance(installer, PackageManagerInstaller):
+                    elevate = installer.elevate_priv([])
+                    if elevate:
+                        return elevate[:1]
+        return []
+
     def install_resolved(self, installer_key, resolved, simulate=False, interactive=True,
-                         reinstall=False, continue_on_error=False, verbose=False, quiet=False):
+                         reinstall=False, continue_on_error=False, verbose=False, quiet=False,
+                         capture_output=False):
         """
         Lower-level API for installing a rosdep dependency.  The
         rosdep keys have already been resolved to *installer_key* and
@@ -545,6 +878,9 @@ class RosdepInstaller(object):
           already installed (default ``False``).
         :param verbose: If ``True``, print verbose output to screen (default ``False``)
         :param quiet: If ``True``, supress output except for errors (default ``False``)
+        :param capture_output: If ``True``, capture the output of the installation commands
+          and print it at once when the installation has finished, so that concurrent
+          installations do not interleave their output (default ``False``)
 
         :raises: :exc:`InstallFailed` if any of *resolved* fail to install.
         """
@@ -569,40 +905,88 @@ class RosdepInstaller(object):
         # nothing left to do for simulation
         if simulate:
             return
+        self.installed_snapshot.invalidate(installer_key)
 
-        def run_command(command, installer_key, failures, verbose):
-            # always echo commands to screen
-            print_bold('executing command [%s]' % ' '.join(command))
+        # (message, bold) tuples of the captured output, or None to print directly
+        output = [] if capture_output else None
+        try:
+            # run each install command set and collect errors
+            failures = []
+            with self._get_installer_lock(installer_key):
+                for sub_command in command:
+                    if isinstance(sub_command[0], list):  # list of alternatives
+                        alt_failures = []
+                        for alt_command in sub_command:
+                            result = self._run_command(alt_command, installer_key, alt_failures, verbose, output)
+                            if result == 0:  # one successsfull command is sufficient
+                                alt_failures = []  # clear failuers from other alternatives
+                                break
+                        failures.extend(alt_failures)
+                    else:
+                        result = self._run_command(sub_command, installer_key, failures, verbose, output)
+                    if result != 0:
+                        if not continue_on_error:
+                            raise InstallFailed(failures=failures)
+
+            # test installation of each
+            for r in self._get_not_installed(installer, resolved):
+                failures.append((installer_key, 'Failed to detect successful installation of [%s]' % (r)))
+            # finalize result
+            if failures:
+                raise InstallFailed(failures=failures)
+            elif verbose:
+                _echo(output, '#successfully installed')
+        finally:
+            if output:
+                with self._output_lock:
+                    for msg, bold in output:
+                        _echo(None, msg, bold)
+
+    @staticmethod
+    def _get_not_installed(installer, resolved):
+        """
+        :returns: list of *resolved* that *installer* does not detect as installed.
+          Package managers that do not override
+          :meth:`PackageManagerInstaller.is_installed` are queried once for all
+          of *resolved* rather than once per package.
+        """
+        if isinstance(installer, PackageManagerInstaller) and \
+                type(installer).is_installed is PackageManagerInstaller.is_installed:
+            return installer.get_packages_to_install(resolved)
+        return [r for r in resolved if not installer.is_installed(r)]
+
+    @staticmethod
+    def _run_command(command, installer_key, failures, verbose, output):
+        """
+        :param output: list to capture the output of *command* in, or
+          ``None`` to let it write to the console.
+        :returns: return code of *command*
+        """
+        # always echo commands to screen
+        _echo(output, 'executing command [%s]' % ' '.join(command), bold=True)
+        if output is not None:
+            process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            if process.stdout:
+                _echo(output, process.stdout.decode('utf-8', 'replace').rstrip('\n'))
+            result = process.returncode
+        else:
             result = subprocess.call(command)
-            if verbose:
-                print('command return code [%s]: %s' % (' '.join(command), result))
-            if result != 0:
-                failures.append((installer_key, 'command [%s] failed' % (' '.join(command))))
-            return result
+        if verbose:
+            _echo(output, 'command return code [%s]: %s' % (' '.join(command), result))
+        if result != 0:
+            failures.append((installer_key, 'command [%s] failed' % (' '.join(command))))
+        return result
 
-        # run each install command set and collect errors
-        failures = []
-        for sub_command in command:
-            if isinstance(sub_command[0], list):  # list of alternatives
-                alt_failures = []
-                for alt_command in sub_command:
-                    result = run_command(alt_command, installer_key, alt_failures, verbose)
-                    if result == 0:  # one successsfull command is sufficient
-                        alt_failures = []  # clear failuers from other alternatives
-                        break
-                failures.extend(alt_failures)
-            else:
-                result = run_command(sub_command, installer_key, failures, verbose)
-            if result != 0:
-                if not continue_on_error:
-                    raise InstallFailed(failures=failures)
 
-        # test installation of each
-        for r in resolved:
-            if not installer.is_installed(r):
-                failures.append((installer_key, 'Failed to detect successful installation of [%s]' % (r)))
-        # finalize result
-        if failures:
-            raise InstallFailed(failures=failures)
-        elif verbose:
-            print('#successfully installed')
+def _echo(output, msg, bold=False):
+    """
+    Print *msg*, or append it to *output* to print it later.
+
+    :param output: list of (message, bold) tuples, or ``None``
+    """
+    if output is not None:
+        output.append((msg, bold))
+    elif bold:
+        print_bold(msg)
+    else:
+        print(msg)
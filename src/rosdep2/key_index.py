@@ -0,0 +1,207 @@
+# Copyright (c) 2026, Open Source Robotics Foundation, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+On-disk index of rosdep data that is decoded one key at a time.
+
+The file starts with a header, followed by two tables of offsets, the
+order of the keys and then by the data the offsets point into::
+
+    header         magic, version, number of keys (n)
+    key offsets    n + 1 offsets into the key blob
+    value offsets  n + 1 offsets into the value blob
+    key order      n positions in the key blob, in the order of the data
+    key blob       UTF-8 encoded keys, sorted
+    value blob     pickled definition of each key, in key order
+
+All offsets are absolute positions in the file.  A lookup bisects the
+key table and unpickles a single definition, so opening an index and
+querying a few keys does not depend on the size of the data.
+"""
+
+import mmap
+import os
+import struct
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from .cache_tools import write_atomic_if_changed
+
+KEY_INDEX_MAGIC = b'RDKI'
+KEY_INDEX_VERSION = 2
+
+_HEADER = struct.Struct('<4sII')
+_OFFSET = struct.Struct('<Q')
+_POSITION = struct.Struct('<I')
+
+
+def write_key_index(filepath, rosdep_data):
+    """
+    Write *rosdep_data* as a key index.
+
+    :param filepath: path of the index file
+    :param rosdep_data: raw rosdep dictionary map
+    :returns: ``True`` if the index has been written, ``False`` if
+      *rosdep_data* cannot be indexed because not all of its keys are
+      strings.  Any existing index at *filepath* is removed in that case.
+    :raises: :exc:`OSError` if the index cannot be written
+    """
+    if not all(isinstance(k, str) for k in rosdep_data):
+        try:
+            os.unlink(filepath)
+        except OSError:
+            pass
+        return False
+    keys = sorted(k.encode('utf-8') for k in rosdep_data)
+    values = [pickle.dumps(rosdep_data[k.decode('utf-8')], 2) for k in keys]
+    positions = dict((k, i) for i, k in enumerate(keys))
+    order = [positions[k.encode('utf-8')] for k in rosdep_data]
+
+    count = len(keys)
+    key_offset = _HEADER.size + 2 * (count + 1) * _OFFSET.size + count * _POSITION.size
+    key_offsets = [key_offset]
+    for k in keys:
+        key_offsets.append(key_offsets[-1] + len(k))
+    value_offsets = [key_offsets[-1]]
+    for v in values:
+        value_offsets.append(value_offsets[-1] + len(v))
+
+    table = struct.pack('<%dQ%dI' % (2 * (count + 1), count), *(key_offsets + value_offsets + order))
+    data = b''.join([_HEADER.pack(KEY_INDEX_MAGIC, KEY_INDEX_VERSION, count), table] + keys + values)
+    write_atomic_if_changed(filepath, data, True)
+    return True
+
+
+class KeyIndex(Mapping):
+    """
+    Read-only mapping of rosdep keys to their raw definitions, backed
+    by a file written with :func:`write_key_index`.  Definitions are
+    only unpickled when they are accessed.
+
+    The file stays mapped into memory until :meth:`close` is called,
+    or the index is used as a context manager.
+    """
+
+    def __init__(self, filepath):
+        """
+        :param filepath: path of the index file
+        :raises: :exc:`OSError` if the index cannot be read
+        :raises: :exc:`ValueError` if the file is not a valid key index
+        """
+        self.filepath = filepath
+        with open(filepath, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._mmap) < _HEADER.size:
+            self.close()
+            raise ValueError('%s is not a rosdep key index' % (filepath))
+        magic, version, self._count = _HEADER.unpack_from(self._mmap)
+        if magic != KEY_INDEX_MAGIC or version != KEY_INDEX_VERSION:
+            self.close()
+            raise ValueError('%s is not a rosdep key index' % (filepath))
+        self._value_table = _HEADER.size + (self._count + 1) * _OFFSET.size
+        self._order_table = _HEADER.size + 2 * (self._count + 1) * _OFFSET.size
+
+    def close(self):
+        """
+        Unmap the index file.  Accessing the index afterwards raises
+        :exc:`ValueError`.  Closing a closed index does nothing.
+        """
+        self._mmap.close()
+
+    @property
+    def closed(self):
+        return self._mmap.closed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __reduce__(self):
+        # pickle a reference to the file rather than the data
+        return (KeyIndex, (self.filepath,))
+
+    def _offset(self, table, i):
+        return _OFFSET.unpack_from(self._mmap, table + i * _OFFSET.size)[0]
+
+    def _key(self, i):
+        return self._mmap[self._offset(_HEADER.size, i):self._offset(_HEADER.size, i + 1)]
+
+    def _find(self, key):
+        """
+        :returns: position of *key* in the key table, or ``-1``
+        """
+        if not isinstance(key, str):
+            return -1
+        key = key.encode('utf-8')
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self._count and self._key(lo) == key:
+            return lo
+        return -1
+
+    def __getitem__(self, key):
+        i = self._find(key)
+        if i < 0:
+            raise KeyError(key)
+        start = self._offset(self._value_table, i)
+        end = self._offset(self._value_table, i + 1)
+        return pickle.loads(self._mmap[start:end])
+
+    def __contains__(self, key):
+        return self._find(key) >= 0
+
+    def __iter__(self):
+        # keys are iterated in the order of the indexed data
+        offsets = struct.unpack_from('<%dQ' % (self._count + 1), self._mmap, _HEADER.size)
+        order = struct.unpack_from('<%dI' % (self._count), self._mmap, self._order_table)
+        for i in order:
+            yield self._mmap[offsets[i]:offsets[i + 1]].decode('utf-8')
+
+    def __len__(self):
+        return self._count
+
+    def __repr__(self):
+        return 'KeyIndex(%r)' % (self.filepath)
+
+    def copy(self):
+        # the index is immutable, so it can be shared
+        return self
@@ -38,6 +38,7 @@ version of rosdep that works against tarballs of released stacks.
 import yaml
 
 from .core import InvalidData
+from . import yaml_utils
 
 ROSDEP_YAML = 'rosdep.yaml'
 
@@ -55,7 +56,7 @@ class RosdepLoader:
         :raises: :exc:`yaml.YAMLError`
         """
         try:
-            return yaml.safe_load(yaml_contents)
+            return yaml_utils.safe_load(yaml_contents)
         except yaml.YAMLError as e:
             raise InvalidData('Invalid YAML in [%s]: %s' % (origin, e), origin=origin)
 
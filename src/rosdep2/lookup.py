@@ -27,10 +27,12 @@
 
 # Author Tully Foote/tfoote@willowgarage.com, Ken Conley/kwc@willowgarage.com
 
+import hashlib
 import sys
 import yaml
 
 from collections import defaultdict
+from itertools import islice
 
 from rospkg import RosPack, RosStack, ResourceNotFound
 
@@ -38,6 +40,8 @@ from .core import RosdepInternalError, InvalidData, rd_debug
 from .model import RosdepDatabase
 from .rospkg_loader import RosPkgLoader
 from .dependency_graph import DependencyGraph
+from .gbpdistro_support import RosDistroRosdepData
+from .key_index import KeyIndex
 
 from .sources_list import SourcesListLoader
 
@@ -187,27 +191,53 @@ class RosdepView(object):
     which stores :class:`RosdepDatabaseEntry` data for all stacks, a
     view merges entries for a particular stack.  This view can then be
     queried to lookup and resolve individual rosdep dependencies.
+
+    A lazy view only keeps references to the merged entries, in
+    order, and creates the :class:`RosdepDefinition` of a key when it
+    is looked up.  Entries backed by a
+    :class:`rosdep2.key_index.KeyIndex` or by
+    :class:`rosdep2.gbpdistro_support.RosDistroRosdepData` are merged
+    lazily in either mode, so that only the keys which are queried get
+    decoded.
     """
 
-    def __init__(self, name):
+    def __init__(self, name, lazy=False):
+        """
+        :param name: name of view
+        :param lazy: if ``True``, defer merging of all entries until
+          their keys are looked up
+        """
         self.name = name
+        self.lazy = lazy
         self.rosdep_defs = {}  # {str: RosdepDefinition}
+        # entries merged on lookup, in precedence order
+        self._deferred_entries = []  # [(RosdepDatabaseEntry, override, verbose)]
+        self._deferred_keys = set()  # keys already merged from deferred entries
+        self._merged_key_count = 0  # number of keys merged before the first deferred entry
 
     def __str__(self):
-        return '\n'.join(['%s: %s' % val for val in self.rosdep_defs.items()])
+        return '\n'.join(['%s: %s' % (key, self.lookup(key)) for key in self.keys()])
 
     def lookup(self, rosdep_name):
         """
         :returns: :class:`RosdepDefinition`
         :raises: :exc:`KeyError` If *rosdep_name* is not declared
         """
+        if self._deferred_entries and rosdep_name not in self._deferred_keys:
+            self._merge_deferred(rosdep_name)
         return self.rosdep_defs[rosdep_name]
 
     def keys(self):
         """
         :returns: list of rosdep names in this view
         """
-        return self.rosdep_defs.keys()
+        if not self._deferred_entries:
+            return self.rosdep_defs.keys()
+        # list the keys in merge order, lookups append to rosdep_defs
+        keys = dict.fromkeys(islice(self.rosdep_defs, self._merged_key_count))
+        for entry, _, _ in self._deferred_entries:
+            keys.update(dict.fromkeys(entry.rosdep_data))
+        return list(keys)
 
     def merge(self, update_entry, override=False, verbose=False):
         """
@@ -221,16 +251,42 @@ class RosdepView(object):
         """
         if verbose:
             print('view[%s]: merging from cache of [%s]' % (self.name, update_entry.origin))
+        if self.lazy or self._deferred_entries or isinstance(update_entry.rosdep_data, (KeyIndex, RosDistroRosdepData)):
+            # entries after a deferred one are deferred as well to keep their precedence
+            if not self._deferred_entries:
+                self._merged_key_count = len(self.rosdep_defs)
+            self._deferred_entries.append((update_entry, override, verbose))
+            for dep_name in self._deferred_keys:
+                if dep_name in update_entry.rosdep_data:
+                    self._merge_definition(self.rosdep_defs, dep_name, update_entry.rosdep_data[dep_name],
+                                           update_entry.origin, override, verbose)
+            return
         db = self.rosdep_defs
 
         for dep_name, dep_data in update_entry.rosdep_data.items():
-            # convert data into RosdepDefinition model
-            update_definition = RosdepDefinition(dep_name, dep_data, update_entry.origin)
-            # First rule wins or override, no rule-merging.
-            if override or dep_name not in db:
-                db[dep_name] = update_definition
-            elif dep_name in db:
-                db[dep_name].reverse_merge(dep_data, update_entry.origin, verbose=verbose)
+            self._merge_definition(db, dep_name, dep_data, update_entry.origin, override, verbose)
+
+    def _merge_deferred(self, rosdep_name):
+        db = {}
+        if rosdep_name in self.rosdep_defs:
+            db[rosdep_name] = self.rosdep_defs[rosdep_name]
+        for update_entry, override, verbose in self._deferred_entries:
+            if rosdep_name in update_entry.rosdep_data:
+                self._merge_definition(db, rosdep_name, update_entry.rosdep_data[rosdep_name],
+                                       update_entry.origin, override, verbose)
+        # only memoize definitions that merged without errors
+        self.rosdep_defs.update(db)
+        self._deferred_keys.add(rosdep_name)
+
+    @staticmethod
+    def _merge_definition(db, dep_name, dep_data, origin, override, verbose):
+        # convert data into RosdepDefinition model
+        update_definition = RosdepDefinition(dep_name, dep_data, origin)
+        # First rule wins or override, no rule-merging.
+        if override or dep_name not in db:
+            db[dep_name] = update_definition
+        elif dep_name in db:
+            db[dep_name].reverse_merge(dep_data, origin, verbose=verbose)
 
 
 def prune_catkin_packages(rosdep_keys, verbose=False):
@@ -286,6 +342,11 @@ class RosdepLookup(object):
         self._view_cache = {}  # {str: {RosdepView}}
         self._resolve_cache = {}  # {str : (os_name, os_version, installer_key, resolution, dependencies)}
 
+        # optional :class:`ResolutionCache` and :class:`ResolveAllCache`
+        # shared with later processes
+        self.resolution_cache = None
+        self.resolve_all_cache = None
+
         # some APIs that deal with the entire environment save errors
         # in to self.errors instead of raising them in order to be
         # robust to single-stack faults.
@@ -294,11 +355,28 @@ class RosdepLookup(object):
         # flag for turning on printing to console
         self.verbose = False
 
+        # flag for creating views that merge definitions on lookup, they
+        # list the same keys in the same order as views merged up front
+        self.lazy_views = True
+
         self.skipped_keys = []
 
+        # flag for ordering the resolutions of resolve_all to minimize
+        # the number of installer invocations
+        self.group_by_installer = False
+
     def get_loader(self):
         return self.loader
 
+    def close(self):
+        """
+        Release the key indexes of the loaded rosdep data and the
+        views created from them.  The lookup must not be used
+        afterwards.
+        """
+        self._view_cache.clear()
+        self.rosdep_db.close()
+
     def get_errors(self):
         """
         Retrieve error state for API calls that do not directly report
@@ -392,10 +470,68 @@ class RosdepLookup(object):
           an ordered list of resolution tuples.  A resolution tuple's first element is the installer
           key (e.g.: apt or homebrew) and the second element is a list of opaque resolution values for that
           installer. errors maps package names to an :exc:`ResolutionError` or :exc:`KeyError` exception.
+          If :attr:`group_by_installer` is set, the resolutions are grouped by installer as far as
+          their dependencies allow, see :meth:`DependencyGraph.get_ordered_dependency_list`.
 
         :raises: :exc:`RosdepInternalError` if unexpected error in constructing dependency graph
         :raises: :exc:`InvalidData` if a cycle occurs in constructing dependency graph
         """
+        cache_key = None
+        if self.resolve_all_cache is not None:
+            cache_key = self._get_resolve_all_cache_key(resources, installer_context, implicit)
+            if cache_key is not None:
+                resolutions = self.resolve_all_cache.get(cache_key)
+                if resolutions is not None:
+                    return resolutions, {}
+
+        depend_graph, errors = self._get_dependency_graph(resources, installer_context, implicit)
+        try:
+            # TODO: I really don't like AssertionErrors here; this should be modeled as 'CyclicGraphError'
+            # or something more explicit. No need to continue if this API errors.
+            resolutions_flat = depend_graph.get_ordered_dependency_list(group_by_installer=self.group_by_installer)
+        except AssertionError as e:
+            raise InvalidData('cycle in dependency graph detected: %s' % (e))
+        except KeyError as e:
+            raise RosdepInternalError(e)
+
+        if self.resolution_cache is not None:
+            self.resolution_cache.save()
+        # errors are not cached, they are reported again
+        if cache_key is not None and not errors:
+            self.resolve_all_cache.set(cache_key, resolutions_flat)
+            self.resolve_all_cache.save()
+
+        return resolutions_flat, errors
+
+    def resolve_all_levels(self, resources, installer_context, implicit=False):
+        """
+        Resolve all the rosdep dependencies for *resources* like
+        :meth:`resolve_all`, grouped into levels of resolutions that
+        do not depend on each other.
+
+        :returns: (levels, errors), ``([[(str, [str])]], {str: ResolutionError})``.  Each level is
+          a list of resolution tuples, one for each installer, that only depend on the resolutions
+          of the previous levels, see :meth:`DependencyGraph.get_ordered_dependency_levels`.
+
+        :raises: :exc:`RosdepInternalError` if unexpected error in constructing dependency graph
+        :raises: :exc:`InvalidData` if a cycle occurs in constructing dependency graph
+        """
+        depend_graph, errors = self._get_dependency_graph(resources, installer_context, implicit)
+        try:
+            levels = depend_graph.get_ordered_dependency_levels()
+        except AssertionError as e:
+            raise InvalidData('cycle in dependency graph detected: %s' % (e))
+        except KeyError as e:
+            raise RosdepInternalError(e)
+
+        if self.resolution_cache is not None:
+            self.resolution_cache.save()
+        return levels, errors
+
+    def _get_dependency_graph(self, resources, installer_context, implicit):
+        """
+        :returns: (depend_graph, errors), ``(DependencyGraph, {str: ResolutionError})``
+        """
         depend_graph = DependencyGraph()
         errors = {}
         # TODO: resolutions dictionary should be replaced with resolution model instead of mapping (undefined) keys.
@@ -429,17 +565,31 @@ class RosdepLookup(object):
                         errors[resource_name] = e
             except ResourceNotFound as e:
                 errors[resource_name] = e
+        return depend_graph, errors
 
+    def _get_resolve_all_cache_key(self, resources, installer_context, implicit):
+        """
+        :returns: key of the resolutions of *resources* in
+          :attr:`resolve_all_cache`, or ``None`` if they cannot be
+          cached
+        """
+        get_rosdeps_digest = getattr(self.loader, 'get_rosdeps_digest', None)
+        if get_rosdeps_digest is None:
+            return None
+        rosdeps_digest = get_rosdeps_digest(resources)
+        if rosdeps_digest is None:
+            return None
+        os_name, os_version = installer_context.get_os_name_and_version()
         try:
-            # TODO: I really don't like AssertionErrors here; this should be modeled as 'CyclicGraphError'
-            # or something more explicit. No need to continue if this API errors.
-            resolutions_flat = depend_graph.get_ordered_dependency_list()
-        except AssertionError as e:
-            raise InvalidData('cycle in dependency graph detected: %s' % (e))
-        except KeyError as e:
-            raise RosdepInternalError(e)
-
-        return resolutions_flat, errors
+            installer_keys = installer_context.get_os_installer_keys(os_name)
+            default_key = installer_context.get_default_os_installer_key(os_name)
+        except KeyError:
+            return None
+        key = (
+            rosdeps_digest, implicit, self.group_by_installer, sorted(self.skipped_keys),
+            sorted(catkin_packages.get_workspace_packages()),
+            os_name, os_version, tuple(installer_keys), default_key)
+        return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
 
     def resolve(self, rosdep_key, resource_name, installer_context):
         """
@@ -463,6 +613,15 @@ class RosdepLookup(object):
         """
         os_name, os_version = installer_context.get_os_name_and_version()
 
+        # check persistent cache before creating the view
+        cache_key = None
+        if self.resolution_cache is not None:
+            cache_key = self._get_resolution_cache_key(rosdep_key, resource_name, installer_context, os_name, os_version)
+            if cache_key is not None:
+                cache_value = self.resolution_cache.get(cache_key)
+                if cache_value is not None:
+                    return cache_value
+
         view = self.get_rosdep_view_for_resource(resource_name)
         if view is None:
             raise ResolutionError(rosdep_key, None, os_name, os_version, '[%s] does not have a rosdep view' % (resource_name))
@@ -506,9 +665,28 @@ class RosdepLookup(object):
         # cache value
         # the dependencies list is copied to prevent mutation before next cache hit
         self._resolve_cache[rosdep_key] = os_name, os_version, view.name, installer_key, resolution, list(dependencies)
+        if cache_key is not None:
+            self.resolution_cache.set(cache_key, installer_key, resolution, dependencies)
 
         return installer_key, resolution, dependencies
 
+    def _get_resolution_cache_key(self, rosdep_key, resource_name, installer_context, os_name, os_version):
+        """
+        :returns: key of the resolution of *rosdep_key* for
+          *resource_name* in :attr:`resolution_cache`, or ``None`` if
+          the resolution cannot be cached
+        :raises: :exc:`rospkg.ResourceNotFound` if *resource_name* cannot be located
+        """
+        view_key = self.loader.get_view_key(resource_name)
+        if not view_key:
+            return None
+        try:
+            installer_keys = installer_context.get_os_installer_keys(os_name)
+            default_key = installer_context.get_default_os_installer_key(os_name)
+        except KeyError:
+            return None
+        return rosdep_key, view_key, os_name, os_version, tuple(installer_keys), default_key
+
     def _load_all_views(self, loader):
         """
         Load all available view keys.  In general, this is equivalent
@@ -565,8 +743,9 @@ class RosdepLookup(object):
         :param verbose: print debugging output
         """
         # Create view and initialize with dbs from all of the
-        # dependencies.
-        view = RosdepView(view_name)
+        # dependencies.  Definitions are only created for the keys
+        # that get looked up.
+        view = RosdepView(view_name, lazy=self.lazy_views)
 
         db = self.rosdep_db
         for view_key in view_keys:
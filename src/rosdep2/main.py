@@ -33,15 +33,6 @@ Command-line interface to rosdep library
 
 import errno
 import os
-try:
-    # regex is a drop-in replacement for re, but allows for fuzzy matching
-    # which we use in the search command
-    import regex as re
-    FALL_BACK_TO_RE = False
-except ImportError:
-    import re
-    FALL_BACK_TO_RE = True
-
 import sys
 import traceback
 try:
@@ -63,6 +54,7 @@ import warnings
 from optparse import OptionParser
 
 import rospkg
+from rospkg.os_detect import OsNotDetected
 
 from . import create_default_installer_context, get_default_installer
 from . import __version__
@@ -71,11 +63,13 @@ from .installers import normalize_uninstalled_to_list
 from .installers import RosdepInstaller
 from .lookup import RosdepLookup, ResolutionError, prune_catkin_packages
 from .meta import MetaDatabase
+from .resolution_cache import ResolutionCache, ResolveAllCache
 from .rospkg_loader import DEFAULT_VIEW_KEY
 from .sources_list import update_sources_list, get_sources_cache_dir, \
     download_default_sources_list, SourcesListLoader, CACHE_INDEX, \
     get_sources_list_dir, get_default_sources_list_file, \
-    DEFAULT_SOURCES_LIST_URL, CachedDataSource
+    DEFAULT_SOURCES_LIST_URL, DEFAULT_UPDATE_JOBS, CachedDataSource, \
+    DataSourceMatcher, get_skipped_distros
 from .rosdistrohelper import PreRep137Warning
 
 from .ament_packages import AMENT_PREFIX_PATH_ENV_VAR
@@ -85,7 +79,6 @@ from .catkin_packages import find_catkin_packages_in
 from .catkin_packages import set_workspace_packages
 from .catkin_packages import get_workspace_packages
 from .catkin_packages import VALID_DEPENDENCY_TYPES
-from catkin_pkg.package import InvalidPackage
 
 
 class UsageError(Exception):
@@ -153,6 +146,10 @@ def _get_default_RosdepLookup(options):
                                                       verbose=options.verbose)
     lookup = RosdepLookup.create_from_rospkg(sources_loader=sources_loader, dependency_types=options.dependency_types)
     lookup.verbose = options.verbose
+    lookup.group_by_installer = options.group_by_installer
+    if options.resolution_cache:
+        lookup.resolution_cache = ResolutionCache.create_default(sources_loader, sources_cache_dir=options.sources_cache_dir)
+        lookup.resolve_all_cache = ResolveAllCache.create_default(sources_loader, sources_cache_dir=options.sources_cache_dir)
     return lookup
 
 
@@ -201,11 +198,13 @@ ERROR: %s
     except UnsupportedOs as e:
         print('Unsupported OS: %s\nSupported OSes are [%s]' % (e.args[0], ', '.join(e.args[1])), file=sys.stderr)
         sys.exit(1)
-    except InvalidPackage as e:
-        print(str(e), file=sys.stderr)
-        sys.exit(1)
     except Exception as e:
-        print("""
+        # catkin_pkg is only imported by the commands that parse package manifests
+        catkin_pkg_package = sys.modules.get('catkin_pkg.package')
+        if catkin_pkg_package is not None and isinstance(e, catkin_pkg_package.InvalidPackage):
+            print(str(e), file=sys.stderr)
+        else:
+            print("""
 ERROR: Rosdep experienced an error: %s
 Please go to the rosdep page [1] and file a bug report with the stack trace below.
 [1] : http://www.ros.org/wiki/rosdep
@@ -396,6 +395,38 @@ def _rosdep_main(args):
                       help="Affects the 'update' verb. "
                            'If specified end-of-life distros are being '
                            'fetched too.')
+    parser.add_option('--skip-unmatched-distros', dest='skip_unmatched_distros',
+                      default=False, action='store_true',
+                      help="Affects the 'update' verb. "
+                           'If specified only the distros matching the ROS distro '
+                           'and the OS used to resolve dependencies are fetched. '
+                           'The next update without this option fills in the '
+                           'skipped distros.')
+    parser.add_option('--jobs', dest='jobs', type='int',
+                      default=DEFAULT_UPDATE_JOBS, metavar='N',
+                      help="Affects the 'update' verb. "
+                           'Number of sources to download in parallel. '
+                           'Default: %d' % DEFAULT_UPDATE_JOBS)
+    parser.add_option('--resolution-cache', dest='resolution_cache',
+                      default=False, action='store_true',
+                      help="Affects the 'check' and 'install' verbs. "
+                           'If specified resolved rosdep keys and the resolved '
+                           'dependencies of whole workspaces are cached in the '
+                           'sources cache directory and reused until the next update.')
+    parser.add_option('--group-by-installer', dest='group_by_installer',
+                      default=False, action='store_true',
+                      help="Affects the 'install' verb. "
+                           'If specified the dependencies are installed in as few '
+                           'invocations of each installer as their dependencies '
+                           'on packages of other installers allow.')
+    parser.add_option('--parallel-installers', dest='parallel_installers',
+                      default=False, action='store_true',
+                      help="Affects the 'install' verb. "
+                           'If specified installers whose dependencies do not '
+                           'depend on each other run concurrently, at most one '
+                           'command per installer at a time, and their output is '
+                           'printed once they finish. Only applies together with '
+                           '--default-yes.')
     parser.add_option('-t', '--dependency-types', dest='dependency_types',
                       type='choice', choices=list(VALID_DEPENDENCY_TYPES),
                       default=[], action='append',
@@ -410,14 +441,14 @@ def _rosdep_main(args):
         if not options.print_all_versions:
             sys.exit(0)
         # Otherwise, Then collect the versions of the installers and print them.
-        installers = create_default_installer_context().installers
-        installer_keys = get_default_installer()[1]
+        installer_context = create_default_installer_context()
+        installer_keys = get_default_installer(installer_context=installer_context)[1]
         version_strings = []
         for key in installer_keys:
             if key == 'source':
                 # Explicitly skip the source installer.
                 continue
-            installer = installers[key]
+            installer = installer_context.get_installer(key)
             try:
                 installer_version_strings = installer.get_version_strings()
                 assert isinstance(installer_version_strings, list), installer_version_strings
@@ -686,13 +717,27 @@ def command_update(options):
         except AttributeError:
             # nothing we wanna do under Windows
             pass
+        try:
+            # compile the sources matching this platform into a single snapshot
+            snapshot_matcher = DataSourceMatcher.create_default(
+                os_override=convert_os_override_option(options.os_override),
+                ros_distro=options.ros_distro)
+        except OsNotDetected:
+            snapshot_matcher = None
         update_sources_list(success_handler=update_success_handler,
                             error_handler=update_error_handler,
                             skip_eol_distros=not options.include_eol_distros,
                             ros_distro=options.ros_distro,
-                            quiet=options.quiet)
+                            quiet=options.quiet,
+                            jobs=options.jobs,
+                            snapshot_matcher=snapshot_matcher,
+                            matcher=snapshot_matcher if options.skip_unmatched_distros else None)
         if not options.quiet:
             print('updated cache in %s' % (sources_cache_dir))
+            skipped_distros = get_skipped_distros(sources_cache_dir)
+            if skipped_distros:
+                print('skipped distros %s, run "rosdep update" without '
+                      '--skip-unmatched-distros to fetch them' % (', '.join(skipped_distros)))
     except InvalidData as e:
         print('ERROR: invalid sources list file:\n\t%s' % (e), file=sys.stderr)
         return 1
@@ -779,16 +824,25 @@ def command_install(lookup, packages, options):
     configure_installer_context(installer_context, options)
     installer = RosdepInstaller(installer_context, lookup)
 
+    # levels of uninstalled dependencies for parallel installers
+    levels = None
     if options.reinstall:
         if options.verbose:
             print('reinstall is true, resolving all dependencies')
         try:
-            uninstalled, errors = lookup.resolve_all(packages, installer_context, implicit=options.recursive)
+            if options.parallel_installers:
+                levels, errors = lookup.resolve_all_levels(packages, installer_context, implicit=options.recursive)
+            else:
+                uninstalled, errors = lookup.resolve_all(packages, installer_context, implicit=options.recursive)
         except InvalidData as e:
             print('ERROR: unable to process all dependencies:\n\t%s' % (e), file=sys.stderr)
             return 1
+    elif options.parallel_installers:
+        levels, errors = installer.get_uninstalled_levels(packages, implicit=options.recursive, verbose=options.verbose)
     else:
         uninstalled, errors = installer.get_uninstalled(packages, implicit=options.recursive, verbose=options.verbose)
+    if levels is not None:
+        uninstalled = [r for level in levels for r in level]
 
     if options.verbose:
         uninstalled_dependencies = normalize_uninstalled_to_list(uninstalled)
@@ -812,7 +866,10 @@ def command_install(lookup, packages, options):
         else:
             return 1
     try:
-        installer.install(uninstalled, **install_options)
+        if levels is not None:
+            installer.install_levels(levels, **install_options)
+        else:
+            installer.install(uninstalled, **install_options)
         if not options.simulate:
             print('#All required rosdeps installed successfully')
         return 0
@@ -939,9 +996,8 @@ def command_resolve(args, options, lookup=None):
 
 def search_cached_data_source(view, regexes, os_name):
     def count_errors(results):
-        if FALL_BACK_TO_RE:
-            return 0
-        return sum([sum(r.fuzzy_counts) for r in results])
+        # only matches of the regex module have fuzzy counts
+        return sum([sum(getattr(r, 'fuzzy_counts', ())) for r in results])
 
     close_keys = []
     close_pkgs = []
@@ -999,7 +1055,14 @@ def command_search(args, options):
     sources_loader = SourcesListLoader.create_default(sources_cache_dir=options.sources_cache_dir,
                                                       os_override=os_override,
                                                       verbose=options.verbose)
-    if FALL_BACK_TO_RE:
+    try:
+        # regex is a drop-in replacement for re, but allows for fuzzy matching
+        import regex as re
+        fall_back_to_re = False
+    except ImportError:
+        import re
+        fall_back_to_re = True
+    if fall_back_to_re:
         print('python3-regex module not available, falling back to re module without fuzzy search.')
         regexes = args
         regex_flags = re.IGNORECASE
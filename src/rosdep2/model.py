@@ -38,6 +38,13 @@ combine these rosdep dependency maps and view dependencies together
 into a combined view on which queries can be made.
 """
 
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
+from .key_index import KeyIndex
+
 
 class RosdepDatabaseEntry(object):
     """
@@ -46,11 +53,12 @@ class RosdepDatabaseEntry(object):
 
     def __init__(self, rosdep_data, view_dependencies, origin):
         """
-        :param rosdep_data: raw rosdep dictionary map for view
+        :param rosdep_data: raw rosdep dictionary map for view, or a
+          read-only mapping like :class:`rosdep2.key_index.KeyIndex`
         :param view_dependencies: list of view dependency names
         :param origin: name of where data originated, e.g. filename
         """
-        assert isinstance(rosdep_data, dict), 'RosdepDatabaseEntry() rosdep_data is not a dict: %s' % rosdep_data
+        assert isinstance(rosdep_data, Mapping), 'RosdepDatabaseEntry() rosdep_data is not a mapping: %s' % rosdep_data
         self.rosdep_data = rosdep_data
         self.view_dependencies = view_dependencies
         self.origin = origin
@@ -91,6 +99,15 @@ class RosdepDatabase(object):
         """
         self._rosdep_db[view_name] = RosdepDatabaseEntry(rosdep_data.copy(), view_dependencies, origin)
 
+    def close(self):
+        """
+        Close the key indexes that back the data of the views.  The
+        database must not be used afterwards.
+        """
+        for entry in self._rosdep_db.values():
+            if isinstance(entry.rosdep_data, KeyIndex):
+                entry.rosdep_data.close()
+
     def get_view_names(self):
         """
         :returns: list of view names that are loaded into this database.
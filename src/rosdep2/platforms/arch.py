@@ -61,12 +61,24 @@ def register_manjaro(context):
         context.set_os_override(OS_ARCH, context.os_detect.get_codename())
 
 
-def pacman_detect_single(p):
-    return not subprocess.call(['pacman', '-T', p], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+def pacman_get_installed(packages):
+    """
+    :returns: list of *packages* that are installed.  ``pacman -T``
+      prints the dependencies that are not satisfied and exits with 127
+      if there are any.
+    """
+    p = subprocess.Popen(['pacman', '-T'] + packages, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    std_out, _ = p.communicate()
+    if p.returncode == 0:
+        return packages
+    if p.returncode != 127:
+        return []
+    missing = set(std_out.decode().split())
+    return [pkg for pkg in packages if pkg not in missing]
 
 
 def pacman_detect(packages):
-    return [p for p in packages if pacman_detect_single(p)]
+    return PackageManagerInstaller.batch_detect(packages, pacman_get_installed)
 
 
 class PacmanInstaller(PackageManagerInstaller):
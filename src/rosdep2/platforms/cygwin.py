@@ -47,13 +47,23 @@ def register_platforms(context):
     context.set_default_os_installer_key(OS_CYGWIN, lambda self: APT_CYG_INSTALLER)
 
 
-def cygcheck_detect_single(p):
-    std_out = read_stdout(['cygcheck', '-c', p])
-    return std_out.count('OK') > 0
+def cygcheck_get_installed(packages, exec_fn=None):
+    """
+    :returns: set of *packages* that ``cygcheck -c`` reports as OK
+    """
+    if exec_fn is None:
+        exec_fn = read_stdout
+    std_out = exec_fn(['cygcheck', '-c'] + packages)
+    installed = set()
+    for line in std_out.splitlines():
+        fields = line.split()
+        if len(fields) >= 3 and fields[-1] == 'OK':
+            installed.add(fields[0])
+    return installed
 
 
-def cygcheck_detect(packages):
-    return [p for p in packages if cygcheck_detect_single(p)]
+def cygcheck_detect(packages, exec_fn=None):
+    return PackageManagerInstaller.batch_detect(packages, lambda pkgs: cygcheck_get_installed(pkgs, exec_fn))
 
 
 class AptCygInstaller(PackageManagerInstaller):
@@ -77,4 +87,4 @@ class AptCygInstaller(PackageManagerInstaller):
 
 
 if __name__ == '__main__':
-    print('test cygcheck_detect(true)', cygcheck_detect('cygwin'))
+    print('test cygcheck_detect(true)', cygcheck_detect(['cygwin']))
@@ -27,8 +27,11 @@
 
 # Author Tully Foote, Ken Conley
 
+import fnmatch
+import os
 import subprocess
 import sys
+import threading
 
 from rospkg.os_detect import (
     OS_DEBIAN,
@@ -52,6 +55,14 @@ from ..shell_utils import read_stdout
 # apt package manager key
 APT_INSTALLER = 'apt'
 
+# default location of the dpkg database
+DPKG_ADMINDIR = '/var/lib/dpkg'
+
+# installed packages read from dpkg status files, shared by all detect calls
+# {status file path: (stamp of the file, (installed, provided))}
+_dpkg_status_cache = {}
+_dpkg_status_lock = threading.Lock()
+
 
 def register_installers(context):
     context.set_installer(APT_INSTALLER, AptInstaller())
@@ -220,15 +231,37 @@ def _read_apt_cache_showpkg(packages, exec_fn=None):
             yield p, False, None
 
 
+def _dpkg_query_installed(packages, exec_fn):
+    """
+    :param packages: list of package names, without version locks
+    :returns: list of the *packages* that dpkg reports as installed
+    """
+    cmd = ['dpkg-query', '-W', "-f='${Package} ${Status}\n'"]
+    cmd.extend(packages)
+    std_out, std_err = exec_fn(cmd, True)
+    std_out = std_out.replace("'", '')
+    pkg_list = std_out.split('\n')
+    ret_list = []
+    for pkg in pkg_list:
+        pkg_row = pkg.split()
+        if len(pkg_row) == 4 and (pkg_row[3] == 'installed'):
+            ret_list.append(pkg_row[0])
+    return ret_list
+
+
 def dpkg_detect(pkgs, exec_fn=None):
     """
     Given a list of package, return the list of installed packages.
 
+    Virtual packages are installed if any of their providers is
+    installed.  The providers of all virtual packages are checked with
+    a single ``dpkg-query`` call, so the number of processes spawned
+    does not depend on the number of packages.
+
     :param pkgs: list of package names, optionally followed by a fixed version (`foo=3.0`)
     :param exec_fn: function to execute Popen and read stdout (for testing)
     :return: list elements in *pkgs* that were found installed on the system
     """
-    ret_list = []
     # this is mainly a hack to support version locking for eigen.
     # we strip version-locking syntax, e.g. libeigen3-dev=3.0.1-*.
     # our query does not do the validation on the version itself.
@@ -239,28 +272,149 @@ def dpkg_detect(pkgs, exec_fn=None):
             version_lock_map[p.split('=')[0]] = p
         else:
             version_lock_map[p] = p
-    cmd = ['dpkg-query', '-W', "-f='${Package} ${Status}\n'"]
-    cmd.extend(version_lock_map.keys())
 
     if exec_fn is None:
         exec_fn = read_stdout
-    std_out, std_err = exec_fn(cmd, True)
-    std_out = std_out.replace("'", '')
-    pkg_list = std_out.split('\n')
-    for pkg in pkg_list:
-        pkg_row = pkg.split()
-        if len(pkg_row) == 4 and (pkg_row[3] == 'installed'):
-            ret_list.append(pkg_row[0])
+    ret_list = _dpkg_query_installed(list(version_lock_map.keys()), exec_fn)
     installed_packages = [version_lock_map[r] for r in ret_list]
 
     # now for the remaining packages check, whether they are installed as
     # virtual packages
     remaining = _read_apt_cache_showpkg([p for p in pkgs if p not in installed_packages])
-    virtual = [n for (n, v, pr) in remaining if v and len(dpkg_detect(pr)) > 0]
+    providers = [(n, pr) for (n, v, pr) in remaining if v]
+    virtual = []
+    if providers:
+        installed_providers = set(_dpkg_query_installed(sorted({p for _, pr in providers for p in pr}), exec_fn))
+        virtual = [n for (n, pr) in providers if installed_providers.intersection(pr)]
 
     return installed_packages + virtual
 
 
+def read_dpkg_status(admindir=DPKG_ADMINDIR):
+    """
+    Read the installed packages from the ``status`` file of the dpkg
+    database, without spawning any process.
+
+    :param admindir: dpkg database directory
+    :returns: (installed, provided), ``({str: str}, {str: [str]})``.
+      *installed* maps the names of installed packages to their
+      versions, *provided* maps the names of virtual packages to the
+      installed packages that provide them.
+    :raises: :exc:`IOError` if the status file cannot be read
+    """
+    installed = {}
+    provided = {}
+
+    def add_stanza(fields):
+        status = fields.get('Status', '').split()
+        if 'Package' not in fields or len(status) != 3 or status[2] != 'installed':
+            return
+        name = fields['Package']
+        installed[name] = fields.get('Version')
+        for provide in fields.get('Provides', '').split(','):
+            # strip versions and architecture qualifiers, e.g. foo:any (= 1.0)
+            provide = provide.split('(')[0].strip().split(':')[0]
+            if provide:
+                # dict as an ordered set, a package can be listed in several
+                # stanzas (multi-arch) and provide the same name more than once
+                provided.setdefault(provide, {})[name] = None
+
+    fields = {}
+    with open(os.path.join(admindir, 'status'), 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if not line.strip():
+                add_stanza(fields)
+                fields = {}
+            elif not line[0].isspace() and ':' in line:
+                # continuation lines only occur in fields we do not need
+                key, value = line.split(':', 1)
+                if key in ('Package', 'Status', 'Version', 'Provides'):
+                    fields[key] = value.strip()
+    add_stanza(fields)
+    return installed, dict((k, list(v)) for k, v in provided.items())
+
+
+def get_dpkg_admindir():
+    """
+    :returns: dpkg database directory, which like for dpkg itself can be
+      overridden with the ``DPKG_ADMINDIR`` environment variable
+    """
+    return os.environ.get('DPKG_ADMINDIR') or DPKG_ADMINDIR
+
+
+def get_dpkg_status(admindir=None):
+    """
+    Same as :func:`read_dpkg_status`, but the status file is only read
+    again once it has changed.  The result is shared within the process.
+
+    :param admindir: dpkg database directory, defaults to :func:`get_dpkg_admindir`
+    :raises: :exc:`IOError` if the status file cannot be read
+    """
+    if admindir is None:
+        admindir = get_dpkg_admindir()
+    status_file = os.path.join(admindir, 'status')
+    st = os.stat(status_file)
+    # dpkg replaces the status file on every change
+    stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+    with _dpkg_status_lock:
+        cached = _dpkg_status_cache.get(status_file)
+        if cached is None or cached[0] != stamp:
+            cached = stamp, read_dpkg_status(admindir)
+            _dpkg_status_cache[status_file] = cached
+    return cached[1]
+
+
+def dpkg_status_detect(pkgs, admindir=None, exec_fn=None):
+    """
+    Given a list of package, return the list of installed packages
+    according to the dpkg status database.  Unlike :func:`dpkg_detect`
+    this only spawns a process for packages that are not installed but
+    provided by an installed package.  Like with :func:`dpkg_detect`,
+    those only count as installed if ``apt-cache showpkg`` reports
+    them as virtual packages, which is checked with a single call.
+
+    A version lock (`foo=1.2*`) is only satisfied if the installed
+    version matches it, the lock may use the same wildcards as apt.
+
+    :param pkgs: list of package names, optionally followed by a fixed version (`foo=3.0`)
+    :param admindir: dpkg database directory, defaults to :func:`get_dpkg_admindir`
+    :param exec_fn: function to execute Popen and read stdout (for testing)
+    :return: list elements in *pkgs* that were found installed on the system
+    :raises: :exc:`IOError` if the status file cannot be read
+    """
+    installed, provided = get_dpkg_status(admindir)
+    found = set()
+    # dict as an ordered set
+    maybe_virtual = {}
+    for p in pkgs:
+        name, _, version_lock = p.partition('=')
+        if name in installed:
+            if not version_lock or fnmatch.fnmatchcase(installed[name], version_lock):
+                found.add(p)
+        elif name in provided and not version_lock:
+            maybe_virtual[p] = None
+    if maybe_virtual:
+        # a real package is not installed just because an installed package provides it
+        found.update(n for (n, v, _) in _read_apt_cache_showpkg(list(maybe_virtual), exec_fn) if v)
+    return [p for p in pkgs if p in found]
+
+
+def apt_detect(pkgs, exec_fn=None):
+    """
+    Given a list of package, return the list of installed packages.
+    The dpkg status database is read directly if possible, otherwise
+    this falls back to :func:`dpkg_detect`.
+
+    :param pkgs: list of package names, optionally followed by a fixed version (`foo=3.0`)
+    :param exec_fn: function to execute Popen and read stdout (for testing)
+    :return: list elements in *pkgs* that were found installed on the system
+    """
+    try:
+        return dpkg_status_detect(pkgs, exec_fn=exec_fn)
+    except (IOError, OSError):
+        return dpkg_detect(pkgs, exec_fn=exec_fn)
+
+
 def _iterate_packages(packages, reinstall):
     for entry in _read_apt_cache_showpkg(packages):
         p, is_virtual, providers = entry
@@ -285,7 +439,7 @@ class AptInstaller(PackageManagerInstaller):
     """
 
     def __init__(self):
-        super(AptInstaller, self).__init__(dpkg_detect)
+        super(AptInstaller, self).__init__(apt_detect)
 
     def get_version_strings(self):
         output = subprocess.check_output(['apt-get', '--version'])
@@ -48,19 +48,22 @@ def register_platforms(context):
     context.set_default_os_installer_key(OS_FREEBSD, lambda self: PKG_INSTALLER)
 
 
-def pkg_detect_single(p, exec_fn):
-    if p == 'builtin':
-        return True
-
-    cmd = ['/usr/sbin/pkg', 'query', '%n', p]
-    std_out = exec_fn(cmd)
-    return std_out.split() != []
+def pkg_get_installed(exec_fn):
+    """
+    :returns: set of the names, name-version strings and origins of
+      all installed packages, which are the forms ``pkg query`` matches
+      a package against
+    """
+    cmd = ['/usr/sbin/pkg', 'query', '%n %n-%v %o']
+    installed = set(exec_fn(cmd).split())
+    installed.add('builtin')
+    return installed
 
 
 def pkg_detect(packages, exec_fn=None):
     if exec_fn is None:
         exec_fn = read_stdout
-    return [p for p in packages if pkg_detect_single(p, exec_fn)]
+    return PackageManagerInstaller.batch_detect(packages, lambda _: pkg_get_installed(exec_fn))
 
 
 class PkgInstaller(PackageManagerInstaller):
@@ -40,6 +40,7 @@
 # sed[static,-nls] // sed built the static USE flag and withou the nls one
 
 import os
+import re
 
 from rospkg.os_detect import OS_GENTOO
 
@@ -49,6 +50,13 @@ from ..shell_utils import read_stdout
 
 PORTAGE_INSTALLER = 'portage'
 
+PORTAGE_VDB_PATH = '/var/db/pkg'
+
+# atoms without version, slot, repository or USE dependencies
+_PLAIN_ATOM = re.compile(r'^[A-Za-z0-9_][A-Za-z0-9+_.-]*(/[A-Za-z0-9_][A-Za-z0-9+_.-]*)?$')
+# name-version[-rN] entries of the installed package database
+_VDB_ENTRY = re.compile(r'^(.+?)-[0-9]+(\.[0-9]+)*[a-z]?(_(alpha|beta|pre|rc|p)[0-9]*)*(-r[0-9]+)?$')
+
 
 def register_installers(context):
     context.set_installer(PORTAGE_INSTALLER, PortageInstaller())
@@ -76,11 +84,57 @@ def portage_detect_single(atom, exec_fn=read_stdout):
     return len(std_out) >= 1
 
 
-def portage_detect(atoms, exec_fn=read_stdout):
+def portage_read_vdb(vdb_path=PORTAGE_VDB_PATH):
+    """
+    Read the names of the installed packages from the installed package
+    database.
+
+    :returns: set of installed packages, both as ``category/name`` and
+      as ``name``, or ``None`` if *vdb_path* cannot be read
+    """
+    try:
+        categories = os.listdir(vdb_path)
+    except OSError:
+        return None
+    installed = set()
+    for category in categories:
+        try:
+            entries = os.listdir(os.path.join(vdb_path, category))
+        except OSError:
+            continue
+        for entry in entries:
+            m = _VDB_ENTRY.match(entry)
+            if m:
+                installed.add(m.group(1))
+                installed.add(category + '/' + m.group(1))
+    return installed
+
+
+def portage_get_installed(atoms, exec_fn=read_stdout, vdb_path=PORTAGE_VDB_PATH):
+    """
+    :returns: set of *atoms* that are installed.  Plain package names
+      are looked up in the installed package database, which is read
+      once.  Other atoms, e.g. with a version, slot or USE dependency,
+      are matched with ``portageq``.
+    """
+    plain = {a for a in atoms if _PLAIN_ATOM.match(a)}
+    vdb = portage_read_vdb(vdb_path) if plain else None
+    installed = set()
+    for atom in atoms:
+        if vdb is not None and atom in plain:
+            if atom in vdb:
+                installed.add(atom)
+        elif portage_detect_single(atom, exec_fn):
+            installed.add(atom)
+    return installed
+
+
+def portage_detect(atoms, exec_fn=read_stdout, vdb_path=PORTAGE_VDB_PATH):
     """
     Given a list of atoms, return a list of which are already installed.
 
     :param exec_fn: function to execute Popen and read stdout (for testing)
+    :param vdb_path: path of the installed package database (for testing)
     """
 
     # This is for testing, to make sure they're always checked in the same order
@@ -88,7 +142,7 @@ def portage_detect(atoms, exec_fn=read_stdout):
     if isinstance(atoms, list):
         atoms.sort()
 
-    return [a for a in atoms if portage_detect_single(a, exec_fn)]
+    return PackageManagerInstaller.batch_detect(atoms, lambda a: portage_get_installed(a, exec_fn, vdb_path))
 
 # Check portage and needed tools for existence and compatibility
 
@@ -176,52 +176,61 @@ def brew_strip_pkg_name(package):
     return package.split('/')[-1]
 
 
+def _read_brew_info(exec_fn):
+    """
+    Query all installed formulae with a single ``brew info`` call.
+
+    :returns: map of the names of linked formulae to the options used
+        to build their linked keg, ``{str: [str]}``
+    """
+    cmd = ['brew', 'info', '--json=v2', '--installed']
+    std_out = exec_fn(cmd)
+    if not std_out.strip():
+        return {}
+    try:
+        linked_formulae = {}
+        for pkg_info in json.loads(std_out)['formulae']:
+            linked_version = pkg_info['linked_keg']
+            if not linked_version:
+                continue
+            installed_options = []
+            for spec in pkg_info['installed']:
+                if spec['version'] == linked_version:
+                    installed_options = spec['used_options']
+                    break
+            linked_formulae[pkg_info['name']] = installed_options
+    except (ValueError, TypeError, KeyError):
+        e_type, e, tb = sys.exc_info()
+        raise RosdepInternalError(
+            e, """Error while parsing brew info
+ * Output of `{0}`:
+ {1}
+ * Error while parsing:
+ {2}""".format(' '.join(cmd), std_out, ''.join(traceback.format_exception(e_type, e, tb))))
+    return linked_formulae
+
+
 def brew_detect(resolved, exec_fn=None):
     """Given a list of resolutions, return the list of installed resolutions.
 
     :param resolved: List of HomebrewResolution objects
     :returns: Filtered list of HomebrewResolution objects
     """
+    if not resolved:
+        return []
     if exec_fn is None:
         exec_fn = read_stdout
-    std_out = exec_fn(['brew', 'list', '--formula'])
-    installed_formulae = std_out.split()
+    linked_formulae = _read_brew_info(exec_fn)
 
     def is_installed(r):
         # TODO: Does not check installed version (stable, devel, HEAD)
         # TODO: Does not check origin (Tap) of formula
         # TODO: Does not handle excluding options (e.g. specifying
         #       --without-foo for --with-foo option)
-
-        # fast fail with a quick check first, then slower check if
-        # really linked and for options
-        if not brew_strip_pkg_name(r.package) in installed_formulae:
-            return False
-
-        std_out = exec_fn(['brew', 'info', r.package, '--json=v1'])
-        try:
-            pkg_info = json.loads(std_out)
-            pkg_info = pkg_info[0]
-            linked_version = pkg_info['linked_keg']
-            if not linked_version:
-                return False
-            for spec in pkg_info['installed']:
-                if spec['version'] == linked_version:
-                    installed_options = spec['used_options']
-                    break
-        except (ValueError, TypeError):
-            e_type, e, tb = sys.exc_info()
-            raise RosdepInternalError(
-                e, """Error while parsing brew info for '{0}'
- * Output of `brew info {0} --json=v1`:
- {1}
- * Error while parsing:
- {2}""".format(r.package, std_out, ''.join(traceback.format_exception(e_type, e, tb))))
-
-        if set(r.options) <= set(installed_options):
-            return True
-        else:
+        installed_options = linked_formulae.get(brew_strip_pkg_name(r.package))
+        if installed_options is None:
             return False
+        return set(r.options) <= set(installed_options)
 
     # preserve order
     return list(filter(is_installed, resolved))
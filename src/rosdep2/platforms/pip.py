@@ -27,7 +27,9 @@
 
 # Author Tully Foote/tfoote@willowgarage.com
 
+import json
 import os
+import re
 import subprocess
 import sys
 
@@ -140,48 +142,68 @@ def is_cmd_available(cmd):
         return False
 
 
+def normalize_pip_name(name):
+    """
+    Normalize a Python distribution name as specified in PEP 503, so
+    that names which only differ in case or separators compare equal.
+    """
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def _get_installed_distributions():
+    """
+    :returns: normalized names of the distributions installed for the
+      running interpreter
+    """
+    names = set()
+    for dist in importlib_metadata.distributions():
+        name = dist.metadata['Name']
+        if name:
+            names.add(normalize_pip_name(name))
+    return names
+
+
+def _read_pip_list(pip_cmd, exec_fn):
+    """
+    :returns: normalized names of the distributions reported by ``pip
+      list``, or ``None`` if pip does not support JSON output
+    """
+    try:
+        dists = json.loads(exec_fn(pip_cmd + ['list', '--format=json']))
+    except ValueError:
+        return None
+    if not isinstance(dists, list):
+        return None
+    return {normalize_pip_name(d['name']) for d in dists if isinstance(d, dict) and d.get('name')}
+
+
 def pip_detect(pkgs, exec_fn=None):
     """
     Given a list of package, return the list of installed packages.
 
+    If pip runs in this interpreter, the installed distributions are
+    enumerated in-process.  Otherwise they are queried with a single
+    ``pip list`` call, falling back to ``pip freeze`` for versions of
+    pip without JSON output.  Package names are compared as specified
+    in PEP 503.
+
     :param exec_fn: function to execute Popen and read stdout (for testing)
     """
     pip_cmd = get_pip_command()
     if not pip_cmd:
         return []
 
-    fallback_to_pip_show = False
-    if exec_fn is None:
-        exec_fn = read_stdout
-        fallback_to_pip_show = True
-    pkg_list = exec_fn(pip_cmd + ['freeze']).split('\n')
-
-    ret_list = []
-    for pkg in pkg_list:
-        pkg_row = pkg.split('==')
-        if pkg_row[0] in pkgs:
-            ret_list.append(pkg_row[0])
-
-    # Try to detect with the return code of `pip show`.
-    # This can show the existance of things like `argparse` which
-    # otherwise do not show up.
-    # See:
-    #   https://github.com/pypa/pip/issues/1570#issuecomment-71111030
-    if fallback_to_pip_show:
-        for pkg in [p for p in pkgs if p not in ret_list]:
-            # does not see retcode but stdout for old pip to check if installed
-            proc = subprocess.Popen(
-                pip_cmd + ['show', pkg],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT
-            )
-            output, _ = proc.communicate()
-            output = output.strip()
-            if proc.returncode == 0 and output:
-                # `pip show` detected it, add it to the list.
-                ret_list.append(pkg)
-
-    return ret_list
+    if exec_fn is None and pip_cmd == [sys.executable, '-m', 'pip']:
+        installed = _get_installed_distributions()
+    else:
+        if exec_fn is None:
+            exec_fn = read_stdout
+        installed = _read_pip_list(pip_cmd, exec_fn)
+        if installed is None:
+            pkg_list = exec_fn(pip_cmd + ['freeze']).split('\n')
+            installed = {normalize_pip_name(pkg.split('==')[0]) for pkg in pkg_list}
+
+    return [p for p in pkgs if normalize_pip_name(p) in installed]
 
 
 class PipInstaller(PackageManagerInstaller):
@@ -27,6 +27,7 @@
 
 # Author Nikolay Nikolov/niko.b.nikolov@gmail.com
 
+import bisect
 import subprocess
 import os
 
@@ -34,12 +35,13 @@ from ..core import InstallFailed
 from .pip import PIP_INSTALLER
 from ..installers import PackageManagerInstaller
 from .source import SOURCE_INSTALLER
-from ..shell_utils import read_stdout
 
 SLACKWARE_OS_NAME = 'slackware'
 SBOTOOLS_INSTALLER = 'sbotools'
 SLACKPKG_INSTALLER = 'slackpkg'
 
+SLACKWARE_PACKAGES_DIR = '/var/log/packages'
+
 
 def register_installers(context):
     context.set_installer(SBOTOOLS_INSTALLER, SbotoolsInstaller())
@@ -60,15 +62,25 @@ def sbotools_available():
     return True
 
 
-def sbotools_detect_single(p):
-    pkg_list = read_stdout(['ls', '/var/log/packages'])
-    p = subprocess.Popen(['grep', '-i', '^' + p], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    p.communicate(pkg_list)
-    return not p.returncode
-
-
-def sbotools_detect(packages):
-    return [p for p in packages if sbotools_detect_single(p)]
+def sbotools_get_installed(packages, packages_dir=SLACKWARE_PACKAGES_DIR):
+    """
+    :returns: set of *packages* that an entry of *packages_dir* starts
+      with, ignoring case
+    """
+    try:
+        entries = sorted(e.lower() for e in os.listdir(packages_dir))
+    except OSError:
+        return set()
+    installed = set()
+    for p in packages:
+        i = bisect.bisect_left(entries, p.lower())
+        if i < len(entries) and entries[i].startswith(p.lower()):
+            installed.add(p)
+    return installed
+
+
+def sbotools_detect(packages, packages_dir=SLACKWARE_PACKAGES_DIR):
+    return PackageManagerInstaller.batch_detect(packages, lambda pkgs: sbotools_get_installed(pkgs, packages_dir))
 
 
 class SbotoolsInstaller(PackageManagerInstaller):
@@ -40,6 +40,7 @@ from ..core import rd_debug, InvalidData
 from ..installers import PackageManagerInstaller, InstallFailed
 from ..shell_utils import create_tempfile_from_string_and_execute
 from ..url_utils import urlopen_gzip, URLError
+from .. import yaml_utils
 
 SOURCE_INSTALLER = 'source'
 
@@ -71,7 +72,12 @@ def _sub_fetch_file(url, md5sum=None):
     contents = ''
     try:
         fh = urlopen_gzip(url)
-        contents = fh.read()
+        try:
+            # rdmanifests are small and have to be validated with md5sum
+            # before they are parsed, so they are not streamed
+            contents = fh.read()
+        finally:
+            fh.close()
         if md5sum is not None:
             filehash = hashlib.md5(contents).hexdigest()
             if md5sum and filehash != md5sum:
@@ -113,7 +119,7 @@ def load_rdmanifest(contents):
     :raises: :exc:`InvalidRdmanifest`
     """
     try:
-        return yaml.safe_load(contents)
+        return yaml_utils.safe_load(contents)
     except yaml.scanner.ScannerError as ex:
         raise InvalidRdmanifest('Failed to parse yaml in %s:  Error: %s' % (contents, ex))
 
@@ -25,12 +25,12 @@
 # ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
 # POSSIBILITY OF SUCH DAMAGE.
 
-import yaml
 import warnings
 
 from .core import DownloadFailure
 from .rosdistrohelper import PreRep137Warning
 from .url_utils import urlopen_gzip
+from . import yaml_utils
 
 # location of targets file for processing gbpdistro files
 REP3_TARGETS_URL = 'https://raw.githubusercontent.com/ros/rosdistro/master/releases/targets.yaml'
@@ -59,7 +59,7 @@ def download_targets_data(targets_url=None):
         f = urlopen_gzip(targets_url, timeout=DOWNLOAD_TIMEOUT)
         text = f.read()
         f.close()
-        targets_data = yaml.safe_load(text)
+        targets_data = yaml_utils.safe_load(text)
     except Exception as e:
         raise DownloadFailure('Failed to download target platform data for gbpdistro:\n\t%s' % (str(e)))
     if type(targets_data) is list:
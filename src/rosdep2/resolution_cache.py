@@ -0,0 +1,195 @@
+# Copyright (c) 2026, Open Source Robotics Foundation, Inc.
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the Willow Garage, Inc. nor the names of its
+#       contributors may be used to endorse or promote products derived from
+#       this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS"
+# AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE
+# IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE
+# ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT OWNER OR CONTRIBUTORS BE
+# LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR
+# CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF
+# SUBSTITUTE GOODS OR SERVICES; LOSS OF USE, DATA, OR PROFITS; OR BUSINESS
+# INTERRUPTION) HOWEVER CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN
+# CONTRACT, STRICT LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE)
+# ARISING IN ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Persistent cache of rosdep key resolutions.
+
+Resolutions only depend on the rosdep data of the cached sources and
+on the platform they are resolved for, so they can be reused by later
+rosdep invocations until ``rosdep update`` rewrites the sources cache.
+"""
+
+import os
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from ._version import __version__
+from .cache_tools import PICKLE_CACHE_EXT, write_atomic
+from .sources_list import get_cache_digest, get_sources_cache_dir
+
+RESOLUTION_CACHE = 'resolutions' + PICKLE_CACHE_EXT
+RESOLUTION_CACHE_VERSION = 1
+
+RESOLVE_ALL_CACHE = 'resolve_all' + PICKLE_CACHE_EXT
+# number of workspaces to keep results for
+RESOLVE_ALL_CACHE_SIZE = 16
+
+
+def _is_plain(resolution):
+    # resolutions that are not plain package names, e.g. source
+    # installs, may not be reproducible from the rosdep data alone
+    return all(isinstance(r, str) for r in resolution)
+
+
+class _CacheFile(object):
+    """
+    Pickled map that is ignored if it has been written for a different
+    sources cache *digest* or by a different version of rosdep.
+    """
+
+    def __init__(self, filepath, digest):
+        """
+        :param filepath: path of the cache file
+        :param digest: digest of the sources cache, see
+          :func:`rosdep2.sources_list.get_cache_digest`
+        """
+        self.filepath = filepath
+        self.digest = digest
+        self._entries = None
+        # entries set by this process
+        self._updates = {}
+
+    @classmethod
+    def create_default(cls, sources_loader, sources_cache_dir=None):
+        """
+        :param sources_loader: :class:`SourcesListLoader` the
+          resolutions are based on
+        :param sources_cache_dir: override sources cache directory
+        """
+        if sources_cache_dir is None:
+            sources_cache_dir = get_sources_cache_dir()
+        digest = get_cache_digest(sources_cache_dir, [x.url for x in sources_loader.sources])
+        return cls(os.path.join(sources_cache_dir, cls.filename), digest)
+
+    def _get_header(self):
+        return {'version': RESOLUTION_CACHE_VERSION, 'rosdep': __version__, 'digest': self.digest}
+
+    def _load(self):
+        try:
+            with open(self.filepath, 'rb') as f:
+                if pickle.load(f) == self._get_header():
+                    return pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError, AttributeError):
+            # missing or unreadable cache, start over
+            pass
+        return {}
+
+    def _get(self, key):
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries.get(key)
+
+    def _set(self, key, value):
+        if self._entries is None:
+            self._entries = self._load()
+        self._entries[key] = value
+        self._updates[key] = value
+
+    def _merge(self, entries):
+        entries.update(self._updates)
+        return entries
+
+    def save(self):
+        """
+        Write new entries to the cache file, merged with those written
+        concurrently by other processes.  Errors writing the file are
+        ignored.
+        """
+        if not self._updates:
+            return
+        self._entries = self._merge(self._load())
+        self._updates = {}
+        try:
+            write_atomic(self.filepath, pickle.dumps(self._get_header(), 2) + pickle.dumps(self._entries, 2), True)
+        except (IOError, OSError):
+            pass
+
+
+class ResolutionCache(_CacheFile):
+    """
+    Maps resolution keys, as computed by :class:`RosdepLookup`, to
+    ``(installer_key, resolution, dependencies)``.
+    """
+
+    filename = RESOLUTION_CACHE
+
+    def get(self, key):
+        """
+        :returns: ``(installer_key, resolution, dependencies)`` or
+          ``None`` if *key* is not cached
+        """
+        value = self._get(key)
+        if value is None:
+            return None
+        installer_key, resolution, dependencies = value
+        return installer_key, list(resolution), list(dependencies)
+
+    def set(self, key, installer_key, resolution, dependencies):  # noqa: A003
+        """
+        Cache a resolution.  Resolutions that are not plain package
+        names, e.g. source installs, are not cached.
+        """
+        if _is_plain(resolution):
+            self._set(key, (installer_key, list(resolution), list(dependencies)))
+
+
+class ResolveAllCache(_CacheFile):
+    """
+    Maps digests of workspaces, as computed by :class:`RosdepLookup`,
+    to the resolutions returned by :meth:`RosdepLookup.resolve_all`.
+    Only the most recently resolved workspaces are kept.
+    """
+
+    filename = RESOLVE_ALL_CACHE
+
+    def get(self, key):
+        """
+        :returns: ``[(installer_key, resolution)]`` or ``None`` if *key*
+          is not cached
+        """
+        value = self._get(key)
+        if value is None:
+            return None
+        return [(installer_key, list(resolution)) for installer_key, resolution in value]
+
+    def set(self, key, resolutions):  # noqa: A003
+        """
+        Cache the resolutions of a workspace, unless they contain
+        resolutions that are not plain package names.
+        """
+        if all(_is_plain(resolution) for _, resolution in resolutions):
+            self._set(key, [(installer_key, list(resolution)) for installer_key, resolution in resolutions])
+
+    def _merge(self, entries):
+        # dicts keep insertion order, the entries of this process are the most recent
+        for key in self._updates:
+            entries.pop(key, None)
+        entries.update(self._updates)
+        return dict(list(entries.items())[-RESOLVE_ALL_CACHE_SIZE:])
@@ -27,7 +27,31 @@
 
 # Author Paul Mathieu/paul@osrfoundation.org
 
-import rosdistro
+import hashlib
+import os
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+import rospkg
+
+from .cache_tools import compute_filename_hash, write_atomic_if_changed, PICKLE_CACHE_EXT
+from .url_utils import urlopen_gzip, NotModified
+from . import yaml_utils
+
+# name of the directory in the rosdep home storing parsed distribution files
+RELEASE_FILE_CACHE_DIR = 'rosdistro.cache'
+RELEASE_FILE_CACHE_VERSION = 2
+
+# seconds to wait before aborting download of a distribution file
+DOWNLOAD_TIMEOUT = 15.0
 
 
 class PreRep137Warning(UserWarning):
@@ -50,8 +74,68 @@ class ReleaseFile(object):
                 self.repositories[repo_name] = repo
         self.platforms = dist_file.release_platforms
 
+    def _get_data(self):
+        """
+        :returns: plain data of the release file to store in the release
+          file cache, which can be passed to :meth:`_from_data`
+        """
+        return {
+            'repositories': dict((k, v.get_data()) for k, v in self.repositories.items()),
+            'platforms': self.platforms,
+        }
+
+    @classmethod
+    def _from_data(cls, data):
+        """
+        :param data: plain data as returned by :meth:`_get_data`
+        """
+        from rosdistro.release_repository_specification import ReleaseRepositorySpecification
+        release_file = cls.__new__(cls)
+        release_file.repositories = dict(
+            (k, ReleaseRepositorySpecification(k, v)) for k, v in data['repositories'].items())
+        release_file.platforms = data['platforms']
+        return release_file
+
+
+class _Targets(MutableMapping):
+    """
+    Platforms of the distributions in the index, which are only
+    loaded when they are accessed.  Entries can be overridden.
+    """
+
+    def __init__(self, distro_names):
+        self._distro_names = list(distro_names)
+        self._targets = {}
+
+    def __getitem__(self, distro):
+        if distro not in self._targets:
+            if distro not in self._distro_names:
+                raise KeyError(distro)
+            self._targets[distro] = get_release_file(distro).platforms
+        return self._targets[distro]
+
+    def __setitem__(self, distro, platforms):
+        if distro not in self._distro_names:
+            self._distro_names.append(distro)
+        self._targets[distro] = platforms
+
+    def __delitem__(self, distro):
+        self._distro_names.remove(distro)
+        self._targets.pop(distro, None)
+
+    def __contains__(self, distro):
+        return distro in self._distro_names
+
+    def __iter__(self):
+        return iter(self._distro_names)
+
+    def __len__(self):
+        return len(self._distro_names)
+
 
 def _check_cache():
+    # rosdistro is only imported by the commands that query the index
+    import rosdistro
     if _RDCache.index_url != rosdistro.get_index_url():
         _RDCache.index_url = rosdistro.get_index_url()
         _RDCache.index = None
@@ -66,17 +150,134 @@ def get_index_url():
 def get_index():
     _check_cache()
     if _RDCache.index is None:
+        import rosdistro
         _RDCache.index = rosdistro.get_index(_RDCache.index_url)
     return _RDCache.index
 
 
+def get_release_file_cache_dir():
+    """
+    :returns: directory storing the parsed distribution files
+    """
+    return os.path.join(rospkg.get_ros_home(), 'rosdep', RELEASE_FILE_CACHE_DIR)
+
+
+def _read_release_file_cache(filepath):
+    """
+    :returns: cache entry of a distribution file, or ``None``
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            entry = pickle.load(f)
+    except (IOError, OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+        return None
+    if not isinstance(entry, dict) or entry.get('version') != RELEASE_FILE_CACHE_VERSION:
+        return None
+    return entry
+
+
+def _download_distribution_files(urls, validators):
+    """
+    Download the contents of *urls*, revalidating them with the cache
+    validators of an earlier download.
+
+    :param validators: cache validators of each URL, or ``None``
+    :returns: ``(contents, validators)`` of each URL
+    :raises: :exc:`NotModified` if none of *urls* has changed
+    """
+    contents = [None] * len(urls)
+    new_validators = list(validators)
+    for i, url in enumerate(urls):
+        try:
+            f = urlopen_gzip(url, validators=validators[i], timeout=DOWNLOAD_TIMEOUT)
+        except NotModified:
+            continue
+        try:
+            contents[i] = f.read()
+        finally:
+            f.close()
+        new_validators[i] = f.validators
+    if all(c is None for c in contents):
+        raise NotModified(urls)
+    for i, url in enumerate(urls):
+        if contents[i] is None:
+            # the data of the other URLs has changed, so this one is needed as well
+            f = urlopen_gzip(url, timeout=DOWNLOAD_TIMEOUT)
+            try:
+                contents[i] = f.read()
+            finally:
+                f.close()
+            new_validators[i] = f.validators
+    return contents, new_validators
+
+
+def _load_release_file(index, distro):
+    """
+    Load the release file of *distro*, reusing the parsed data stored
+    in the release file cache if the distribution file has not changed.
+    The cache entry is looked up by a digest of the distribution file
+    URLs and revalidated with the server, or by a digest of the
+    downloaded content if the server cannot tell.
+    """
+    import rosdistro
+    from rosdistro.distribution_file import create_distribution_file
+    distribution = index.distributions.get(distro, {})
+    if 'distribution' not in distribution:
+        # let rosdistro report the error
+        return ReleaseFile(rosdistro.get_distribution_file(index, distro))
+    urls = distribution['distribution']
+    if not isinstance(urls, list):
+        urls = [urls]
+
+    cache_dir = get_release_file_cache_dir()
+    filepath = os.path.join(cache_dir, compute_filename_hash(urls) + PICKLE_CACHE_EXT)
+    entry = _read_release_file_cache(filepath)
+    if entry is None or entry['urls'] != urls:
+        entry = None
+    try:
+        contents, validators = _download_distribution_files(
+            urls, entry['validators'] if entry else [None] * len(urls))
+    except NotModified:
+        return ReleaseFile._from_data(entry['data'])
+
+    digest = hashlib.sha256()
+    for c in contents:
+        digest.update(hashlib.sha256(c).digest())
+    digest = digest.hexdigest()
+    if entry is not None and entry['digest'] == digest:
+        release_file = ReleaseFile._from_data(entry['data'])
+    else:
+        dist_file = create_distribution_file(distro, [yaml_utils.safe_load(c) for c in contents])
+        release_file = ReleaseFile(dist_file)
+
+    entry = {
+        'version': RELEASE_FILE_CACHE_VERSION,
+        'urls': urls,
+        'validators': validators,
+        'digest': digest,
+        'data': release_file._get_data(),
+    }
+    try:
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        write_atomic_if_changed(filepath, pickle.dumps(entry, 2), True)
+    except OSError:
+        # the cache is an optimization, rosdep works without it
+        pass
+    return release_file
+
+
 def get_release_file(distro):
     _check_cache()
     if distro not in _RDCache.release_files:
-        dist_file = rosdistro.get_distribution_file(get_index(), distro)
-        _RDCache.release_files[distro] = ReleaseFile(dist_file)
+        _RDCache.release_files[distro] = _load_release_file(get_index(), distro)
     return _RDCache.release_files[distro]
 
 
 def get_targets():
-    return dict((d, get_release_file(d).platforms) for d in get_index().distributions)
+    """
+    :returns: platforms of each distribution in the index.  The
+      distribution file of a distribution is only loaded when its
+      platforms are accessed.
+    """
+    return _Targets(get_index().distributions)
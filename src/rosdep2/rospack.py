@@ -55,12 +55,14 @@ def init_rospack_interface():
             self.sources_cache_dir = get_sources_cache_dir()
             self.verbose = False
             self.dependency_types = []
+            self.resolution_cache = False
+            self.group_by_installer = False
     lookup = _get_default_RosdepLookup(Options())
     return lookup.get_rosdep_view(DEFAULT_VIEW_KEY)
 
 
 def is_view_empty(view):
-    return len(view.rosdep_defs) == 0
+    return len(view.keys()) == 0
 
 
 def is_ros_package(view, rosdep_name):
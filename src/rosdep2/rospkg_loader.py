@@ -32,10 +32,12 @@ Library for loading rosdep files from the ROS package/stack
 filesystem.
 """
 
+import hashlib
 import os
+import re
 
-import catkin_pkg.package
 import rospkg
+import rospkg.common
 
 from .catkin_packages import VALID_DEPENDENCY_TYPES
 from .loader import RosdepLoader
@@ -45,6 +47,9 @@ from .loader import RosdepLoader
 # explicit underlay_key.
 DEFAULT_VIEW_KEY = '*default*'
 
+# environment variables referenced by conditions in package manifests
+_CONDITION_VARIABLE = re.compile(r'\$\{?([A-Za-z_][A-Za-z0-9_]*)')
+
 # Implementation details: this API was originally conceived under the
 # rosdep 1 design.  It has since been retrofitted for the rosdep 2
 # design, which means it is a bit overbuilt.  There really is no need
@@ -140,6 +145,8 @@ class RosPkgLoader(RosdepLoader):
         """
 
         if resource_name in self.get_catkin_paths():
+            # catkin_pkg is only imported once a package manifest is parsed
+            import catkin_pkg.package
             pkg = catkin_pkg.package.parse_package(self.get_catkin_paths()[resource_name])
             pkg.evaluate_conditions(os.environ)
             deps = sum((getattr(pkg, '{}_depends'.format(d)) for d in self.include_dep_types), [])
@@ -158,6 +165,32 @@ class RosPkgLoader(RosdepLoader):
         else:
             raise rospkg.ResourceNotFound(resource_name)
 
+    def get_rosdeps_digest(self, resource_names):
+        """
+        Compute a digest of everything :meth:`get_rosdeps` depends on
+        for the catkin packages *resource_names*: their manifests, the
+        environment variables their conditions refer to and the
+        dependency types.
+
+        :returns: hex digest, ``str``, or ``None`` if not all of
+          *resource_names* are catkin packages
+        """
+        catkin_paths = self.get_catkin_paths()
+        h = hashlib.sha256(repr(sorted(self.include_dep_types)).encode('utf-8'))
+        for resource_name in sorted(set(resource_names)):
+            if resource_name not in catkin_paths:
+                return None
+            filename = os.path.join(catkin_paths[resource_name], rospkg.common.PACKAGE_FILE)
+            try:
+                with open(filename, 'rb') as f:
+                    data = f.read()
+            except (IOError, OSError):
+                return None
+            variables = sorted(set(_CONDITION_VARIABLE.findall(data.decode('utf-8', 'replace'))))
+            environ = [(v, os.environ.get(v)) for v in variables]
+            h.update(repr((resource_name, hashlib.sha256(data).hexdigest(), environ)).encode('utf-8'))
+        return h.hexdigest()
+
     def is_metapackage(self, resource_name):
         if resource_name in self._rosstack.list():
             m = self._rosstack.get_manifest(resource_name)
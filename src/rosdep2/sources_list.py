@@ -27,19 +27,24 @@
 
 # Author Ken Conley/kwc@willowgarage.com
 
+import hashlib
 import os
 import sys
 import yaml
+from concurrent.futures import ThreadPoolExecutor
 try:
     import cPickle as pickle
 except ImportError:
     import pickle
 
-from .cache_tools import compute_filename_hash, PICKLE_CACHE_EXT, write_atomic, write_cache_file
+from .cache_tools import compute_filename_hash, get_cache_filepath, KEY_INDEX_CACHE_EXT, \
+    PICKLE_CACHE_EXT, read_cache_validators, write_atomic_if_changed, write_cache_file
 from .core import InvalidData, DownloadFailure, CachePermissionError
-from .gbpdistro_support import get_gbprepo_as_rosdep_data, download_gbpdistro_as_rosdep_data
+from .gbpdistro_support import get_gbprepo_as_rosdep_data, download_gbpdistro_as_rosdep_data, RosDistroRosdepData
+from .key_index import KeyIndex, write_key_index
 from .meta import MetaDatabase
-from .url_utils import urlopen_gzip, URLError
+from .url_utils import urlopen_gzip, NotModified, URLError
+from . import yaml_utils
 
 try:
     import urlparse
@@ -64,12 +69,24 @@ DEFAULT_SOURCES_LIST_URL = 'https://raw.githubusercontent.com/ros/rosdistro/mast
 # seconds to wait before aborting download of rosdep data
 DOWNLOAD_TIMEOUT = 15.0
 
+# default number of sources to download in parallel during update
+DEFAULT_UPDATE_JOBS = 1
+
 SOURCES_LIST_DIR = 'sources.list.d'
 SOURCES_CACHE_DIR = 'sources.cache'
 
 # name of index file for sources cache
 CACHE_INDEX = 'index'
 
+# name of the file storing the matching sources compiled into one snapshot
+CACHE_SNAPSHOT = 'snapshot' + PICKLE_CACHE_EXT
+
+# bump whenever the layout of the snapshot file changes
+CACHE_SNAPSHOT_VERSION = 1
+
+# name of the file listing the distros skipped by the last update
+CACHE_SKIPPED_DISTROS = 'skipped_distros'
+
 # extension for binary cache
 SOURCE_PATH_ENV = 'ROSDEP_SOURCE_PATH'
 
@@ -182,13 +199,31 @@ class RosDistroSource(DataSource):
 # necessary full filepath calculation and loading of data.
 
 
+def _load_key_index(filepath):
+    """
+    :param filepath: path of the cache file, without extension
+    :returns: :class:`KeyIndex` of the cache file, or ``None`` if
+      there is none or it is older than the pickled data
+    """
+    try:
+        if os.stat(filepath + KEY_INDEX_CACHE_EXT).st_mtime_ns < os.stat(filepath + PICKLE_CACHE_EXT).st_mtime_ns:
+            return None
+        return KeyIndex(filepath + KEY_INDEX_CACHE_EXT)
+    except (OSError, ValueError):
+        return None
+
+
 def cache_data_source_loader(sources_cache_dir, verbose=False):
     def create_model(type_, uri, tags, origin=None):
         # compute the filename has from the URL
         filename = compute_filename_hash(uri)
         filepath = os.path.join(sources_cache_dir, filename)
         pickle_filepath = filepath + PICKLE_CACHE_EXT
-        if os.path.exists(pickle_filepath):
+        rosdep_data = _load_key_index(filepath)
+        if rosdep_data is not None:
+            if verbose:
+                print('loading cached data source:\n\t%s\n\t%s' % (uri, filepath + KEY_INDEX_CACHE_EXT), file=sys.stderr)
+        elif os.path.exists(pickle_filepath):
             if verbose:
                 print('loading cached data source:\n\t%s\n\t%s' % (uri, pickle_filepath), file=sys.stderr)
             with open(pickle_filepath, 'rb') as f:
@@ -197,7 +232,7 @@ def cache_data_source_loader(sources_cache_dir, verbose=False):
             if verbose:
                 print('loading cached data source:\n\t%s\n\t%s' % (uri, filepath), file=sys.stderr)
             with open(filepath) as f:
-                rosdep_data = yaml.safe_load(f.read())
+                rosdep_data = yaml_utils.safe_load(f.read())
         else:
             rosdep_data = {}
         return CachedDataSource(type_, uri, tags, rosdep_data, origin=filepath)
@@ -273,16 +308,18 @@ class DataSourceMatcher(object):
         return not any(set(rosdep_data_source.tags) - set(self.tags))
 
     @staticmethod
-    def create_default(os_override=None):
+    def create_default(os_override=None, ros_distro=None):
         """
         Create a :class:`DataSourceMatcher` to match the current
         configuration.
 
         :param os_override: (os_name, os_codename) tuple to override
             OS detection
+        :param ros_distro: ROS distro name to override the
+            ``ROS_DISTRO`` environment variable
         :returns: :class:`DataSourceMatcher`
         """
-        distro_name = rospkg.distro.current_distro_codename()
+        distro_name = ros_distro or rospkg.distro.current_distro_codename()
         if os_override is None:
             os_detect = rospkg.os_detect.OsDetect()
             os_name, os_version, os_codename = os_detect.detect_os()
@@ -297,14 +334,29 @@ def download_rosdep_data(url):
     :raises: :exc:`DownloadFailure` If data cannot be
         retrieved (e.g. 404, bad YAML format, server down).
     """
+    return _download_rosdep_data(url)[0]
+
+
+def _download_rosdep_data(url, validators=None):
+    """
+    :param validators: (optional) HTTP cache validators of the data
+        previously downloaded from *url*
+    :returns: (rosdep data, HTTP cache validators of the downloaded data)
+    :raises: :exc:`NotModified` If the data has not changed since
+        *validators* were recorded.
+    :raises: :exc:`DownloadFailure` If data cannot be
+        retrieved (e.g. 404, bad YAML format, server down).
+    """
     try:
-        f = urlopen_gzip(url, timeout=DOWNLOAD_TIMEOUT)
-        text = f.read()
-        f.close()
-        data = yaml.safe_load(text)
+        f = urlopen_gzip(url, validators=validators, timeout=DOWNLOAD_TIMEOUT)
+        try:
+            # parse while downloading instead of buffering the whole file
+            data = yaml_utils.safe_load(f)
+        finally:
+            f.close()
         if type(data) is not dict:
             raise DownloadFailure('rosdep data from [%s] is not a YAML dictionary' % (url))
-        return data
+        return data, f.validators
     except (URLError, httplib.HTTPException) as e:
         raise DownloadFailure(str(e) + ' (%s)' % url)
     except yaml.YAMLError as e:
@@ -432,10 +484,110 @@ def _generate_key_from_urls(urls):
     return '^'.join(urls if isinstance(urls, list) else [urls])
 
 
+def _write_source_cache(sources_cache_dir, key, rosdep_data, validators=None):
+    """
+    Write the cache file of a source along with its key index.
+
+    :returns: name of file where cache is stored
+    """
+    filepath = write_cache_file(sources_cache_dir, key, rosdep_data, validators)
+    index_filepath = filepath + KEY_INDEX_CACHE_EXT
+    if isinstance(rosdep_data, RosDistroRosdepData):
+        # the compact data is loaded faster as a whole than through an index
+        try:
+            os.unlink(index_filepath)
+        except OSError:
+            pass
+        return filepath
+    try:
+        if write_key_index(index_filepath, rosdep_data):
+            # an unchanged index of rewritten data must not look stale
+            pickle_mtime = os.stat(filepath + PICKLE_CACHE_EXT).st_mtime_ns
+            index_stat = os.stat(index_filepath)
+            if index_stat.st_mtime_ns < pickle_mtime:
+                os.utime(index_filepath, ns=(index_stat.st_atime_ns, pickle_mtime))
+    except OSError as e:
+        raise CachePermissionError('Failed to write cache file: ' + str(e))
+    return filepath
+
+
+def _download_source_data(source, sources_cache_dir):
+    """
+    :returns: (rosdep data, HTTP cache validators).  The rosdep data is
+        ``None`` if the data in the cache is still up-to-date.
+    """
+    if source.type == TYPE_YAML:
+        validators = read_cache_validators(sources_cache_dir, source.url)
+        try:
+            return _download_rosdep_data(source.url, validators)
+        except NotModified:
+            return None, validators
+    elif source.type == TYPE_GBPDISTRO:  # DEPRECATED, do not use this file. See REP137
+        return download_gbpdistro_as_rosdep_data(source.url), None
+
+
+def _get_distro_names_to_update(skip_eol_distros, ros_distro, quiet):
+    """
+    :returns: sorted names of the distributions in the rosdistro index
+        to generate rosdep data for, ``[str]``
+    :raises: :exc:`ValueError` if *ros_distro* is not in the index
+    """
+    if not quiet:
+        print('Query rosdistro index %s' % get_index_url())
+    distribution_names = get_index().distributions.keys()
+    if ros_distro is not None and ros_distro not in distribution_names:
+        raise ValueError(
+            'Requested distribution "%s" is not in the index.' % ros_distro)
+
+    dist_names = []
+    for dist_name in sorted(distribution_names):
+        distribution = get_index().distributions[dist_name]
+        if dist_name != ros_distro:
+            if ros_distro is not None:
+                if not quiet:
+                    print('Skip distro "%s" different from requested "%s"' % (dist_name, ros_distro))
+                continue
+            if skip_eol_distros:
+                if distribution.get('distribution_status') == 'end-of-life':
+                    if not quiet:
+                        print('Skip end-of-life distro "%s"' % dist_name)
+                    continue
+        if not quiet:
+            print('Add distro "%s"' % dist_name)
+        dist_names.append(dist_name)
+    return dist_names
+
+
+def _get_unmatched_distro_names(dist_names, matcher, quiet):
+    """
+    :param matcher: :class:`DataSourceMatcher` or ``None``
+    :returns: names of the distributions in *dist_names* that do not
+        match *matcher*, ``[str]``
+    """
+    if matcher is None:
+        return []
+    unmatched = []
+    for dist_name in dist_names:
+        if not matcher.matches(RosDistroSource(dist_name)):
+            if not quiet:
+                print('Skip distro "%s" not matching %s' % (dist_name, ' '.join(matcher.tags)))
+            unmatched.append(dist_name)
+    return unmatched
+
+
+def _write_skipped_distros(sources_cache_dir, skipped_distros):
+    filepath = os.path.join(sources_cache_dir, CACHE_SKIPPED_DISTROS)
+    if skipped_distros:
+        write_atomic_if_changed(filepath, ''.join('%s\n' % d for d in skipped_distros))
+    elif os.path.exists(filepath):
+        os.unlink(filepath)
+
+
 def update_sources_list(sources_list_dir=None, sources_cache_dir=None,
                         success_handler=None, error_handler=None,
                         skip_eol_distros=False, ros_distro=None,
-                        quiet=False):
+                        quiet=False, jobs=DEFAULT_UPDATE_JOBS,
+                        snapshot_matcher=None, matcher=None):
     """
     Re-downloaded data from remote sources and store in cache.  Also
     update the cache index based on current sources.
@@ -449,35 +601,59 @@ def update_sources_list(sources_list_dir=None, sources_cache_dir=None,
         if a particular source fails.  This hook is mainly for
         printing errors to console.
     :param skip_eol_distros: skip downloading sources for EOL distros
+    :param jobs: maximum number of sources to download in parallel.
+        Handlers are still called, and the cache is still written, in
+        the order of the sources list.
+    :param snapshot_matcher: if set, :class:`DataSourceMatcher` used
+        to compile the matching sources into a single cache snapshot,
+        see :func:`write_cache_snapshot`.
+    :param matcher: if set, :class:`DataSourceMatcher` used to skip
+        the distros in the rosdistro index that do not match it.  The
+        rosdep data of skipped distros is neither downloaded nor
+        written, so the cache keeps the data of an earlier update, and
+        their names are recorded, see :func:`get_skipped_distros`.
 
     :returns: list of (`DataSource`, cache_file_path) pairs for cache
         files that were updated, ``[str]``
     :raises: :exc:`InvalidData` If any of the sources list files is invalid
     :raises: :exc:`OSError` if *sources_list_dir* cannot be read.
     :raises: :exc:`IOError` If *sources_list_dir* cannot be read or cache data cannot be written
+    :raises: :exc:`ValueError` if *jobs* is not a positive number
     """
+    if jobs < 1:
+        raise ValueError('Number of jobs must be at least 1, got %s.' % jobs)
     if sources_cache_dir is None:
         sources_cache_dir = get_sources_cache_dir()
 
     sources = parse_sources_list(sources_list_dir=sources_list_dir)
-    retval = []
+    download_sources = []
     for source in list(sources):
-        try:
-            if source.type == TYPE_YAML:
-                rosdep_data = download_rosdep_data(source.url)
-            elif source.type == TYPE_GBPDISTRO:  # DEPRECATED, do not use this file. See REP137
-                if not source.tags[0] in ['electric', 'fuerte']:
-                    if not quiet:
-                        print('Ignore legacy gbpdistro "%s"' % source.tags[0])
-                    sources.remove(source)
-                    continue  # do not store this entry in the cache
-                rosdep_data = download_gbpdistro_as_rosdep_data(source.url)
-            retval.append((source, write_cache_file(sources_cache_dir, source.url, rosdep_data)))
-            if success_handler is not None:
-                success_handler(source)
-        except DownloadFailure as e:
-            if error_handler is not None:
-                error_handler(source, e)
+        if source.type == TYPE_GBPDISTRO:  # DEPRECATED, do not use this file. See REP137
+            if not source.tags[0] in ['electric', 'fuerte']:
+                if not quiet:
+                    print('Ignore legacy gbpdistro "%s"' % source.tags[0])
+                sources.remove(source)
+                continue  # do not store this entry in the cache
+        download_sources.append(source)
+
+    retval = []
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_download_source_data, source, sources_cache_dir) for source in download_sources]
+        # collect results in order so the output and cache are deterministic
+        for source, future in zip(download_sources, futures):
+            try:
+                rosdep_data, validators = future.result()
+                if rosdep_data is None:
+                    # not modified upstream, keep the cached data
+                    cache_filepath = get_cache_filepath(sources_cache_dir, source.url)
+                else:
+                    cache_filepath = _write_source_cache(sources_cache_dir, source.url, rosdep_data, validators)
+                retval.append((source, cache_filepath))
+                if success_handler is not None:
+                    success_handler(source)
+            except DownloadFailure as e:
+                if error_handler is not None:
+                    error_handler(source, e)
 
     # Additional sources for ros distros
     # In compliance with REP137 and REP143
@@ -489,41 +665,30 @@ def update_sources_list(sources_list_dir=None, sources_cache_dir=None,
         'ros2': '2',
     }
 
-    if not quiet:
-        print('Query rosdistro index %s' % get_index_url())
-    distribution_names = get_index().distributions.keys()
-    if ros_distro is not None and ros_distro not in distribution_names:
-        raise ValueError(
-            'Requested distribution "%s" is not in the index.' % ros_distro)
-
-    for dist_name in sorted(distribution_names):
-        distribution = get_index().distributions[dist_name]
-        if dist_name != ros_distro:
-            if ros_distro is not None:
-                if not quiet:
-                    print('Skip distro "%s" different from requested "%s"' % (dist_name, ros_distro))
-                continue
-            if skip_eol_distros:
-                if distribution.get('distribution_status') == 'end-of-life':
-                    if not quiet:
-                        print('Skip end-of-life distro "%s"' % dist_name)
-                    continue
-        if not quiet:
-            print('Add distro "%s"' % dist_name)
-        rds = RosDistroSource(dist_name)
-        rosdep_data = get_gbprepo_as_rosdep_data(dist_name)
-        # Store metadata from REP153
-        if distribution.get('python_version'):
-            python_versions[dist_name] = distribution.get('python_version')
-        if distribution.get('distribution_type'):
-            distribution_type = distribution.get('distribution_type')
-            if distribution_type in ros_version_map:
-                ros_versions[dist_name] = ros_version_map[distribution_type]
-        # dist_files can either be a string (single filename) or a list (list of filenames)
-        dist_files = distribution['distribution']
-        key = _generate_key_from_urls(dist_files)
-        retval.append((rds, write_cache_file(sources_cache_dir, key, rosdep_data)))
-        sources.append(rds)
+    dist_names = _get_distro_names_to_update(skip_eol_distros, ros_distro, quiet)
+    skipped_distros = _get_unmatched_distro_names(dist_names, matcher, quiet)
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = dict(
+            (dist_name, executor.submit(get_gbprepo_as_rosdep_data, dist_name))
+            for dist_name in dist_names if dist_name not in skipped_distros)
+        for dist_name in dist_names:
+            distribution = get_index().distributions[dist_name]
+            rds = RosDistroSource(dist_name)
+            # Store metadata from REP153
+            if distribution.get('python_version'):
+                python_versions[dist_name] = distribution.get('python_version')
+            if distribution.get('distribution_type'):
+                distribution_type = distribution.get('distribution_type')
+                if distribution_type in ros_version_map:
+                    ros_versions[dist_name] = ros_version_map[distribution_type]
+            # dist_files can either be a string (single filename) or a list (list of filenames)
+            dist_files = distribution['distribution']
+            key = _generate_key_from_urls(dist_files)
+            if dist_name in futures:
+                rosdep_data = futures[dist_name].result()
+                retval.append((rds, _write_source_cache(sources_cache_dir, key, rosdep_data)))
+            # skipped distros stay in the index with the data of an earlier update
+            sources.append(rds)
 
     # cache metadata that isn't a source list
     meta_db = MetaDatabase()
@@ -541,11 +706,30 @@ def update_sources_list(sources_list_dir=None, sources_cache_dir=None,
     for source in sources:
         url = _generate_key_from_urls(source.url)
         data += 'yaml %s %s\n' % (url, ' '.join(source.tags))
-    write_atomic(cache_index, data)
+    write_atomic_if_changed(cache_index, data)
+    _write_skipped_distros(sources_cache_dir, skipped_distros)
+    if snapshot_matcher is not None:
+        write_cache_snapshot(snapshot_matcher, sources_cache_dir=sources_cache_dir)
     # mainly for debugging and testing
     return retval
 
 
+def get_skipped_distros(sources_cache_dir=None):
+    """
+    :param sources_cache_dir: override sources cache directory
+    :returns: names of the distros whose rosdep data has been skipped
+        by the last :func:`update_sources_list`, ``[str]``.  An update
+        without a matcher fills them in.
+    """
+    if sources_cache_dir is None:
+        sources_cache_dir = get_sources_cache_dir()
+    try:
+        with open(os.path.join(sources_cache_dir, CACHE_SKIPPED_DISTROS), 'r') as f:
+            return f.read().split()
+    except (IOError, OSError):
+        return []
+
+
 def load_cached_sources_list(sources_cache_dir=None, verbose=False):
     """
     Load cached data based on the sources list.
@@ -575,6 +759,126 @@ def load_cached_sources_list(sources_cache_dir=None, verbose=False):
     return parse_sources_data(cache_data, origin=cache_index, model=model)
 
 
+def _get_cache_stamp(sources_cache_dir, cache_data):
+    """
+    Compute a stamp of the cache index and of the cache files it
+    refers to.  The stamp changes whenever any of these files are
+    rewritten.
+
+    :param cache_data: contents of the cache index, ``str``
+    :returns: stamp, ``[str, (str, int, int)]``
+    """
+    stamp = [cache_data]
+    for source in parse_sources_data(cache_data):
+        filepath = get_cache_filepath(sources_cache_dir, source.url)
+        for path in (filepath + KEY_INDEX_CACHE_EXT, filepath + PICKLE_CACHE_EXT, filepath):
+            try:
+                st = os.stat(path)
+            except OSError:
+                stamp.append((path, None, None))
+            else:
+                stamp.append((path, st.st_mtime_ns, st.st_size))
+    return stamp
+
+
+def get_cache_digest(sources_cache_dir, urls):
+    """
+    Compute a digest of the sources cache that identifies the rosdep
+    data of the cached sources *urls*.  The digest changes whenever
+    ``rosdep update`` rewrites the cache.
+
+    :param urls: URLs of the sources in precedence order, ``[str]``
+    :returns: hex digest, ``str``
+    """
+    if sources_cache_dir is None:
+        sources_cache_dir = get_sources_cache_dir()
+    cache_data = _read_cache_index(sources_cache_dir)
+    if cache_data is None:
+        cache_data = ''
+    stamp = _get_cache_stamp(sources_cache_dir, cache_data)
+    return hashlib.sha256(repr((stamp, list(urls))).encode('utf-8')).hexdigest()
+
+
+def _read_cache_index(sources_cache_dir):
+    """
+    :returns: contents of the cache index or ``None`` if it does not exist
+    """
+    try:
+        with open(os.path.join(sources_cache_dir, CACHE_INDEX), 'r') as f:
+            return f.read()
+    except (IOError, OSError):
+        return None
+
+
+def write_cache_snapshot(matcher, sources_cache_dir=None):
+    """
+    Compile the cached sources matching *matcher* into a single
+    snapshot file, in the precedence order of the cache index.  The
+    snapshot lets :meth:`SourcesListLoader.create_default` read one
+    file instead of one file per source.
+
+    :param matcher: :class:`DataSourceMatcher`
+    :param sources_cache_dir: override sources cache directory
+    :returns: path to the snapshot file, ``str``
+    :raises: :exc:`OSError` if cache cannot be read or written
+    :raises: :exc:`IOError` if cache cannot be read or written
+    """
+    if sources_cache_dir is None:
+        sources_cache_dir = get_sources_cache_dir()
+    cache_data = _read_cache_index(sources_cache_dir)
+    if cache_data is None:
+        cache_data = ''
+    # stamp before loading so that a concurrent update leaves the snapshot stale
+    header = {
+        'version': CACHE_SNAPSHOT_VERSION,
+        'tags': sorted(matcher.tags),
+        'stamp': _get_cache_stamp(sources_cache_dir, cache_data),
+    }
+    model = cache_data_source_loader(sources_cache_dir)
+    sources = [
+        (x.type, x.url, x.tags, x.rosdep_data, x.origin)
+        for x in parse_sources_data(cache_data, model=model) if matcher.matches(x)]
+    snapshot_file = os.path.join(sources_cache_dir, CACHE_SNAPSHOT)
+    # two pickles so that readers can check the header without loading the data
+    write_atomic_if_changed(snapshot_file, pickle.dumps(header, 2) + pickle.dumps(sources, 2), True)
+    return snapshot_file
+
+
+def load_cache_snapshot(matcher, sources_cache_dir=None, verbose=False):
+    """
+    Load the cache snapshot written by :func:`write_cache_snapshot`.
+
+    :param matcher: :class:`DataSourceMatcher`
+    :param sources_cache_dir: override sources cache directory
+    :returns: list of :class:`CachedDataSource` matching *matcher*,
+        or ``None`` if there is no snapshot for *matcher* or it is
+        older than the cache files.
+    """
+    if sources_cache_dir is None:
+        sources_cache_dir = get_sources_cache_dir()
+    snapshot_file = os.path.join(sources_cache_dir, CACHE_SNAPSHOT)
+    try:
+        with open(snapshot_file, 'rb') as f:
+            header = pickle.load(f)
+            if header.get('version') != CACHE_SNAPSHOT_VERSION or \
+                    header.get('tags') != sorted(matcher.tags):
+                if verbose:
+                    print('cache snapshot does not match current tags', file=sys.stderr)
+                return None
+            cache_data = _read_cache_index(sources_cache_dir)
+            if cache_data is None or header.get('stamp') != _get_cache_stamp(sources_cache_dir, cache_data):
+                if verbose:
+                    print('cache snapshot is out of date', file=sys.stderr)
+                return None
+            sources = pickle.load(f)
+    except (IOError, OSError, EOFError, pickle.UnpicklingError, AttributeError):
+        # missing or unreadable snapshot, fall back to the per source cache
+        return None
+    if verbose:
+        print('loading cache snapshot:\n\t%s' % (snapshot_file), file=sys.stderr)
+    return [CachedDataSource(*x) for x in sources]
+
+
 class SourcesListLoader(RosdepLoader):
     """
     SourcesList loader implements the general RosdepLoader API.  This
@@ -598,6 +902,15 @@ class SourcesListLoader(RosdepLoader):
         """
         self.sources = sources
 
+    def close(self):
+        """
+        Close the key indexes that back the data of the sources.  The
+        loader must not be used afterwards.
+        """
+        for source in self.sources:
+            if isinstance(source.rosdep_data, KeyIndex):
+                source.rosdep_data.close()
+
     @staticmethod
     def create_default(matcher=None, sources_cache_dir=None, os_override=None, verbose=False):
         """
@@ -610,6 +923,12 @@ class SourcesListLoader(RosdepLoader):
         if verbose:
             print('using matcher with tags [%s]' % (', '.join(matcher.tags)), file=sys.stderr)
 
+        sources = load_cache_snapshot(matcher, sources_cache_dir=sources_cache_dir, verbose=verbose)
+        if sources is not None:
+            if verbose:
+                print('%s sources match current tags' % (len(sources)), file=sys.stderr)
+            return SourcesListLoader(sources)
+
         sources = load_cached_sources_list(sources_cache_dir=sources_cache_dir, verbose=verbose)
         if verbose:
             print('loaded %s sources' % (len(sources)), file=sys.stderr)
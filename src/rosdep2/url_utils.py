@@ -26,31 +26,97 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 from gzip import GzipFile
-from io import BytesIO
 try:
     from urllib.request import urlopen
+    from urllib.error import HTTPError
     from urllib.error import URLError
     import urllib.request as request
 except ImportError:
     from urllib2 import urlopen
+    from urllib2 import HTTPError
     from urllib2 import URLError
     import urllib2 as request
 
 from ._version import __version__
 
+# response headers that identify a version of a resource, mapped to the
+# request headers used to revalidate that version with the server
+CACHE_VALIDATOR_HEADERS = {
+    'ETag': 'If-None-Match',
+    'Last-Modified': 'If-Modified-Since',
+}
 
-def urlopen_gzip(url, **kwargs):
+
+class NotModified(Exception):
+    """
+    The resource has not been modified since the given cache validators
+    were recorded.
+    """
+    pass
+
+
+class _GzipResponse(GzipFile):
+    """
+    Decompress a gzip-encoded response while it is being read, and
+    close the response together with the decompressor.
+    """
+
+    def __init__(self, response):
+        super(_GzipResponse, self).__init__(fileobj=response, mode='rb')
+        self._response = response
+
+    def close(self):
+        try:
+            super(_GzipResponse, self).close()
+        finally:
+            self._response.close()
+
+
+def get_cache_validators(response):
+    """
+    :param response: HTTP response
+    :returns: cache validator response headers of *response*, ``{str: str}``
+    """
+    info = response.info()
+    return dict((k, info.get(k)) for k in CACHE_VALIDATOR_HEADERS if info.get(k))
+
+
+def urlopen_gzip(url, validators=None, **kwargs):
+    """
+    Open *url*, transparently decompressing gzip-encoded HTTP responses.
+
+    :param validators: (optional) cache validators of an earlier response
+      for *url*, as returned by :func:`get_cache_validators`.  They are
+      sent as conditional request headers for http/https URLs.
+    :returns: file-like object which is read from the network as it is
+      consumed.  It has a ``validators`` attribute with the cache
+      validators of the response (empty for non-HTTP URLs).
+    :raises: :exc:`NotModified` if the server reports that *url* has
+      not changed since *validators* were recorded.
+    """
     # http/https URLs need custom requests to specify the user-agent, since some repositories reject
     # requests from the default user-agent.
     if url.startswith('http://') or url.startswith('https://'):
-        url_request = request.Request(url, headers={
+        headers = {
             'Accept-Encoding': 'gzip',
             'User-Agent': 'rosdep/{version}'.format(version=__version__),
-        })
-        response = urlopen(url_request, **kwargs)
+        }
+        for response_header, request_header in CACHE_VALIDATOR_HEADERS.items():
+            if validators and validators.get(response_header):
+                headers[request_header] = validators[response_header]
+        url_request = request.Request(url, headers=headers)
+        try:
+            response = urlopen(url_request, **kwargs)
+        except HTTPError as e:
+            if e.code == 304:
+                raise NotModified(url)
+            raise
+        validators = get_cache_validators(response)
         if response.info().get('Content-Encoding') == 'gzip':
-            buffer = BytesIO(response.read())
-            return GzipFile(fileobj=buffer, mode='rb')
+            response = _GzipResponse(response)
+        response.validators = validators
         return response
 
-    return urlopen(url, **kwargs)
+    response = urlopen(url, **kwargs)
+    response.validators = {}
+    return response
@@ -13,7 +13,11 @@
 # limitations under the License.
 
 import functools
+import gzip
+import hashlib
 import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
 
 try:
     from urllib.parse import urljoin
@@ -76,7 +80,7 @@ def fake_ros_home(tmpdir, request):
 
 
 @pytest.fixture
-def fake_rosdistro_index(request):
+def fake_rosdistro_index(fake_ros_home, request):
     restore_env_vars = {
         'ROSDISTRO_INDEX_URL': os.environ.get('ROSDISTRO_INDEX_URL'),
     }
@@ -91,3 +95,66 @@ def fake_rosdistro_index(request):
 def fake_rosdep(fake_ros_home, fake_rosdep_source, fake_rosdistro_index):
     from rosdep2.sources_list import update_sources_list
     assert update_sources_list()
+
+
+class _RosdepDataRequestHandler(BaseHTTPRequestHandler):
+    """Serve files from ``fake_rosdistro`` with ETag and gzip support."""
+
+    def _get_file(self):
+        # bodies are prepared once so that serving them allocates little
+        if self.path not in self.server.files:
+            path = os.path.join(self.server.root, self.path.lstrip('/'))
+            if not os.path.isfile(path):
+                return None
+            with open(path, 'rb') as f:
+                self.server.add_file(self.path, f.read())
+        return self.server.files[self.path]
+
+    def do_GET(self):  # noqa: N802
+        self.server.requests.append(self.path)
+        served = self._get_file()
+        if served is None:
+            self.send_error(404)
+            return
+        body, gzip_body, etag = served
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        gzipped = 'gzip' in self.headers.get('Accept-Encoding', '')
+        if gzipped:
+            body = gzip_body
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa: A002
+        pass
+
+
+@pytest.fixture
+def fake_rosdistro_server(request):
+    server = HTTPServer(('127.0.0.1', 0), _RosdepDataRequestHandler)
+    server.root = os.path.join(os.path.dirname(__file__), 'fake_rosdistro')
+    server.requests = []
+    server.files = {}
+
+    def add_file(path, body):
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        server.files[path] = (body, gzip.compress(body), etag)
+    server.add_file = add_file
+    server.url = 'http://127.0.0.1:%d' % server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+
+    def shutdown():
+        server.shutdown()
+        server.server_close()
+    request.addfinalizer(shutdown)
+    return server
@@ -43,3 +43,106 @@ def test_create_default_installer_context():
         assert context.get_installer('apt') is not None
         assert 'apt' in context.get_os_installer_keys(OS_UBUNTU)
         assert OsDetect.get_codename == context.get_os_version_type(OS_UBUNTU)
+
+
+def test_create_default_installer_context_lazy():
+    import importlib
+    import rosdep2
+    from rosdep2.installers import InstallerContext
+
+    # registering all platform modules up front gives the same context
+    context = rosdep2.create_default_installer_context()
+    context.set_os_override('ubuntu', 'jammy')
+    eager = InstallerContext()
+    eager.set_os_override('ubuntu', 'jammy')
+    modules = [importlib.import_module('rosdep2.platforms.' + m[0]) for m in rosdep2._PLATFORM_MODULES]
+    for m in modules:
+        m.register_installers(eager)
+    for m in modules:
+        if hasattr(m, 'register_platforms'):
+            m.register_platforms(eager)
+    assert sorted(context.get_installer_keys()) == sorted(eager.get_installer_keys())
+    assert sorted(context.get_os_keys()) == sorted(eager.get_os_keys())
+    assert context.os_installers == eager.os_installers
+    assert sorted(context.os_version_type) == sorted(eager.os_version_type)
+    assert not context.lazy_installers and not context.lazy_os_keys and not context.lazy_os_aliases
+
+
+def test_create_default_installer_context_installers():
+    import rosdep2
+    from rospkg.os_detect import OS_UBUNTU, OsDetect
+
+    # the registration tables include the modules that are not loaded yet
+    context = rosdep2.create_default_installer_context()
+    assert 'apt' in context.installers
+    context = rosdep2.create_default_installer_context()
+    assert 'apt' in context.os_installers[OS_UBUNTU]
+    context = rosdep2.create_default_installer_context()
+    assert context.os_version_type[OS_UBUNTU] == OsDetect.get_codename
+    context = rosdep2.create_default_installer_context()
+    assert context.default_os_installer[OS_UBUNTU](context.os_detect) == 'apt'
+
+
+def test_create_default_installer_context_modules():
+    import importlib
+    from unittest.mock import Mock, patch
+    import rospkg.os_detect
+    from rospkg.os_detect import OsDetect
+    import rosdep2
+    from rosdep2.installers import InstallerContext
+
+    # the keys and aliases of the lazy modules match their registration
+    os_names = set(['slackware'] + [v for k, v in vars(rospkg.os_detect).items() if k.startswith('OS_')])
+    modules = [(importlib.import_module('rosdep2.platforms.' + m[0]),) + m[1:] for m in rosdep2._PLATFORM_MODULES]
+    for module, installer_keys, os_keys, os_aliases in modules:
+        context = InstallerContext()
+        module.register_installers(context)
+        assert sorted(context.get_installer_keys()) == sorted(installer_keys), module.__name__
+        aliases = []
+        for os_name in os_names:
+            detector = Mock()
+            detector.is_os.return_value = True
+            detector.get_version.return_value = '9.1'
+            detector.get_codename.return_value = 'jammy'
+            context = InstallerContext(OsDetect([(os_name, detector)]))
+            for m in modules:
+                m[0].register_installers(context)
+            if hasattr(module, 'register_platforms'):
+                with patch('rosdep2.platforms.debian.read_os_release', return_value={'VERSION': '21 (bullseye)'}):
+                    module.register_platforms(context)
+            assert sorted(context.get_os_keys()) == sorted(os_keys), module.__name__
+            if context.os_override:
+                aliases.append(os_name)
+        assert sorted(aliases) == sorted(os_aliases), module.__name__
+
+
+def test_create_default_installer_context_imports():
+    import subprocess
+    import rosdep2
+
+    # only the modules of the OS in use are imported
+    code = '; '.join([
+        'import sys, rosdep2',
+        'context = rosdep2.create_default_installer_context()',
+        'context.set_os_override("ubuntu", "jammy")',
+        'context.get_os_installer_keys("ubuntu")',
+        'print(" ".join(sorted(m for m in sys.modules if m.startswith("rosdep2.platforms."))))',
+    ])
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(rosdep2.__file__)))
+    output = subprocess.check_output([sys.executable, '-c', code], env=env)
+    assert output.decode('utf-8').split() == [
+        'rosdep2.platforms.debian', 'rosdep2.platforms.gem', 'rosdep2.platforms.npm',
+        'rosdep2.platforms.pip', 'rosdep2.platforms.source']
+
+
+def test_create_default_installer_context_alias():
+    from unittest.mock import Mock
+    import rosdep2
+
+    # detecting an alias registers the module that aliases it
+    context = rosdep2.create_default_installer_context()
+    context.os_detect = Mock()
+    context.os_detect.get_name.return_value = 'linaro'
+    context.os_detect.get_codename.return_value = 'jammy'
+    assert context.get_os_name_and_version() == ('ubuntu', 'jammy')
+    assert 'apt' in context.get_os_installer_keys('ubuntu')
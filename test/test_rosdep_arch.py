@@ -29,7 +29,7 @@
 
 import os
 import traceback
-from unittest.mock import Mock, patch
+from unittest.mock import ANY, Mock, patch
 
 
 def get_test_dir():
@@ -37,6 +37,28 @@ def get_test_dir():
     return os.path.abspath(os.path.join(os.path.dirname(__file__), 'arch'))
 
 
+def test_pacman_detect():
+    from rosdep2.platforms.arch import pacman_detect
+
+    def popen(returncode, std_out):
+        m = Mock(returncode=returncode)
+        m.communicate.return_value = (std_out, b'')
+        return Mock(return_value=m)
+
+    with patch('rosdep2.platforms.arch.subprocess.Popen', popen(0, b'')) as m:
+        assert pacman_detect([]) == []
+        assert not m.called
+        assert pacman_detect(['b', 'a']) == ['b', 'a']
+        m.assert_called_once_with(['pacman', '-T', 'a', 'b'], stdout=ANY, stderr=ANY)
+
+    with patch('rosdep2.platforms.arch.subprocess.Popen', popen(127, b'b\nc>=2\n')) as m:
+        assert pacman_detect(['c>=2', 'b', 'a']) == ['a']
+        m.assert_called_once()
+
+    with patch('rosdep2.platforms.arch.subprocess.Popen', popen(1, b'')):
+        assert pacman_detect(['a']) == []
+
+
 def test_PacmanInstaller():
     from rosdep2.platforms.arch import PacmanInstaller
 
@@ -29,7 +29,7 @@
 
 import os
 import traceback
-from unittest.mock import patch
+from unittest.mock import Mock, patch
 
 
 def get_test_dir():
@@ -37,6 +37,23 @@ def get_test_dir():
     return os.path.abspath(os.path.join(os.path.dirname(__file__), 'cygwin'))
 
 
+def test_cygcheck_detect():
+    from rosdep2.platforms.cygwin import cygcheck_detect
+
+    m = Mock(return_value='')
+    assert cygcheck_detect([], exec_fn=m) == []
+    assert not m.called
+
+    m = Mock(return_value="""Cygwin Package Information
+Package              Version        Status
+bash                 4.4.12-3       OK
+python3              3.9.10-1       Incomplete
+""")
+    val = cygcheck_detect(['python3', 'bash', 'gcc-core'], exec_fn=m)
+    assert val == ['bash'], val
+    m.assert_called_once_with(['cygcheck', '-c', 'bash', 'gcc-core', 'python3'])
+
+
 def test_AptCygInstaller():
     from rosdep2.platforms.cygwin import AptCygInstaller
 
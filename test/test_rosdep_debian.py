@@ -28,14 +28,61 @@
 # Author Ken Conley/kwc@willowgarage.com
 
 import os
+import timeit
 import traceback
 from unittest.mock import Mock, patch, call
 
+import pytest
+
 
 def get_test_dir():
     return os.path.abspath(os.path.join(os.path.dirname(__file__), 'debian'))
 
 
+def write_dpkg_status(admindir, count):
+    """
+    Write a dpkg status file with *count* packages.  Every third package
+    is not installed and every tenth one provides a virtual package.
+    """
+    with open(os.path.join(admindir, 'status'), 'w') as f:
+        for i in range(count):
+            f.write('Package: pkg%d\n' % i)
+            f.write('Status: %s\n' % ('deinstall ok config-files' if i % 3 == 0 else 'install ok installed'))
+            f.write('Priority: optional\nSection: libs\nInstalled-Size: %d\n' % (i * 7))
+            f.write('Architecture: amd64\nVersion: %d.%d-1\n' % (i % 5, i))
+            if i % 10 == 1:
+                f.write('Provides: virtual%d (= 1.0), other-virtual%d\n' % (i, i))
+            f.write('Depends: libc6 (>= 2.34), pkg%d\n' % ((i + 1) % count))
+            f.write('Description: fake package %d\n a longer description\n .\n Package: not a field\n\n' % i)
+
+
+def read_stdout_showpkg(virtual):
+    """
+    :returns: fake ``read_stdout`` for ``apt-cache showpkg`` that reports
+      the packages in *virtual* as virtual packages and all others as
+      real packages
+    """
+    def read_stdout(cmd, capture_stderr=False):
+        assert cmd[:2] == ['apt-cache', 'showpkg'], cmd
+        lines = []
+        for p in cmd[2:]:
+            lines += ['Package: %s' % p, 'Versions: ']
+            if p in virtual:
+                lines += ['', 'Reverse Depends: ', 'Dependencies: ', 'Provides: ', 'Reverse Provides: ', 'provider 1.0 (= )']
+            else:
+                lines += ['1.0 (/var/lib/dpkg/status)', '', 'Reverse Provides: ']
+        return '\n'.join(lines) + '\n'
+    return read_stdout
+
+
+@pytest.fixture
+def dpkg_admindir(tmpdir, monkeypatch):
+    admindir = str(tmpdir)
+    write_dpkg_status(admindir, 5000)
+    monkeypatch.setenv('DPKG_ADMINDIR', admindir)
+    return admindir
+
+
 def test_dpkg_detect():
     from rosdep2.platforms.debian import dpkg_detect
 
@@ -76,6 +123,121 @@ def test_dpkg_detect():
         assert mock_read_stdout.call_args_list[1] == call(['apt-cache', 'showpkg', 'tinyxml-dev'])
 
 
+def test_dpkg_detect_virtual():
+    from rosdep2.platforms.debian import dpkg_detect
+
+    with open(os.path.join(get_test_dir(), 'showpkg-curl-wget-libcurl-dev'), 'r') as f:
+        showpkg_content = f.read()
+
+    # providers of all virtual packages are checked with a single dpkg-query call
+    with patch('rosdep2.platforms.debian.read_stdout') as mock_read_stdout:
+        mock_read_stdout.side_effect = [
+            ("'wget install ok installed\n'", ''),
+            showpkg_content,
+            ("'libcurl4-openssl-dev install ok installed\n'", ''),
+        ]
+        val = dpkg_detect(['wget', 'curl', 'libcurl-dev', 'ros-kinetic-rc-genicam-api'])
+        assert val == ['wget', 'libcurl-dev'], val
+        assert mock_read_stdout.call_count == 3
+        assert mock_read_stdout.call_args_list[1] == call(['apt-cache', 'showpkg', 'curl', 'libcurl-dev',
+                                                           'ros-kinetic-rc-genicam-api'])
+        assert mock_read_stdout.call_args_list[2] == call(['dpkg-query', '-W', "-f='${Package} ${Status}\n'",
+                                                           'libcurl4-gnutls-dev', 'libcurl4-nss-dev',
+                                                           'libcurl4-openssl-dev'], True)
+
+
+def test_read_dpkg_status():
+    from rosdep2.platforms.debian import read_dpkg_status
+
+    installed, provided = read_dpkg_status(get_test_dir())
+    assert installed == {
+        'apt': '2.4.11',
+        'libcurl4-openssl-dev': '7.81.0-1ubuntu1.15',
+        'python3-yaml': '5.4.1-1ubuntu1',
+        'wget': '1.21.2-2ubuntu1',
+    }, installed
+    assert provided == {
+        'apt-transport-https': ['apt'],
+        'libcurl-dev': ['libcurl4-openssl-dev'],
+        'libcurl-ssl-dev': ['libcurl4-openssl-dev'],
+        'python3-yaml-abi': ['python3-yaml'],
+        'python3.10-yaml': ['python3-yaml'],
+    }, provided
+
+
+def test_dpkg_status_detect():
+    from rosdep2.platforms.debian import dpkg_status_detect
+
+    with patch('rosdep2.platforms.debian.read_stdout') as mock_read_stdout:
+        mock_read_stdout.side_effect = read_stdout_showpkg({'libcurl-dev'})
+        # apt-transport-https is provided by apt, but it is a real package that is not installed
+        val = dpkg_status_detect(['apt=2.4*', 'tinyxml-dev', 'libeigen3-dev', 'libcurl-dev', 'apt-transport-https', 'wget', 'curl'],
+                                 admindir=get_test_dir())
+        assert val == ['apt=2.4*', 'libcurl-dev', 'wget'], val
+        # only the provided packages are looked up, with a single call
+        mock_read_stdout.assert_called_once_with(['apt-cache', 'showpkg', 'libcurl-dev', 'apt-transport-https'])
+
+        mock_read_stdout.reset_mock()
+        assert dpkg_status_detect(['apt', 'wget'], admindir=get_test_dir()) == ['apt', 'wget']
+        assert dpkg_status_detect([], admindir=get_test_dir()) == []
+        assert not mock_read_stdout.called
+
+
+def test_dpkg_status_detect_shared(dpkg_admindir):
+    from rosdep2.platforms import debian
+    from rosdep2.platforms.debian import AptInstaller, dpkg_status_detect, get_dpkg_admindir, read_dpkg_status
+
+    assert get_dpkg_admindir() == dpkg_admindir
+    installed, provided = read_dpkg_status(dpkg_admindir)
+    assert len(installed) == 3333
+    assert len(provided) == 2 * 334
+
+    pkgs = ['pkg%d' % i for i in range(0, 5000, 7)] + ['virtual11', 'virtual21', 'other-virtual31', 'virtual12']
+    expected = ['pkg%d' % i for i in range(0, 5000, 7) if i % 3] + ['virtual11', 'other-virtual31']
+    with patch('rosdep2.platforms.debian.read_stdout') as mock_read_stdout, \
+            patch('rosdep2.platforms.debian.read_dpkg_status', wraps=read_dpkg_status) as mock_read_dpkg_status:
+        mock_read_stdout.side_effect = read_stdout_showpkg({'virtual11', 'other-virtual31'})
+        assert dpkg_status_detect(pkgs) == expected
+        # version locks must match the installed version
+        assert dpkg_status_detect(['pkg1=1.1-1', 'pkg2=2.*', 'pkg4=1.*', 'pkg5=1.5-1', 'virtual11=1.0']) == ['pkg1=1.1-1', 'pkg2=2.*']
+
+        # the database is read once and shared by all installers
+        installer = AptInstaller()
+        assert installer.get_packages_to_install(pkgs) == [p for p in pkgs if p not in expected]
+        assert installer.is_installed('pkg1')
+        assert not AptInstaller().is_installed('pkg3')
+        assert mock_read_dpkg_status.call_count == 1
+        # apt-cache is only asked about provided packages that are not installed
+        assert mock_read_stdout.call_count == 2
+
+        # and read again once dpkg has changed it
+        write_dpkg_status(dpkg_admindir, 10)
+        assert not installer.is_installed('pkg20')
+        assert mock_read_dpkg_status.call_count == 2
+
+    # without a status file, dpkg-query is used
+    debian._dpkg_status_cache.clear()
+    os.remove(os.path.join(dpkg_admindir, 'status'))
+    with patch('rosdep2.platforms.debian.read_stdout') as mock_read_stdout:
+        mock_read_stdout.side_effect = [("'pkg1 install ok installed\n'", ''), '']
+        assert AptInstaller().get_packages_to_install(['pkg1', 'pkg3']) == ['pkg3']
+        assert mock_read_stdout.call_count == 2
+
+
+@pytest.mark.benchmark
+def test_benchmark_dpkg_status_detect(dpkg_admindir):
+    from rosdep2.platforms import debian
+    from rosdep2.platforms.debian import dpkg_status_detect, read_dpkg_status
+
+    pkgs = ['pkg%d' % i for i in range(0, 5000, 17)]
+    debian._dpkg_status_cache.clear()
+    read_time = min(timeit.repeat(lambda: read_dpkg_status(dpkg_admindir), number=1, repeat=3))
+    detect_time = min(timeit.repeat(lambda: dpkg_status_detect(pkgs), number=100, repeat=3)) / 100
+    print('read 5000 packages: %.4fs, detect %d packages: %.6fs' % (read_time, len(pkgs), detect_time))
+    assert read_time < 1.0
+    assert detect_time < read_time
+
+
 def test_read_apt_cache_showpkg():
     from rosdep2.platforms.debian import _read_apt_cache_showpkg
 
@@ -27,6 +27,52 @@
 
 # Author William Woodall/wjwwood@gmail.com
 
+import random
+import sys
+import timeit
+
+import pytest
+
+
+def make_graph(dependencies, installer_key=lambda key: 'apt'):
+    from rosdep2.dependency_graph import DependencyGraph
+    dg = DependencyGraph()
+    for key, deps in dependencies:
+        dg[key]['installer_key'] = installer_key(key)
+        dg[key]['install_keys'] = [key.lower()]
+        dg[key]['dependencies'] = list(deps)
+    return dg
+
+
+def make_layered_graph(count, fanout=3, seed=0):
+    # every key depends on up to *fanout* keys defined before it
+    rng = random.Random(seed)
+    return [('k%d' % i, ['k%d' % rng.randrange(i) for _ in range(min(i, fanout))]) for i in range(count)]
+
+
+def get_ordered_dependency_list_reference(dg):
+    # the expansion of every root that get_ordered_dependency_list preserves
+    def get_ordered_uninstalled(key):
+        uninstalled = []
+        for dependency in dg[key]['dependencies']:
+            uninstalled.extend(get_ordered_uninstalled(dependency))
+        uninstalled.append((dg[key]['installer_key'], dg[key]['install_keys']))
+        return uninstalled
+    dep_list = []
+    for key in dg:
+        if dg[key]['is_root']:
+            dep_list.extend(get_ordered_uninstalled(key))
+    result = []
+    for item in dep_list:
+        if item not in result and item[1] != []:
+            result.append(item)
+    squashed_result = []
+    for installer_key, resolved in result:
+        if not squashed_result or squashed_result[-1][0] != installer_key:
+            squashed_result.append((installer_key, []))
+        squashed_result[-1][1].extend(resolved)
+    return squashed_result
+
 
 def test_DependencyGraph_Linear():
     from rosdep2.dependency_graph import DependencyGraph
@@ -175,3 +221,80 @@ def test_DependencyGraph_Realworld():
     result = dg.get_ordered_dependency_list()
     expected = [('homebrew', ['pkg-config']), ('pip', ['matplotlib'])]
     assert result == expected, 'Results did not match expectations: %s == %s' % (str(result), str(expected))
+
+
+def test_DependencyGraph_Diamond():
+    # shared dependency below two branches is not a cycle: A-B-D, A-C-D
+    dg = make_graph([('A', ['B', 'C']), ('B', ['D']), ('C', ['D']), ('D', [])])
+    assert dg.get_ordered_dependency_list() == [('apt', ['d', 'b', 'c', 'a'])]
+
+
+def test_DependencyGraph_Order():
+    installers = ['apt', 'pip', 'source']
+    for seed in range(50):
+        rng = random.Random(seed)
+        dependencies = make_layered_graph(rng.randrange(1, 30), fanout=rng.randrange(4), seed=seed)
+        # insertion order of the graph does not follow the dependencies
+        rng.shuffle(dependencies)
+        dg = make_graph(dependencies, installer_key=lambda key: installers[int(key[1:]) % 3])
+        # duplicate and empty install keys are dropped
+        dg[dependencies[0][0]]['install_keys'] = []
+        dg[dependencies[-1][0]]['install_keys'] = list(dg[dependencies[0][0]]['install_keys'])
+        result = dg.get_ordered_dependency_list()
+        assert result == get_ordered_dependency_list_reference(dg), seed
+
+
+def test_DependencyGraph_Long_Chain():
+    count = sys.getrecursionlimit() * 2
+    dg = make_graph([('k%d' % i, ['k%d' % (i + 1)] if i + 1 < count else []) for i in range(count)])
+    result = dg.get_ordered_dependency_list()
+    assert result == [('apt', ['k%d' % i for i in reversed(range(count))])]
+
+    dg['k%d' % (count - 1)]['dependencies'] = ['k0']
+    with pytest.raises(AssertionError):
+        dg.get_ordered_dependency_list()
+
+
+def test_DependencyGraph_Group_By_Installer():
+    installers = {'a': 'apt', 'p': 'pip'}
+    dg = make_graph([
+        ('a1', []), ('p1', []), ('a2', []), ('p2', ['a3']), ('a3', []), ('a4', ['p2'])],
+        installer_key=lambda key: installers[key[0]])
+    assert dg.get_ordered_dependency_list() == [
+        ('apt', ['a1']), ('pip', ['p1']), ('apt', ['a2', 'a3']), ('pip', ['p2']), ('apt', ['a4'])]
+    assert dg.get_ordered_dependency_list(group_by_installer=True) == [
+        ('apt', ['a1', 'a2', 'a3']), ('pip', ['p1', 'p2']), ('apt', ['a4'])]
+
+    assert dg.get_ordered_dependency_levels() == [
+        [('apt', ['a1', 'a2', 'a3']), ('pip', ['p1'])], [('pip', ['p2'])], [('apt', ['a4'])]]
+
+
+def test_DependencyGraph_Group_By_Installer_Order():
+    installers = ['apt', 'pip', 'source']
+    for seed in range(50):
+        rng = random.Random(seed)
+        dependencies = make_layered_graph(rng.randrange(1, 40), fanout=rng.randrange(4), seed=seed)
+        rng.shuffle(dependencies)
+        dg = make_graph(dependencies, installer_key=lambda key: installers[rng.randrange(3)])
+        result = dg.get_ordered_dependency_list(group_by_installer=True)
+        assert len(result) <= len(dg.get_ordered_dependency_list()), seed
+        # every key is still installed after its dependencies
+        positions = {}
+        for i, (installer_key, install_keys) in enumerate(result):
+            for j, install_key in enumerate(install_keys):
+                positions[install_key] = (i, j)
+        assert len(positions) == len(dependencies)
+        for key, deps in dependencies:
+            assert result[positions[key][0]][0] == dg[key]['installer_key']
+            for dep in deps:
+                assert positions[dep] < positions[key], (seed, key, dep)
+
+
+@pytest.mark.benchmark
+def test_benchmark_DependencyGraph():
+    layered = make_layered_graph(20000)
+    chain = [('k%d' % i, ['k%d' % (i + 1)] if i + 1 < 20000 else []) for i in range(20000)]
+    for name, dependencies in [('layered', layered), ('chain', chain)]:
+        elapsed = min(timeit.repeat(lambda: make_graph(dependencies).get_ordered_dependency_list(), number=1, repeat=3))
+        print('%s graph of %d keys: %.4fs' % (name, len(dependencies), elapsed))
+        assert elapsed < 2.0
@@ -50,6 +50,11 @@ def test_pkg_detect():
     val = pkg_detect(['tinyxml'], exec_fn=m)
     assert val == [], val
 
+    m = Mock(return_value='tinyxml tinyxml-2.6.2_1 textproc/tinyxml\npython39 python39-3.9.18 lang/python39\n')
+    val = pkg_detect(['tinyxml', 'builtin', 'python39-3.9.18', 'lang/python39', 'python'], exec_fn=m)
+    assert val == ['tinyxml', 'builtin', 'python39-3.9.18', 'lang/python39'], val
+    m.assert_called_once_with(['/usr/sbin/pkg', 'query', '%n %n-%v %o'])
+
 
 def test_PkgInstaller():
     from rosdep2.platforms.freebsd import PkgInstaller
@@ -26,6 +26,9 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 import os
+import pickle
+import timeit
+from unittest.mock import patch
 try:
     from urllib.request import urlopen
 except ImportError:
@@ -71,6 +74,59 @@ def test_get_gbprepo_as_rosdep_data():
         pass
 
 
+def get_large_release_file(count=3000):
+    from rosdep2.rosdistrohelper import ReleaseFile
+    return ReleaseFile._from_data({
+        'repositories': dict(
+            ('repo_%d' % (i // 3), {'url': 'https://example.com/repo_%d.git' % (i // 3), 'packages': ['pkg_%d' % j for j in range(i, i + 3)]})
+            for i in range(0, count, 3)),
+        'platforms': {'debian': ['bookworm'], 'rhel': ['8', '9'], 'ubuntu': ['jammy', 'noble'], 'osx': ['sonoma']},
+    })
+
+
+def test_get_gbprepo_as_rosdep_data_compact():
+    from rosdep2.gbpdistro_support import get_gbprepo_as_rosdep_data, RosDistroRosdepData
+    with patch('rosdep2.gbpdistro_support.get_release_file') as get_release_file:
+        get_release_file.return_value = get_large_release_file(6)
+        with patch.dict(os.environ, {'ROSDEP_HOMEBREW_TAP': 'tap'}):
+            data = get_gbprepo_as_rosdep_data('humble')
+    assert isinstance(data, RosDistroRosdepData)
+    assert len(data) == 6
+    assert list(data) == ['pkg_%d' % i for i in range(6)]
+    assert 'pkg_5' in data
+    assert 'pkg_6' not in data
+    assert data['pkg_4'] == {
+        'debian': {'bookworm': {'apt': {'packages': ['ros-humble-pkg-4']}}},
+        'rhel': {'8': {'dnf': {'packages': ['ros-humble-pkg-4']}}, '9': {'dnf': {'packages': ['ros-humble-pkg-4']}}},
+        'ubuntu': {'jammy': {'apt': {'packages': ['ros-humble-pkg-4']}}, 'noble': {'apt': {'packages': ['ros-humble-pkg-4']}}},
+        'osx': {'homebrew': {'packages': ['tap/humble/repo_1']}, 'sonoma': {'homebrew': {'packages': ['ros-humble-pkg-4']}}},
+        '_is_ros': True,
+    }
+    # definitions are not shared between lookups
+    assert data['pkg_4'] is not data['pkg_4']
+    with pytest.raises(KeyError):
+        data['pkg_6']
+    assert data.copy() is data
+    assert pickle.loads(pickle.dumps(data)) == dict(data)
+
+
+@pytest.mark.benchmark
+def test_benchmark_get_gbprepo_as_rosdep_data():
+    from rosdep2.gbpdistro_support import get_gbprepo_as_rosdep_data
+    with patch('rosdep2.gbpdistro_support.get_release_file') as get_release_file:
+        get_release_file.return_value = get_large_release_file()
+        data = get_gbprepo_as_rosdep_data('humble')
+        compact_time = min(timeit.repeat(lambda: get_gbprepo_as_rosdep_data('humble'), number=5, repeat=3))
+    # the expanded data is what get_gbprepo_as_rosdep_data returned before
+    expanded_time = min(timeit.repeat(lambda: dict(data), number=5, repeat=3))
+    compact_size = len(pickle.dumps(data, 2))
+    expanded_size = len(pickle.dumps(dict(data), 2))
+    print('compact: %.4fs %d bytes, expanded: %.4fs %d bytes' % (
+        compact_time, compact_size, expanded_time, expanded_size))
+    assert compact_time < expanded_time
+    assert compact_size * 5 < expanded_size
+
+
 @pytest.mark.online
 def test_download_gbpdistro_as_rosdep_data():
     from rosdep2.gbpdistro_support import download_gbpdistro_as_rosdep_data
@@ -29,7 +29,7 @@
 
 import os
 import traceback
-from unittest.mock import Mock, patch
+from unittest.mock import call, Mock, patch
 
 import rospkg.os_detect
 
@@ -93,79 +93,84 @@ def test_portage_available():
 
     os.path.exists = original_exists
 
-# This actually tests portage_detect_single and portage_detect
 
+def make_vdb(tmpdir, entries):
+    vdb = tmpdir.mkdir('pkg')
+    for entry in entries:
+        category, pf = entry.split('/')
+        vdb.ensure(category, pf, dir=True)
+    return str(vdb)
+
+
+def test_portage_read_vdb(tmpdir):
+    from rosdep2.platforms.gentoo import portage_read_vdb
+
+    vdb_path = make_vdb(tmpdir, [
+        'dev-libs/tinyxml-2.6.2-r1',
+        'dev-lang/python-2.7.2-r3',
+        'dev-lang/python-3.2.2',
+        'media-fonts/font-adobe-100dpi-1.0.3',
+        'sys-devel/gcc-4.5.3_p20120105-r2',
+    ])
+    assert portage_read_vdb(vdb_path) == {
+        'tinyxml', 'dev-libs/tinyxml',
+        'python', 'dev-lang/python',
+        'font-adobe-100dpi', 'media-fonts/font-adobe-100dpi',
+        'gcc', 'sys-devel/gcc',
+    }
+    assert portage_read_vdb(str(tmpdir.join('missing'))) is None
 
-def test_portage_detect():
-    if not is_gentoo():
-        print('Skipping not Gentoo')
-        return
 
+# This actually tests portage_get_installed and portage_detect
+def test_portage_detect(tmpdir):
     from rosdep2.platforms.gentoo import portage_detect
 
-    m = Mock()
-    m.return_value = []
+    vdb_path = make_vdb(tmpdir, ['sys-devel/gcc-4.5.3-r2', 'dev-lang/python-2.7.2-r3', 'dev-lang/python-3.2.2'])
 
-    val = portage_detect([], exec_fn=m)
+    m = Mock(return_value=[])
+    val = portage_detect([], exec_fn=m, vdb_path=vdb_path)
     assert val == [], val
+    assert not m.called
 
     # Test checking for a package that we do not have installed
     m = Mock(return_value=[])
-    val = portage_detect(['tinyxml[stl]'], exec_fn=m)
+    val = portage_detect(['tinyxml[stl]'], exec_fn=m, vdb_path=vdb_path)
     assert val == [], 'Result was actually: %s' % val
-    m.assert_called_with(['portageq', 'match', '/', 'tinyxml[stl]'])
+    m.assert_called_once_with(['portageq', 'match', '/', 'tinyxml[stl]'])
 
     # Test checking for a package that we do have installed
     m = Mock(return_value=['dev-libs/tinyxml-2.6.2-r1'])
-    val = portage_detect(['tinyxml[stl]'], exec_fn=m)
+    val = portage_detect(['tinyxml[stl]'], exec_fn=m, vdb_path=vdb_path)
     assert val == ['tinyxml[stl]'], 'Result was actually: %s' % val
-    m.assert_called_with(['portageq', 'match', '/', 'tinyxml[stl]'])
-
-    # Test checking for two packages that we have installed
-    m = Mock(side_effect=[['sys-devel/gcc-4.5.3-r2'], ['dev-libs/tinyxml-2.6.2-r1']])
-    val = portage_detect(['tinyxml[stl]', 'gcc'], exec_fn=m)
-    assert val == ['gcc', 'tinyxml[stl]'], 'Result was actually: %s' % val
-    m.assert_any_call(['portageq', 'match', '/', 'tinyxml[stl]'])
-    m.assert_any_call(['portageq', 'match', '/', 'gcc'])
-
-    # Test checking for two missing packages
-    m = Mock(side_effect=[[], []])
+    m.assert_called_once_with(['portageq', 'match', '/', 'tinyxml[stl]'])
 
-    val = portage_detect(['tinyxml[stl]', 'gcc'], exec_fn=m)
-    assert val == [], 'Result was actually: %s' % val
-    m.assert_any_call(['portageq', 'match', '/', 'tinyxml[stl]'])
-    m.assert_any_call(['portageq', 'match', '/', 'gcc'])
+    # Plain package names are looked up in the package database
+    m = Mock(return_value=[])
+    val = portage_detect(['tinyxml', 'gcc', 'sys-devel/gcc', 'dev-libs/gcc'], exec_fn=m, vdb_path=vdb_path)
+    assert val == ['gcc', 'sys-devel/gcc'], 'Result was actually: %s' % val
+    assert not m.called
 
     # Test checking for one missing, one installed package
-    m = Mock(side_effect=[['sys-devel/gcc-4.5.3-r2'], []])
-
-    val = portage_detect(['tinyxml[stl]', 'gcc'], exec_fn=m)
+    m = Mock(return_value=[])
+    val = portage_detect(['tinyxml[stl]', 'gcc'], exec_fn=m, vdb_path=vdb_path)
     assert val == ['gcc'], 'Result was actually: %s' % val
-    m.assert_any_call(['portageq', 'match', '/', 'tinyxml[stl]'])
-    m.assert_any_call(['portageq', 'match', '/', 'gcc'])
-
-    # Test checking for one installed, one missing package (reverse order)
-    m = Mock(side_effect=[[], ['dev-libs/tinyxml-2.6.2-r1']])
-
-    val = portage_detect(['tinyxml[stl]', 'gcc'], exec_fn=m)
-    assert val == ['tinyxml[stl]'], 'Result was actually: %s' % val
-    m.assert_any_call(['portageq', 'match', '/', 'tinyxml[stl]'])
-    m.assert_any_call(['portageq', 'match', '/', 'gcc'])
+    m.assert_called_once_with(['portageq', 'match', '/', 'tinyxml[stl]'])
 
     # Test duplicates (requesting the same package twice)
-    # TODO what's the desired behavior here
-    m = Mock(side_effect=[['dev-libs/tinyxml-2.6.2-r1'], ['dev-libs/tinyxml-2.6.2-r1']])
-
-    val = portage_detect(['tinyxml[stl]', 'tinyxml[stl]'], exec_fn=m)
+    m = Mock(return_value=['dev-libs/tinyxml-2.6.2-r1'])
+    val = portage_detect(['tinyxml[stl]', 'tinyxml[stl]'], exec_fn=m, vdb_path=vdb_path)
     assert val == ['tinyxml[stl]', 'tinyxml[stl]'], 'Result was actually: %s' % val
-    m.assert_any_call(['portageq', 'match', '/', 'tinyxml[stl]'])
-    # and a second of the same, but any_call won't show that.
+    m.assert_called_once_with(['portageq', 'match', '/', 'tinyxml[stl]'])
 
     # Test packages with multiple slot
-    m = Mock(side_effect=[['dev-lang/python-2.7.2-r3', 'dev-lang/python-3.2.2']])
-    val = portage_detect(['python'], exec_fn=m)
+    val = portage_detect(['python'], exec_fn=m, vdb_path=vdb_path)
     assert val == ['python'], 'Result was actually: %s' % val
-    m.assert_any_call(['portageq', 'match', '/', 'python'])
+
+    # Without a package database, all atoms are matched with portageq
+    m = Mock(side_effect=[['sys-devel/gcc-4.5.3-r2'], []])
+    val = portage_detect(['tinyxml', 'gcc'], exec_fn=m, vdb_path=str(tmpdir.join('missing')))
+    assert val == ['gcc'], 'Result was actually: %s' % val
+    assert m.call_args_list == [call(['portageq', 'match', '/', 'gcc']), call(['portageq', 'match', '/', 'tinyxml'])]
 
 
 def test_PortageInstaller():
@@ -415,6 +415,16 @@ def test_PackageManagerInstaller_get_packages_to_install():
     assert set(['baba', 'cada']) == set(installer.get_packages_to_install(['a', 'baba', 'b', 'cada', 'c']))
 
 
+def test_PackageManagerInstaller_batch_detect():
+    from rosdep2.installers import PackageManagerInstaller
+
+    query_fn = Mock(return_value={'a', 'c'})
+    assert [] == PackageManagerInstaller.batch_detect([], query_fn)
+    assert not query_fn.called
+    assert ['c', 'a', 'c'] == PackageManagerInstaller.batch_detect(['c', 'b', 'a', 'c'], query_fn)
+    query_fn.assert_called_once_with(['a', 'b', 'c'])
+
+
 def test_RosdepInstaller_ctor():
     # tripwire/coverage
     from rosdep2 import create_default_installer_context
@@ -568,6 +578,291 @@ def test_RosdepInstaller_get_uninstalled_unconfigured():
         pass
 
 
+def test_RosdepInstaller_get_uninstalled_snapshot():
+    from rosdep2 import create_default_installer_context
+    from rosdep2.lookup import RosdepLookup
+    from rosdep2.installers import RosdepInstaller, PackageManagerInstaller
+
+    detect_apt = Mock(side_effect=lambda pkgs: [p for p in pkgs if p != 'b'])
+    detect_pip = Mock(return_value=[])
+    context = create_default_installer_context()
+    context.set_installer('apt', PackageManagerInstaller(detect_apt))
+    context.set_installer('pip', PackageManagerInstaller(detect_pip))
+    lookup = Mock(spec=RosdepLookup)
+    lookup.resolve_all.return_value = ([('apt', ['a', 'b']), ('pip', ['c']), ('apt', ['b', 'd'])], {})
+    installer = RosdepInstaller(context, lookup)
+
+    # each installer detects the union of its packages once
+    expected = [('apt', ['b']), ('pip', ['c']), ('apt', ['b'])]
+    assert installer.get_uninstalled(['foo']) == (expected, {})
+    detect_apt.assert_called_once_with(['a', 'b', 'd'])
+    detect_pip.assert_called_once_with(['c'])
+
+    # only new packages are detected
+    lookup.resolve_all.return_value = ([('apt', ['a', 'e'])], {})
+    assert installer.get_uninstalled(['foo']) == ([], {})
+    detect_apt.assert_called_with(['e'])
+    assert detect_apt.call_count == 2
+
+    # a different installer for the same key is not answered from the snapshot
+    detect_apt = Mock(return_value=[])
+    context.set_installer('apt', PackageManagerInstaller(detect_apt))
+    assert installer.get_uninstalled(['foo']) == ([('apt', ['a', 'e'])], {})
+    detect_apt.assert_called_once_with(['a', 'e'])
+
+    # and the snapshot is discarded once something has been installed
+    installer.installed_snapshot.invalidate('apt')
+    assert installer.get_uninstalled(['foo']) == ([('apt', ['a', 'e'])], {})
+    assert detect_apt.call_count == 2
+
+
+def test_RosdepInstaller_get_uninstalled_concurrent():
+    import threading
+    from rosdep2 import create_default_installer_context, RosdepInternalError
+    from rosdep2.lookup import RosdepLookup
+    from rosdep2.installers import RosdepInstaller, PackageManagerInstaller
+
+    # both detect functions have to run at the same time to pass the barrier
+    barrier = threading.Barrier(2, timeout=10)
+
+    def detect_fn(pkgs):
+        barrier.wait()
+        return pkgs[:1]
+    context = create_default_installer_context()
+    context.set_installer('apt', PackageManagerInstaller(detect_fn))
+    context.set_installer('pip', PackageManagerInstaller(detect_fn))
+    lookup = Mock(spec=RosdepLookup)
+    lookup.resolve_all.return_value = ([('pip', ['a', 'b']), ('apt', ['c', 'd']), ('pip', ['e'])], {})
+    installer = RosdepInstaller(context, lookup)
+    expected = [('pip', ['b']), ('apt', ['d']), ('pip', ['e'])]
+    assert installer.get_uninstalled(['foo']) == (expected, {})
+
+    # errors are reported for the first failing installer
+    def bad_detect_fn(pkgs):
+        raise Exception('deadbeef')
+    context.set_installer('apt', PackageManagerInstaller(bad_detect_fn))
+    context.set_installer('pip', PackageManagerInstaller(bad_detect_fn))
+    try:
+        installer.get_uninstalled(['foo'])
+        assert False, 'should have raised'
+    except RosdepInternalError as e:
+        assert '[pip]' in e.message, e.message
+
+
+def test_RosdepInstaller_get_uninstalled_levels():
+    from rosdep2 import create_default_installer_context
+    from rosdep2.lookup import RosdepLookup
+    from rosdep2.installers import RosdepInstaller, PackageManagerInstaller
+
+    detect_apt = Mock(side_effect=lambda pkgs: [p for p in pkgs if p in ['a', 'c']])
+    detect_pip = Mock(return_value=[])
+    context = create_default_installer_context()
+    context.set_installer('apt', PackageManagerInstaller(detect_apt))
+    context.set_installer('pip', PackageManagerInstaller(detect_pip))
+    lookup = Mock(spec=RosdepLookup)
+    lookup.resolve_all_levels.return_value = (
+        [[('apt', ['a', 'b']), ('pip', ['p'])], [('apt', ['c'])], [('pip', ['q'])]], {})
+    installer = RosdepInstaller(context, lookup)
+
+    # levels without anything left to install are dropped
+    expected = [[('apt', ['b']), ('pip', ['p'])], [('pip', ['q'])]]
+    assert installer.get_uninstalled_levels(['foo']) == (expected, {})
+    detect_apt.assert_called_once_with(['a', 'b', 'c'])
+
+
+def create_test_command_installer(results):
+    from rosdep2.installers import PackageManagerInstaller
+
+    class CommandInstaller(PackageManagerInstaller):
+        # runs one command per package, which fails if *results* say so
+        def get_install_command(self, resolved, interactive=True, reinstall=False, quiet=False):
+            return [[p] for p in resolved]
+
+        def is_installed(self, resolved_item):
+            return results.get(resolved_item, 0) == 0
+    return CommandInstaller(lambda pkgs: [])
+
+
+@patch('rosdep2.installers.subprocess')
+def test_RosdepInstaller_install_levels(mock_subprocess):
+    import threading
+    import subprocess
+    from rosdep2 import create_default_installer_context, InstallFailed
+    from rosdep2.lookup import RosdepLookup
+    from rosdep2.installers import RosdepInstaller
+
+    mock_subprocess.PIPE = subprocess.PIPE
+    mock_subprocess.STDOUT = subprocess.STDOUT
+    results = {'bad-apt': 1, 'bad-pip': 2}
+    # the installers of a level have to run at the same time to pass the barrier
+    barrier = threading.Barrier(2, timeout=10)
+    commands = []
+
+    def run(command, stdout=None, stderr=None):
+        commands.append(command[0])
+        if command[0] in ['a', 'p', 'bad-apt', 'bad-pip']:
+            barrier.wait()
+        return Mock(returncode=results.get(command[0], 0), stdout=('output of %s\n' % command[0]).encode())
+    mock_subprocess.run.side_effect = run
+    mock_subprocess.call.return_value = 0
+    context = create_default_installer_context()
+    context.set_installer('apt', create_test_command_installer(results))
+    context.set_installer('pip', create_test_command_installer(results))
+    installer = RosdepInstaller(context, Mock(spec=RosdepLookup))
+
+    with fakeout() as (stdout, stderr):
+        installer.install_levels([[('apt', ['a']), ('pip', ['p'])], [('apt', ['c'])]], interactive=False)
+    assert sorted(commands[:2]) == ['a', 'p']
+    assert commands[2:] == []
+    mock_subprocess.call.assert_called_once_with(['c'])
+    # the captured output of each installer is printed together
+    lines = [x for x in stdout.getvalue().splitlines() if 'executing' not in x]
+    assert lines == ['output of a', 'output of p'] or lines == ['output of p', 'output of a']
+
+    # failures of a level are aggregated and the next level is not installed
+    commands[:] = []
+    mock_subprocess.call.reset_mock()
+    try:
+        with fakeout():
+            installer.install_levels([[('apt', ['bad-apt']), ('pip', ['bad-pip'])], [('apt', ['c'])]], interactive=False)
+        assert False, 'should have raised'
+    except InstallFailed as e:
+        assert [k for k, _ in e.failures] == ['apt', 'pip']
+    assert not mock_subprocess.call.called
+
+    # failures of all levels are reported when continuing on errors
+    try:
+        with fakeout():
+            installer.install_levels([[('apt', ['bad-apt']), ('pip', ['bad-pip'])], [('apt', ['c'])]],
+                                     interactive=False, continue_on_error=True)
+        assert False, 'should have raised'
+    except InstallFailed as e:
+        assert [k for k, _ in e.failures] == ['apt', 'apt', 'pip', 'pip']
+    mock_subprocess.call.assert_called_once_with(['c'])
+
+
+@patch('rosdep2.installers.subprocess')
+def test_RosdepInstaller_install_levels_sudo(mock_subprocess):
+    import subprocess
+    from rosdep2 import create_default_installer_context, InstallFailed
+    from rosdep2.lookup import RosdepLookup
+    from rosdep2.installers import RosdepInstaller
+
+    mock_subprocess.PIPE = subprocess.PIPE
+    mock_subprocess.STDOUT = subprocess.STDOUT
+    mock_subprocess.run.return_value = Mock(returncode=0, stdout=b'')
+    mock_subprocess.call.return_value = 0
+    context = create_default_installer_context()
+    apt_installer = create_test_command_installer({})
+    pip_installer = create_test_command_installer({})
+    apt_installer.sudo_command = 'sudo -H'
+    pip_installer.sudo_command = 'sudo -H'
+    pip_installer.as_root = False
+    context.set_installer('apt', apt_installer)
+    context.set_installer('pip', pip_installer)
+    installer = RosdepInstaller(context, Mock(spec=RosdepLookup))
+
+    # the password is asked for once before installers run concurrently
+    with fakeout():
+        installer.install_levels([[('apt', ['a']), ('pip', ['p'])]], interactive=False)
+    mock_subprocess.call.assert_called_once_with(['sudo', '-v'])
+    assert mock_subprocess.run.call_count == 2
+
+    # not if the installers run one at a time
+    mock_subprocess.call.reset_mock()
+    with fakeout():
+        installer.install_levels([[('apt', ['a'])], [('pip', ['p'])]], interactive=False)
+    assert [c[0][0] for c in mock_subprocess.call.call_args_list] == [['a'], ['p']]
+
+    # nor if no concurrent installer elevates privileges
+    mock_subprocess.call.reset_mock()
+    apt_installer.as_root = False
+    with fakeout():
+        installer.install_levels([[('apt', ['a']), ('pip', ['p'])]], interactive=False)
+    assert not mock_subprocess.call.called
+
+    # nothing is installed without the credentials
+    apt_installer.as_root = True
+    mock_subprocess.run.reset_mock()
+    mock_subprocess.call.return_value = 1
+    try:
+        with fakeout():
+            installer.install_levels([[('apt', ['a']), ('pip', ['p'])]], interactive=False)
+        assert False, 'should have raised'
+    except InstallFailed as e:
+        assert [k for k, _ in e.failures] == ['sudo']
+    assert not mock_subprocess.run.called
+
+
+@patch('rosdep2.installers.subprocess')
+def test_RosdepInstaller_install_resolved_lock(mock_subprocess):
+    import threading
+    from rosdep2 import create_default_installer_context
+    from rosdep2.lookup import RosdepLookup
+    from rosdep2.installers import RosdepInstaller
+
+    running = []
+    overlaps = []
+
+    def call(command):
+        running.append(command)
+        overlaps.append(len(running))
+        threading.Event().wait(0.05)
+        running.remove(command)
+        return 0
+    mock_subprocess.call.side_effect = call
+    context = create_default_installer_context()
+    context.set_installer('apt', create_test_command_installer({}))
+    installer = RosdepInstaller(context, Mock(spec=RosdepLookup))
+    threads = [
+        threading.Thread(target=installer.install_resolved, args=('apt', [p]), kwargs={'interactive': False})
+        for p in ['a', 'b', 'c']]
+    with fakeout():
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    # never two commands of the same installer at once
+    assert overlaps == [1, 1, 1]
+
+
+@patch('rosdep2.installers.subprocess')
+def test_RosdepInstaller_install_resolved_verify(mock_subprocess):
+    from rosdep2 import create_default_installer_context, InstallFailed
+    from rosdep2.lookup import RosdepLookup
+    from rosdep2.installers import PackageManagerInstaller, RosdepInstaller
+
+    class TestInstaller(PackageManagerInstaller):
+        def get_install_command(self, resolved, interactive=True, reinstall=False, quiet=False):
+            return [['install'] + resolved]
+
+    mock_subprocess.call.return_value = 0
+    detect_fn = Mock(return_value=['a', 'c'])
+    context = create_default_installer_context()
+    context.set_installer('apt', TestInstaller(detect_fn))
+    installer = RosdepInstaller(context, Mock(spec=RosdepLookup))
+    with fakeout():
+        try:
+            installer.install_resolved('apt', ['a', 'b', 'c', 'd'], interactive=False)
+            assert False, 'should have raised'
+        except InstallFailed as e:
+            assert e.failures == [
+                ('apt', 'Failed to detect successful installation of [b]'),
+                ('apt', 'Failed to detect successful installation of [d]')]
+    # one query for all of the packages
+    detect_fn.assert_called_once_with(['a', 'b', 'c', 'd'])
+
+    # installers with their own check are still asked per package
+    results = {'a': 0, 'b': 1}
+    context.set_installer('apt', create_test_command_installer(results))
+    with fakeout():
+        try:
+            installer.install_resolved('apt', ['a', 'b'], interactive=False)
+            assert False, 'should have raised'
+        except InstallFailed as e:
+            assert e.failures == [('apt', 'Failed to detect successful installation of [b]')]
+
+
 @contextmanager
 def fakeout():
     realstdout = sys.stdout
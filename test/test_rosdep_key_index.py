@@ -0,0 +1,95 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import pickle
+
+import pytest
+
+from rosdep2.key_index import KeyIndex, write_key_index
+
+
+def get_test_data():
+    return {
+        'python3-yaml': {'ubuntu': ['python3-yaml'], 'fedora': ['python3-pyyaml']},
+        'boost': {'ubuntu': {'jammy': ['libboost-all-dev']}},
+        'café': {'debian': 'cafe'},
+        'z': {},
+        'a': {'osx': {'homebrew': {'packages': ['a']}}},
+    }
+
+
+def test_key_index(tmpdir):
+    data = get_test_data()
+    filepath = str(tmpdir.join('index.keys'))
+    assert write_key_index(filepath, data)
+    index = KeyIndex(filepath)
+
+    assert len(index) == len(data)
+    # keys keep the order of the data, lookups bisect the sorted keys
+    assert list(index) == list(data)
+    assert list(data) != sorted(data, key=lambda k: k.encode('utf-8'))
+    assert dict(index) == data
+    assert index == data
+    for key, value in data.items():
+        assert key in index
+        assert index[key] == value
+    for key in ['', 'b', 'zz', 'python3', 42, None]:
+        assert key not in index
+        with pytest.raises(KeyError):
+            index[key]
+    assert index.get('missing') is None
+    assert index.copy() is index
+
+    # pickles as a reference to the file
+    assert len(pickle.dumps(index)) < os.path.getsize(filepath)
+    assert pickle.loads(pickle.dumps(index)) == data
+
+
+def test_key_index_close(tmpdir):
+    filepath = str(tmpdir.join('index.keys'))
+    assert write_key_index(filepath, get_test_data())
+    with KeyIndex(filepath) as index:
+        assert not index.closed
+        assert index['z'] == {}
+    assert index.closed
+    with pytest.raises(ValueError):
+        index['z']
+    # closing twice is fine
+    index.close()
+
+
+def test_key_index_empty(tmpdir):
+    filepath = str(tmpdir.join('index.keys'))
+    assert write_key_index(filepath, {})
+    index = KeyIndex(filepath)
+    assert len(index) == 0
+    assert list(index) == []
+    assert 'a' not in index
+
+
+def test_key_index_invalid(tmpdir):
+    filepath = str(tmpdir.join('index.keys'))
+    assert write_key_index(filepath, get_test_data())
+    # keys that are not strings cannot be indexed
+    assert not write_key_index(filepath, {1: {'ubuntu': 'one'}})
+    assert not os.path.exists(filepath)
+
+    for data in [b'', b'RDKI', b'not a key index file']:
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        with pytest.raises(ValueError):
+            KeyIndex(filepath)
+    with pytest.raises(OSError):
+        KeyIndex(str(tmpdir.join('missing.keys')))
@@ -27,6 +27,9 @@
 
 import os
 import yaml
+from unittest.mock import patch
+
+import pytest
 
 from rospkg import RosPack, RosStack, ResourceNotFound
 
@@ -321,6 +324,126 @@ def test_RosdepView_merge():
     str(view)
 
 
+def test_RosdepView_merge_lazy():
+    from rosdep2.model import RosdepDatabaseEntry
+    from rosdep2.lookup import RosdepView, InvalidData
+
+    entries = [
+        (dict(a=dict(x=1), b=dict(y=2), c=dict(z=3)), False),
+        (dict(d=dict(o=4), e=dict(p=5), a=dict(w=0)), False),
+        (dict(b=dict(y=3)), True),
+        (dict(f='invalid'), False),
+    ]
+    eager_view = RosdepView('common')
+    lazy_view = RosdepView('common', lazy=True)
+    assert len(lazy_view.keys()) == 0
+    for i, (data, override) in enumerate(entries[:-1]):
+        eager_view.merge(RosdepDatabaseEntry(dict((k, dict(v)) for k, v in data.items()), [], 'origin%d' % i), override=override)
+        lazy_view.merge(RosdepDatabaseEntry(data, [], 'origin%d' % i), override=override)
+    assert lazy_view.rosdep_defs == {}
+    assert list(lazy_view.keys()) == list(eager_view.keys())
+    assert lazy_view.lookup('b').data == dict(y=3)
+    assert list(lazy_view.rosdep_defs.keys()) == ['b']
+    for k in eager_view.keys():
+        assert lazy_view.lookup(k).data == eager_view.lookup(k).data, k
+        assert lazy_view.lookup(k).origin == eager_view.lookup(k).origin, k
+    assert list(lazy_view.keys()) == list(eager_view.keys())
+    assert str(lazy_view) == str(eager_view)
+    try:
+        lazy_view.lookup('notfound')
+        assert False, 'should have raised KeyError'
+    except KeyError as e:
+        assert 'notfound' in str(e)
+
+    # invalid data is only reported for the keys that are looked up
+    lazy_view.merge(RosdepDatabaseEntry(entries[-1][0], [], 'origin3'))
+    assert 'f' in lazy_view.keys()
+    assert lazy_view.lookup('a').data == dict(x=1, w=0)
+    for _ in range(2):
+        try:
+            lazy_view.lookup('f')
+            assert False, 'should have raised InvalidData'
+        except InvalidData:
+            pass
+    try:
+        eager_view.merge(RosdepDatabaseEntry(entries[-1][0], [], 'origin3'))
+        assert False, 'should have raised InvalidData'
+    except InvalidData:
+        pass
+
+
+def test_RosdepView_merge_key_index(tmpdir):
+    from rosdep2.key_index import KeyIndex, write_key_index
+    from rosdep2.model import RosdepDatabaseEntry
+    from rosdep2.lookup import RosdepView
+
+    entries = [
+        (dict(c=dict(z=3), a=dict(x=1), b=dict(y=2)), False),
+        (dict(d=dict(o=4), e=dict(p=5), a=dict(w=0)), False),
+        (dict(b=dict(y=3)), True),
+    ]
+    eager_view = RosdepView('common')
+    lazy_view = RosdepView('common')
+    for i, (data, override) in enumerate(entries):
+        eager_view.merge(RosdepDatabaseEntry(data, [], 'origin%d' % i), override=override)
+        filepath = str(tmpdir.join('origin%d' % i))
+        assert write_key_index(filepath, data)
+        lazy_view.merge(RosdepDatabaseEntry(KeyIndex(filepath), [], 'origin%d' % i), override=override)
+    # eager data after deferred data keeps its precedence
+    eager_view.merge(RosdepDatabaseEntry(dict(c=dict(z=4), f=dict(q=6)), [], 'origin3'))
+    lazy_view.merge(RosdepDatabaseEntry(dict(c=dict(z=4), f=dict(q=6)), [], 'origin3'))
+
+    # nothing is decoded until it is looked up
+    assert lazy_view.rosdep_defs == {}
+    assert list(lazy_view.keys()) == list(eager_view.keys()) == ['c', 'a', 'b', 'd', 'e', 'f']
+    assert lazy_view.lookup('a').data == dict(x=1, w=0)
+    assert list(lazy_view.rosdep_defs.keys()) == ['a']
+    for k in eager_view.keys():
+        assert lazy_view.lookup(k).data == eager_view.lookup(k).data, k
+        assert lazy_view.lookup(k).origin == eager_view.lookup(k).origin, k
+    # lookups do not change the order of the keys
+    assert list(lazy_view.keys()) == list(eager_view.keys())
+    try:
+        lazy_view.lookup('notfound')
+        assert False, 'should have raised KeyError'
+    except KeyError as e:
+        assert 'notfound' in str(e)
+
+    # entries merged after a lookup still apply
+    lazy_view.merge(RosdepDatabaseEntry(dict(a=dict(x=2)), [], 'origin4'), override=True)
+    assert lazy_view.lookup('a').data == dict(x=2)
+    # - tripwire
+    str(lazy_view)
+
+    # keys merged before deferred data come first
+    view = RosdepView('common')
+    view.merge(RosdepDatabaseEntry(dict(y=dict(), x=dict()), [], 'origin0'))
+    view.merge(RosdepDatabaseEntry(KeyIndex(str(tmpdir.join('origin1'))), [], 'origin1'))
+    view.lookup('e')
+    view.lookup('x')
+    assert list(view.keys()) == ['y', 'x', 'd', 'e', 'a']
+
+
+def test_RosdepLookup_close(tmpdir):
+    from rosdep2.key_index import KeyIndex, write_key_index
+    from rosdep2.model import RosdepDatabase
+    from rosdep2.lookup import RosdepLookup
+    from rosdep2.loader import RosdepLoader
+
+    filepath = str(tmpdir.join('index.keys'))
+    assert write_key_index(filepath, dict(a=dict(ubuntu='a')))
+    rosdep_db = RosdepDatabase()
+    rosdep_db.set_view_data('index', KeyIndex(filepath), [], filepath)
+    rosdep_db.set_view_data('dict', dict(b=dict(ubuntu='b')), [], 'dict')
+    lookup = RosdepLookup(rosdep_db, RosdepLoader())
+    assert lookup.create_rosdep_view('all', ['index', 'dict']).lookup('a').data == dict(ubuntu='a')
+    index = rosdep_db.get_view_data('index').rosdep_data
+
+    lookup.close()
+    assert index.closed
+    assert lookup._view_cache == {}
+
+
 def test_RosdepLookup_get_rosdeps():
     from rosdep2.loader import RosdepLoader
     from rosdep2.lookup import RosdepLookup
@@ -500,6 +623,14 @@ def test_RosdepLookup_get_rosdep_view():
     assert PYTHON_URL == python.origin
     assert py_cache_raw['testpython'] == python.data
 
+    # views that merge definitions on lookup list the same keys
+    eager_lookup = RosdepLookup.create_from_rospkg(rospack=rospack, rosstack=rosstack,
+                                                   sources_loader=sources_loader)
+    eager_lookup.lazy_views = False
+    eager_view = eager_lookup.get_rosdep_view('stack1')
+    assert list(stack1_view.keys()) == list(eager_view.keys())
+    assert not eager_view.lazy and stack1_view.lazy
+
 
 def test_RosdepLookup_get_errors():
     from rosdep2.lookup import RosdepLookup
@@ -633,3 +764,83 @@ def test_RosdepLookup_resolve_all():
             if k == 'apt':
                 apt_resolutions.extend(v)
         assert set(apt_resolutions) == set(['libtinyxml-dev', 'libboost1.40-all-dev', 'libtool', 'libltdl-dev']), set(apt_resolutions)
+
+
+def test_RosdepLookup_resolve_all_resolution_cache(tmpdir):
+    from rosdep2 import create_default_installer_context
+    from rosdep2.lookup import RosdepLookup
+    from rosdep2.resolution_cache import ResolutionCache
+    rospack, rosstack = get_test_rospkgs()
+    filepath = str(tmpdir.join('resolutions.pickle'))
+    installer_context = create_default_installer_context()
+    installer_context.set_os_override('ubuntu', 'lucid')
+
+    def create_lookup(digest):
+        lookup = RosdepLookup.create_from_rospkg(rospack=rospack, rosstack=rosstack,
+                                                 sources_loader=create_test_SourcesListLoader())
+        lookup.resolution_cache = ResolutionCache(filepath, digest)
+        return lookup
+
+    lookup = create_lookup('digest')
+    resolutions, errors = lookup.resolve_all(['rospack_fake', 'roscpp_fake'], installer_context)
+    assert not errors, errors
+    assert os.path.exists(filepath)
+
+    # later lookups do not create views for cached resolutions
+    lookup = create_lookup('digest')
+    with patch.object(lookup, 'get_rosdep_view_for_resource', side_effect=AssertionError):
+        assert lookup.resolve_all(['rospack_fake', 'roscpp_fake'], installer_context) == (resolutions, errors)
+
+    # a different platform is resolved again
+    installer_context.set_os_override('ubuntu', 'precise')
+    with patch.object(lookup, 'get_rosdep_view_for_resource', side_effect=AssertionError):
+        with pytest.raises(AssertionError):
+            lookup.resolve_all(['rospack_fake'], installer_context)
+
+    # and so are resolutions based on different sources
+    installer_context.set_os_override('ubuntu', 'lucid')
+    lookup = create_lookup('other digest')
+    with patch.object(lookup, 'get_rosdep_view_for_resource', side_effect=AssertionError):
+        with pytest.raises(AssertionError):
+            lookup.resolve_all(['rospack_fake'], installer_context)
+
+
+def test_RosdepLookup_resolve_all_resolve_all_cache(tmpdir):
+    from rosdep2 import create_default_installer_context
+    from rosdep2.lookup import RosdepLookup
+    from rosdep2.resolution_cache import ResolveAllCache
+    rospack, rosstack = get_test_rospkgs()
+    filepath = str(tmpdir.join('resolve_all.pickle'))
+    installer_context = create_default_installer_context()
+    installer_context.set_os_override('ubuntu', 'lucid')
+
+    def create_lookup():
+        lookup = RosdepLookup.create_from_rospkg(rospack=rospack, rosstack=rosstack,
+                                                 sources_loader=create_test_SourcesListLoader())
+        lookup.resolve_all_cache = ResolveAllCache(filepath, 'digest')
+        lookup.skipped_keys = ['catkin']
+        return lookup
+
+    lookup = create_lookup()
+    resolutions, errors = lookup.resolve_all(['simple_catkin_package'], installer_context)
+    assert resolutions == [('apt', ['libboost1.40-all-dev'])]
+    assert not errors, errors
+
+    # the workspace is not resolved again
+    lookup = create_lookup()
+    with patch.object(lookup, 'resolve', side_effect=AssertionError):
+        assert lookup.resolve_all(['simple_catkin_package'], installer_context) == (resolutions, errors)
+
+    # unless the options differ
+    lookup.skipped_keys = []
+    resolutions, errors = lookup.resolve_all(['simple_catkin_package'], installer_context)
+    assert 'simple_catkin_package' in errors
+    lookup.skipped_keys = ['catkin', 'testboost']
+    assert lookup.resolve_all(['simple_catkin_package'], installer_context) == ([], {})
+
+    # resources that are not catkin packages are not cached
+    lookup = create_lookup()
+    lookup.resolve_all(['roscpp_fake'], installer_context)
+    with patch.object(lookup, 'resolve', side_effect=AssertionError):
+        with pytest.raises(AssertionError):
+            lookup.resolve_all(['roscpp_fake'], installer_context)
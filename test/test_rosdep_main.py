@@ -27,12 +27,14 @@
 
 from contextlib import contextmanager
 import os
+import subprocess
 import sys
 try:
     from cStringIO import StringIO
 except ImportError:
     from io import StringIO
 
+import pytest
 import rospkg
 
 import unittest
@@ -156,9 +158,10 @@ class TestRosdepMain(unittest.TestCase):
         except SystemExit:
             pass
 
+    @patch('rosdep2.platforms.debian.get_dpkg_status', return_value=({'python3-dev': '3.10.6-1~22.04'}, {}))
     @patch('rosdep2.platforms.debian.read_stdout')
     @patch('rosdep2.installers.os.geteuid', return_value=1)
-    def test_install(self, mock_geteuid, mock_read_stdout):
+    def test_install(self, mock_geteuid, mock_read_stdout, mock_get_dpkg_status):
         sources_cache = get_cache_dir()
         cmd_extras = ['-c', sources_cache]
         catkin_tree = get_test_catkin_tree_dir()
@@ -333,3 +336,23 @@ class TestRosdepMain(unittest.TestCase):
             assert len(output) >= 2
             assert test_package_dir in output[-2]
             assert 'Package version ":{version}" does not follow version conventions' in output[-1]
+
+
+@pytest.mark.benchmark
+def test_benchmark_import_time():
+    import rosdep2
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(rosdep2.__file__)))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import rosdep2.main'],
+        stderr=subprocess.PIPE, env=env, check=True)
+    # cumulative import time of each module in microseconds
+    import_times = {}
+    for line in result.stderr.decode('utf-8').splitlines():
+        fields = line.split('|')
+        if line.startswith('import time:') and len(fields) == 3 and fields[1].strip().isdigit():
+            import_times[fields[2].strip()] = int(fields[1])
+    print('import rosdep2.main: %.4fs' % (import_times['rosdep2.main'] / 1e6))
+    # platform modules and heavy dependencies are only imported by the commands that use them
+    for name in import_times:
+        assert not name.startswith(('catkin_pkg', 'regex', 'rosdistro', 'rosdep2.platforms.')), name
+    assert import_times['rosdep2.main'] < 1e6
@@ -62,17 +62,9 @@ def make_resolutions_options(package_list):
 
 
 def brew_command(command):
-    if command[1] == 'list':
-        with open(os.path.join(get_test_dir(), 'brew-list-output'), 'r') as f:
+    if command == ['brew', 'info', '--json=v2', '--installed']:
+        with open(os.path.join(get_test_dir(), 'brew-info-v2-output'), 'r') as f:
             return f.read()
-    elif command[1] == 'info':
-        pkg = command[2]
-        with open(os.path.join(get_test_dir(), 'brew-info-output'), 'r') as f:
-            output = f.readlines()
-        for line in output:
-            res = line.split(':', 1)
-            if res[0] == pkg:
-                return res[1]
     return ''
 
 
@@ -83,23 +75,53 @@ def test_brew_detect():
     m.return_value = ''
     val = brew_detect([], exec_fn=m)
     assert val == [], val
+    assert not m.called
 
     m = Mock()
     m.return_value = ''
     val = brew_detect(make_resolutions(['tinyxml']), exec_fn=m)
     assert val == [], val
     # make sure our test harness is based on the same implementation
-    m.assert_called_with(['brew', 'list', '--formula'])
-    assert m.call_args_list == [call(['brew', 'list', '--formula'])], m.call_args_list
+    assert m.call_args_list == [call(['brew', 'info', '--json=v2', '--installed'])], m.call_args_list
 
     m = Mock()
     m.side_effect = brew_command
-    val = brew_detect(make_resolutions(['apt', 'subversion', 'python', 'bazaar']), exec_fn=m)
+    val = brew_detect(make_resolutions(['apt', 'subversion', 'python', 'bazaar', 'openssl@3', 'wget', 'cmake']), exec_fn=m)
     # make sure it preserves order
-    expected = make_resolutions(['subversion', 'bazaar'])
+    expected = make_resolutions(['subversion', 'bazaar', 'cmake'])
     assert set(val) == set(expected), val
     assert val == expected, val
     assert len(val) == len(set(val)), val
+    # all formulae are queried at once
+    assert m.call_count == 1
+
+    # options must have been used to build the linked keg
+    m = Mock()
+    m.side_effect = brew_command
+    resolutions = make_resolutions_options([
+        ('boost', [], ['--with-icu4c']),
+        ('boost', [], ['--without-static']),
+        ('ros/hydro/foo-pkg', [], ['--with-quux']),
+        ('foo-pkg', ['--HEAD'], []),
+        ('bazaar', [], ['--with-quux']),
+    ])
+    val = brew_detect(resolutions, exec_fn=m)
+    assert val == [resolutions[0], resolutions[2], resolutions[3]], val
+    assert m.call_count == 1
+
+
+def test_brew_detect_invalid_output():
+    from rosdep2 import RosdepInternalError
+    from rosdep2.platforms.osx import brew_detect
+
+    for output in ['not json', '[]', '{"formulae": [{"name": "foo"}]}']:
+        m = Mock()
+        m.return_value = output
+        try:
+            brew_detect(make_resolutions(['foo']), exec_fn=m)
+            assert False, 'should have raised RosdepInternalError'
+        except RosdepInternalError as e:
+            assert output in e.message, e.message
 
 
 def test_HomebrewInstaller():
@@ -60,6 +60,38 @@ def test_pip_detect():
     assert val == ['paramiko', 'pycrypto'], val
 
 
+def test_pip_detect_list():
+    from rosdep2.platforms.pip import pip_detect
+
+    m = Mock()
+    with open(os.path.join(get_test_dir(), 'list_output.json'), 'r') as f:
+        m.return_value = f.read()
+    with patch('rosdep2.platforms.pip.get_pip_command', return_value=['pip3']):
+        val = pip_detect(['paramiko', 'fakito', 'pyyaml', 'Ruamel_Yaml', 'zope.interface', 'setuptools'], exec_fn=m)
+    assert val == ['paramiko', 'pyyaml', 'Ruamel_Yaml', 'zope.interface', 'setuptools'], val
+    # installed distributions are read with a single call
+    m.assert_called_once_with(['pip3', 'list', '--format=json'])
+
+
+def test_pip_detect_in_process():
+    from rosdep2.platforms.pip import pip_detect
+
+    def fake_dist(name):
+        dist = Mock()
+        dist.metadata = {'Name': name}
+        return dist
+
+    dists = [fake_dist('Paramiko'), fake_dist('PyYAML'), fake_dist('zope_interface'), fake_dist(None)]
+    with patch('rosdep2.platforms.pip.get_pip_command', return_value=[sys.executable, '-m', 'pip']), \
+            patch('rosdep2.platforms.pip.importlib_metadata.distributions', return_value=dists), \
+            patch('rosdep2.platforms.pip.read_stdout') as mock_read_stdout, \
+            patch('rosdep2.platforms.pip.subprocess.Popen') as mock_popen:
+        val = pip_detect(['paramiko', 'fakito', 'pyyaml', 'zope.interface'])
+        assert val == ['paramiko', 'pyyaml', 'zope.interface'], val
+        assert not mock_read_stdout.called
+        assert not mock_popen.called
+
+
 def test_PipInstaller_get_depends():
     # make sure PipInstaller supports depends
     from rosdep2.platforms.pip import PipInstaller
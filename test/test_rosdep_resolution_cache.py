@@ -0,0 +1,120 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from unittest.mock import Mock, patch
+
+from rosdep2.resolution_cache import RESOLUTION_CACHE, ResolutionCache, \
+    RESOLVE_ALL_CACHE, RESOLVE_ALL_CACHE_SIZE, ResolveAllCache
+
+KEY = ('python3-yaml', '*default*', 'ubuntu', 'jammy', ('apt', 'pip'), 'apt')
+
+
+def test_resolution_cache(tmpdir):
+    filepath = str(tmpdir.join(RESOLUTION_CACHE))
+    cache = ResolutionCache(filepath, 'digest')
+    assert cache.get(KEY) is None
+    # nothing to write yet
+    cache.save()
+    assert not os.path.exists(filepath)
+
+    cache.set(KEY, 'apt', ['python3-yaml'], ['python3'])
+    # source installs and other opaque resolutions are not cached
+    cache.set(('foo',), 'source', [object()], [])
+    assert cache.get(('foo',)) is None
+    cache.save()
+
+    cache = ResolutionCache(filepath, 'digest')
+    value = cache.get(KEY)
+    assert value == ('apt', ['python3-yaml'], ['python3'])
+    # callers may modify the lists
+    value[2].pop()
+    assert cache.get(KEY) == ('apt', ['python3-yaml'], ['python3'])
+
+    # new data in the sources cache
+    assert ResolutionCache(filepath, 'other digest').get(KEY) is None
+    # new version of rosdep
+    with patch('rosdep2.resolution_cache.__version__', '0.0.0'):
+        assert ResolutionCache(filepath, 'digest').get(KEY) is None
+
+
+def test_resolution_cache_save_merge(tmpdir):
+    filepath = str(tmpdir.join(RESOLUTION_CACHE))
+    cache1 = ResolutionCache(filepath, 'digest')
+    cache2 = ResolutionCache(filepath, 'digest')
+    assert cache1.get(KEY) is None
+    assert cache2.get(KEY) is None
+    cache1.set(KEY, 'apt', ['python3-yaml'], [])
+    cache2.set(('boost',), 'apt', ['libboost-all-dev'], [])
+    cache1.save()
+    cache2.save()
+
+    cache = ResolutionCache(filepath, 'digest')
+    assert cache.get(KEY) == ('apt', ['python3-yaml'], [])
+    assert cache.get(('boost',)) == ('apt', ['libboost-all-dev'], [])
+
+
+def test_resolution_cache_invalid(tmpdir):
+    filepath = str(tmpdir.join(RESOLUTION_CACHE))
+    with open(filepath, 'wb') as f:
+        f.write(b'not a pickle')
+    cache = ResolutionCache(filepath, 'digest')
+    assert cache.get(KEY) is None
+    cache.set(KEY, 'apt', ['python3-yaml'], [])
+    cache.save()
+    assert ResolutionCache(filepath, 'digest').get(KEY) == ('apt', ['python3-yaml'], [])
+
+    # the cache is optional, failing to write it is not an error
+    cache = ResolutionCache(str(tmpdir.join('missing', RESOLUTION_CACHE)), 'digest')
+    cache.set(KEY, 'apt', ['python3-yaml'], [])
+    cache.save()
+
+
+def test_resolution_cache_create_default(tmpdir):
+    sources_loader = Mock(sources=[Mock(url='file:///base.yaml')])
+    cache = ResolutionCache.create_default(sources_loader, sources_cache_dir=str(tmpdir))
+    assert cache.filepath == str(tmpdir.join(RESOLUTION_CACHE))
+    assert cache.digest == ResolutionCache.create_default(sources_loader, sources_cache_dir=str(tmpdir)).digest
+
+    sources_loader.sources.append(Mock(url='file:///python.yaml'))
+    assert cache.digest != ResolutionCache.create_default(sources_loader, sources_cache_dir=str(tmpdir)).digest
+
+
+def test_resolve_all_cache(tmpdir):
+    filepath = str(tmpdir.join(RESOLVE_ALL_CACHE))
+    cache = ResolveAllCache(filepath, 'digest')
+    resolutions = [('apt', ['python3-yaml']), ('pip', ['rosdep'])]
+    cache.set('workspace', resolutions)
+    cache.set('source workspace', [('source', [object()])])
+    cache.save()
+
+    cache = ResolveAllCache(filepath, 'digest')
+    assert cache.get('workspace') == resolutions
+    assert cache.get('source workspace') is None
+    assert ResolveAllCache(filepath, 'other digest').get('workspace') is None
+
+    # only the most recent workspaces are kept
+    for i in range(RESOLVE_ALL_CACHE_SIZE - 1):
+        cache = ResolveAllCache(filepath, 'digest')
+        cache.set('workspace %d' % i, resolutions)
+        cache.save()
+    assert ResolveAllCache(filepath, 'digest').get('workspace') == resolutions
+    cache = ResolveAllCache(filepath, 'digest')
+    cache.set('workspace', resolutions)
+    cache.set('new workspace', resolutions)
+    cache.save()
+    cache = ResolveAllCache(filepath, 'digest')
+    assert cache.get('workspace') == resolutions
+    assert cache.get('workspace 0') is None
+    assert cache.get('new workspace') == resolutions
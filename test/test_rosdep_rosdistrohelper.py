@@ -0,0 +1,90 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from rosdep2 import rosdistrohelper
+from rosdep2.rosdistrohelper import get_release_file, get_release_file_cache_dir, get_targets, ReleaseFile
+
+
+@pytest.mark.usefixtures('fake_rosdistro_index')
+def test_get_release_file_cache(fake_rosdistro_server, fake_ros_home):
+    os.environ['ROSDISTRO_INDEX_URL'] = fake_rosdistro_server.url + '/index-v4.yaml'
+    distribution_path = '/melodic/distribution.yaml'
+
+    release_file = get_release_file('melodic')
+    assert release_file.repositories['ros'].package_names == ['ros']
+    assert release_file.platforms['ubuntu'] == ['bionic']
+    assert get_release_file_cache_dir().startswith(fake_ros_home)
+    assert len(os.listdir(get_release_file_cache_dir())) == 1
+    assert fake_rosdistro_server.requests.count(distribution_path) == 1
+
+    # a new process revalidates the cached data instead of parsing the file again
+    rosdistrohelper._RDCache.release_files = {}
+    with patch('rosdistro.distribution_file.create_distribution_file') as create_distribution_file:
+        cached = get_release_file('melodic')
+    assert not create_distribution_file.called
+    assert fake_rosdistro_server.requests.count(distribution_path) == 2
+    assert cached._get_data() == release_file._get_data()
+
+    # changed content is parsed again
+    fake_rosdistro_server.add_file(distribution_path, b'%YAML 1.1\n---\nrelease_platforms:\n  ubuntu: [focal]\n'
+                                   b'repositories: {}\ntype: distribution\nversion: 2\n')
+    rosdistrohelper._RDCache.release_files = {}
+    changed = get_release_file('melodic')
+    assert changed.platforms == {'ubuntu': ['focal']}
+    assert changed.repositories == {}
+
+
+def test_release_file_data():
+    from rosdistro.release_repository_specification import ReleaseRepositorySpecification
+    data = {
+        'repositories': {'ros_comm': {
+            'url': 'https://github.com/ros-gbp/ros_comm-release.git', 'version': '1.14.13-1',
+            'tags': {'release': 'release/melodic/{package}/{version}'}, 'packages': ['roscpp', 'rospy']}},
+        'platforms': {'ubuntu': ['bionic']},
+    }
+    release_file = ReleaseFile._from_data(data)
+    # the cached data gives the same release repository specifications as rosdistro
+    repo = release_file.repositories['ros_comm']
+    assert isinstance(repo, ReleaseRepositorySpecification)
+    assert repo.package_names == ['roscpp', 'rospy']
+    assert repo.version == '1.14.13-1'
+    assert repo.get_release_tag('rospy') == 'release/melodic/rospy/1.14.13-1'
+    assert release_file.platforms == {'ubuntu': ['bionic']}
+    assert release_file._get_data() == data
+
+
+@pytest.mark.usefixtures('fake_rosdistro_index')
+def test_get_targets():
+    with patch('rosdep2.rosdistrohelper.get_release_file') as get_release_file_mock:
+        get_release_file_mock.return_value = ReleaseFile._from_data({'repositories': {}, 'platforms': {'ubuntu': ['bionic']}})
+        targets = get_targets()
+        assert list(targets) == ['melodic']
+        assert 'melodic' in targets
+        assert 'fuerte' not in targets
+        assert not get_release_file_mock.called
+
+        assert targets['melodic'] == {'ubuntu': ['bionic']}
+        assert targets['melodic'] == {'ubuntu': ['bionic']}
+        assert get_release_file_mock.call_count == 1
+        with pytest.raises(KeyError):
+            targets['fuerte']
+
+        targets['fuerte'] = {'ubuntu': ['lucid']}
+        assert dict(targets) == {'melodic': {'ubuntu': ['bionic']}, 'fuerte': {'ubuntu': ['lucid']}}
+        assert get_release_file_mock.call_count == 1
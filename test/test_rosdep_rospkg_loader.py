@@ -29,7 +29,7 @@
 
 import os
 import yaml
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 from rospkg import RosPack, RosStack
 
@@ -179,3 +179,31 @@ def test_RosPkgLoader_get_loadable():
     keys = loader.get_loadable_views()
     for s in ['ros', 'empty', 'invalid', 'stack1']:
         assert s in keys
+
+
+def test_RosPkgLoader_get_rosdeps_digest(tmpdir):
+    import shutil
+    from rosdep2.rospkg_loader import RosPkgLoader
+
+    package_dir = str(tmpdir.join('simple_catkin_package'))
+    shutil.copytree(os.path.join(get_test_dir(), 'catkin', 'simple_catkin_package'), package_dir)
+    ros_paths = [str(tmpdir)]
+    loader = RosPkgLoader(RosPack(ros_paths=ros_paths), RosStack(ros_paths=ros_paths))
+
+    digest = loader.get_rosdeps_digest(['simple_catkin_package'])
+    assert digest == loader.get_rosdeps_digest(['simple_catkin_package', 'simple_catkin_package'])
+    assert loader.get_rosdeps_digest(['simple_catkin_package', 'not_a_package']) is None
+    loader_build = RosPkgLoader(RosPack(ros_paths=ros_paths), RosStack(ros_paths=ros_paths), dependency_types=['build'])
+    assert digest != loader_build.get_rosdeps_digest(['simple_catkin_package'])
+
+    # conditions refer to the environment
+    manifest = os.path.join(package_dir, 'package.xml')
+    with open(manifest) as f:
+        data = f.read()
+    with open(manifest, 'w') as f:
+        f.write(data.replace('<build_depend>', '<build_depend condition="$ROSDEP_TEST_VERSION == 2">'))
+    with patch.dict(os.environ, {'ROSDEP_TEST_VERSION': '1'}):
+        digest1 = loader.get_rosdeps_digest(['simple_catkin_package'])
+    with patch.dict(os.environ, {'ROSDEP_TEST_VERSION': '2'}):
+        digest2 = loader.get_rosdeps_digest(['simple_catkin_package'])
+    assert len({digest, digest1, digest2}) == 3
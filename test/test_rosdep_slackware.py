@@ -81,6 +81,19 @@ def test_sbotools_available():
     os.path.exists = original_exists
 
 
+def test_sbotools_detect(tmpdir):
+    from rosdep2.platforms.slackware import sbotools_detect
+
+    for entry in ['bash-5.1.016-x86_64-1', 'PyYAML-6.0-x86_64-1_SBo', 'python3-3.9.16-x86_64-1']:
+        tmpdir.ensure(entry)
+    packages_dir = str(tmpdir)
+
+    assert sbotools_detect([], packages_dir=packages_dir) == []
+    val = sbotools_detect(['pyyaml', 'bash', 'gcc', 'python3', 'python3-numpy'], packages_dir=packages_dir)
+    assert val == ['pyyaml', 'bash', 'python3'], val
+    assert sbotools_detect(['bash'], packages_dir=str(tmpdir.join('missing'))) == []
+
+
 def test_SbotoolsInstaller():
     if not is_slackware():
         print('Skipping not Slackware')
@@ -26,8 +26,10 @@
 # POSSIBILITY OF SUCH DAMAGE.
 
 import os
+import pickle
 import tempfile
 import yaml
+from unittest.mock import patch
 try:
     from urllib.request import urlopen
     from urllib.error import URLError
@@ -195,6 +197,13 @@ def test_write_cache_file():
     with open(filepath, 'rb') as f:
         assert {'data': 1} == pickle.loads(f.read())
 
+    # unchanged data is not rewritten
+    st = os.stat(filepath)
+    write_cache_file(tempdir, 'foo', {'data': 1})
+    assert os.stat(filepath).st_ino == st.st_ino
+    write_cache_file(tempdir, 'foo', {'data': 2})
+    assert os.stat(filepath).st_ino != st.st_ino
+
 
 @pytest.mark.online
 def test_update_sources_list():
@@ -249,6 +258,247 @@ def test_update_sources_list():
     assert expected == index, '\n[%s]\nvs\n[%s]' % (expected, index)
 
 
+def test_update_sources_list_jobs(fake_sources_list_d, fake_rosdistro_index, tmpdir):
+    from rosdep2.sources_list import update_sources_list, CACHE_INDEX
+
+    results = []
+    for jobs in [1, 4]:
+        sources_cache_dir = str(tmpdir.join('jobs%d' % jobs))
+        handled = []
+        retval = update_sources_list(sources_list_dir=fake_sources_list_d,
+                                     sources_cache_dir=sources_cache_dir,
+                                     success_handler=handled.append, jobs=jobs)
+        with open(os.path.join(sources_cache_dir, CACHE_INDEX), 'r') as f:
+            index = f.read()
+        results.append(([s.url for s in handled], [s.url for s, _ in retval], index))
+    assert results[0] == results[1]
+    assert results[0][0][0].endswith('base.yaml')
+    assert results[0][0][1].endswith('python.yaml')
+
+    with pytest.raises(ValueError):
+        update_sources_list(sources_list_dir=fake_sources_list_d,
+                            sources_cache_dir=str(tmpdir.join('jobs0')), jobs=0)
+
+
+def test_update_sources_list_not_modified(fake_rosdistro_server, fake_rosdistro_index, tmpdir):
+    from rosdep2.sources_list import update_sources_list, read_cache_validators, PICKLE_CACHE_EXT
+    sources_list_dir = str(tmpdir.join('sources.list.d'))
+    os.makedirs(sources_list_dir)
+    base_url = fake_rosdistro_server.url + '/rosdep/base.yaml'
+    with open(os.path.join(sources_list_dir, '20-default.list'), 'w') as f:
+        f.write('yaml %s\n' % base_url)
+    sources_cache_dir = str(tmpdir.join('sources.cache'))
+
+    handled = []
+    retval = update_sources_list(sources_list_dir=sources_list_dir, sources_cache_dir=sources_cache_dir,
+                                 success_handler=handled.append)
+    cache_path = retval[0][1] + PICKLE_CACHE_EXT
+    validators = read_cache_validators(sources_cache_dir, base_url)
+    assert validators and 'ETag' in validators
+    with open(cache_path, 'rb') as f:
+        data = f.read()
+    mtime = os.stat(cache_path).st_mtime_ns
+
+    # second update is revalidated and leaves the cached data alone
+    retval2 = update_sources_list(sources_list_dir=sources_list_dir, sources_cache_dir=sources_cache_dir,
+                                  success_handler=handled.append)
+    assert retval2[0][1] == retval[0][1]
+    assert [s.url for s in handled] == [base_url, base_url]
+    assert os.stat(cache_path).st_mtime_ns == mtime
+    with open(cache_path, 'rb') as f:
+        assert f.read() == data
+    assert fake_rosdistro_server.requests == ['/rosdep/base.yaml', '/rosdep/base.yaml']
+
+    # without cached data, validators are not sent
+    os.remove(cache_path)
+    assert read_cache_validators(sources_cache_dir, base_url) is None
+    update_sources_list(sources_list_dir=sources_list_dir, sources_cache_dir=sources_cache_dir)
+    assert os.path.exists(cache_path)
+
+
+def test_update_sources_list_unchanged(fake_rosdistro_index, tmpdir):
+    import shutil
+    from rosdep2.gbpdistro_support import RosDistroRosdepData
+    from rosdep2.key_index import KeyIndex
+    from rosdep2.sources_list import update_sources_list, load_cached_sources_list, \
+        KEY_INDEX_CACHE_EXT, PICKLE_CACHE_EXT
+    fake_rosdep_dir = os.path.join(os.path.dirname(__file__), 'fake_rosdistro', 'rosdep')
+    base_yaml = str(tmpdir.join('base.yaml'))
+    shutil.copy(os.path.join(fake_rosdep_dir, 'base.yaml'), base_yaml)
+    sources_list_dir = str(tmpdir.join('sources.list.d'))
+    os.makedirs(sources_list_dir)
+    with open(os.path.join(sources_list_dir, '20-default.list'), 'w') as f:
+        f.write('yaml file://%s\n' % base_yaml)
+        f.write('yaml file://%s python\n' % os.path.join(fake_rosdep_dir, 'python.yaml'))
+    sources_cache_dir = str(tmpdir.join('sources.cache'))
+
+    def get_stats():
+        stats = {}
+        for filename in os.listdir(sources_cache_dir):
+            st = os.stat(os.path.join(sources_cache_dir, filename))
+            stats[filename] = (st.st_ino, st.st_mtime_ns)
+        return stats
+
+    retval = update_sources_list(sources_list_dir=sources_list_dir, sources_cache_dir=sources_cache_dir)
+    stats = get_stats()
+    assert 'index' in stats
+
+    # nothing is rewritten if the data did not change
+    update_sources_list(sources_list_dir=sources_list_dir, sources_cache_dir=sources_cache_dir)
+    assert get_stats() == stats
+
+    # only the cache files of the changed source are rewritten
+    with open(base_yaml, 'a') as f:
+        f.write('\nnew-key:\n  ubuntu: [new-package]\n')
+    update_sources_list(sources_list_dir=sources_list_dir, sources_cache_dir=sources_cache_dir)
+    new_stats = get_stats()
+    base_filename = os.path.basename(retval[0][1])
+    changed = {base_filename + PICKLE_CACHE_EXT, base_filename + KEY_INDEX_CACHE_EXT}
+    assert {k for k in stats if stats[k] != new_stats[k]} == changed
+    # and the key index is still used
+    sources = load_cached_sources_list(sources_cache_dir=sources_cache_dir)
+    assert [type(x.rosdep_data) for x in sources] == [KeyIndex, KeyIndex, RosDistroRosdepData]
+    assert sources[0].rosdep_data['new-key'] == {'ubuntu': ['new-package']}
+
+
+def test_update_sources_list_skip_unmatched_distros(fake_sources_list_d, fake_rosdistro_index, tmpdir):
+    from rosdep2.sources_list import update_sources_list, get_skipped_distros, load_cached_sources_list, \
+        DataSourceMatcher, PICKLE_CACHE_EXT
+    sources_cache_dir = str(tmpdir.join('sources.cache'))
+    noetic_matcher = DataSourceMatcher(['noetic', 'ubuntu', 'focal'])
+    melodic_matcher = DataSourceMatcher(['melodic', 'ubuntu', 'bionic'])
+
+    with patch('rosdep2.sources_list.get_gbprepo_as_rosdep_data') as get_gbprepo_as_rosdep_data:
+        retval = update_sources_list(sources_list_dir=fake_sources_list_d, sources_cache_dir=sources_cache_dir,
+                                     matcher=noetic_matcher)
+    assert not get_gbprepo_as_rosdep_data.called
+    assert [source.url for source, _ in retval] == [source.url for source in load_cached_sources_list(sources_cache_dir)[:2]]
+    assert get_skipped_distros(sources_cache_dir) == ['melodic']
+    # the skipped distro is still listed in the index
+    assert [source.tags for source in load_cached_sources_list(sources_cache_dir)][-1] == ['melodic']
+    assert get_skipped_distros(str(tmpdir.join('missing'))) == []
+
+    retval = update_sources_list(sources_list_dir=fake_sources_list_d, sources_cache_dir=sources_cache_dir,
+                                 matcher=melodic_matcher)
+    assert len(retval) == 3
+    melodic_cache = retval[-1][1] + PICKLE_CACHE_EXT
+    assert os.path.exists(melodic_cache)
+    assert get_skipped_distros(sources_cache_dir) == []
+
+    # data of an earlier update is kept for skipped distros
+    update_sources_list(sources_list_dir=fake_sources_list_d, sources_cache_dir=sources_cache_dir,
+                        matcher=noetic_matcher)
+    assert get_skipped_distros(sources_cache_dir) == ['melodic']
+    assert 'ros' in load_cached_sources_list(sources_cache_dir)[-1].rosdep_data
+
+    # a full update fills in the skipped distros
+    retval = update_sources_list(sources_list_dir=fake_sources_list_d, sources_cache_dir=sources_cache_dir)
+    assert len(retval) == 3
+    assert get_skipped_distros(sources_cache_dir) == []
+
+
+def test_get_cache_digest(fake_rosdistro_index, tmpdir):
+    from rosdep2.sources_list import update_sources_list, get_cache_digest, PICKLE_CACHE_EXT
+    fake_rosdep_dir = os.path.join(os.path.dirname(__file__), 'fake_rosdistro', 'rosdep')
+    sources_list_dir = str(tmpdir.join('sources.list.d'))
+    os.makedirs(sources_list_dir)
+    with open(os.path.join(sources_list_dir, '20-default.list'), 'w') as f:
+        f.write('yaml file://%s\n' % os.path.join(fake_rosdep_dir, 'base.yaml'))
+    sources_cache_dir = str(tmpdir.join('sources.cache'))
+    retval = update_sources_list(sources_list_dir=sources_list_dir, sources_cache_dir=sources_cache_dir)
+    urls = [retval[0][0].url]
+
+    digest = get_cache_digest(sources_cache_dir, urls)
+    assert digest == get_cache_digest(sources_cache_dir, urls)
+    assert digest != get_cache_digest(sources_cache_dir, [])
+
+    # rewriting a cache file changes the digest
+    cache_file = retval[0][1] + PICKLE_CACHE_EXT
+    st = os.stat(cache_file)
+    os.utime(cache_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    assert digest != get_cache_digest(sources_cache_dir, urls)
+
+
+def test_cache_snapshot(fake_rosdistro_index, tmpdir):
+    from rosdep2.key_index import KeyIndex
+    from rosdep2.sources_list import update_sources_list, load_cached_sources_list, \
+        load_cache_snapshot, write_cache_snapshot, CachedDataSource, DataSourceMatcher, \
+        SourcesListLoader, CACHE_SNAPSHOT, PICKLE_CACHE_EXT
+    fake_rosdep_dir = os.path.join(os.path.dirname(__file__), 'fake_rosdistro', 'rosdep')
+    sources_list_dir = str(tmpdir.join('sources.list.d'))
+    os.makedirs(sources_list_dir)
+    with open(os.path.join(sources_list_dir, '20-default.list'), 'w') as f:
+        f.write('yaml file://%s\n' % os.path.join(fake_rosdep_dir, 'base.yaml'))
+        f.write('yaml file://%s python\n' % os.path.join(fake_rosdep_dir, 'python.yaml'))
+    sources_cache_dir = str(tmpdir.join('sources.cache'))
+
+    matcher = DataSourceMatcher(['ubuntu', 'bionic'])
+    retval = update_sources_list(sources_list_dir=sources_list_dir, sources_cache_dir=sources_cache_dir,
+                                 snapshot_matcher=matcher)
+    assert os.path.exists(os.path.join(sources_cache_dir, CACHE_SNAPSHOT))
+    expected = [x for x in load_cached_sources_list(sources_cache_dir=sources_cache_dir) if matcher.matches(x)]
+    assert [x.url for x in expected] == [retval[0][0].url]
+
+    snapshot = load_cache_snapshot(matcher, sources_cache_dir=sources_cache_dir)
+    assert snapshot == expected
+    # the snapshot refers to the key index of each source instead of copying its data
+    assert all(isinstance(x.rosdep_data, KeyIndex) for x in snapshot)
+    assert all(isinstance(x, CachedDataSource) for x in snapshot)
+    assert [x.origin for x in snapshot] == [x.origin for x in expected]
+    with patch('rosdep2.sources_list.load_cached_sources_list', side_effect=AssertionError):
+        loader = SourcesListLoader.create_default(matcher, sources_cache_dir=sources_cache_dir)
+    assert loader.sources == expected
+
+    # snapshot is only used for the tags it was compiled for
+    matcher2 = DataSourceMatcher(['ubuntu', 'bionic', 'python'])
+    assert load_cache_snapshot(matcher2, sources_cache_dir=sources_cache_dir) is None
+    loader2 = SourcesListLoader.create_default(matcher2, sources_cache_dir=sources_cache_dir)
+    assert [x.url for x in loader2.sources] == [retval[0][0].url, retval[1][0].url]
+    assert load_cache_snapshot(DataSourceMatcher(['bionic', 'ubuntu']), sources_cache_dir=sources_cache_dir) == expected
+
+    # rewriting a cache file makes the snapshot stale
+    cache_file = retval[0][1] + PICKLE_CACHE_EXT
+    with open(cache_file, 'ab') as f:
+        f.write(b'\n')
+    assert load_cache_snapshot(matcher, sources_cache_dir=sources_cache_dir) is None
+    write_cache_snapshot(matcher, sources_cache_dir=sources_cache_dir)
+    assert load_cache_snapshot(matcher, sources_cache_dir=sources_cache_dir) == expected
+
+    # corrupt snapshots are ignored
+    with open(os.path.join(sources_cache_dir, CACHE_SNAPSHOT), 'wb') as f:
+        f.write(b'garbage')
+    assert load_cache_snapshot(matcher, sources_cache_dir=sources_cache_dir) is None
+    assert SourcesListLoader.create_default(matcher, sources_cache_dir=sources_cache_dir).sources == expected
+
+
+def test_cache_key_index(fake_sources_list_d, fake_rosdistro_index, tmpdir):
+    from rosdep2.gbpdistro_support import RosDistroRosdepData
+    from rosdep2.key_index import KeyIndex
+    from rosdep2.sources_list import update_sources_list, load_cached_sources_list, \
+        KEY_INDEX_CACHE_EXT, PICKLE_CACHE_EXT, TYPE_YAML, SourcesListLoader
+    sources_cache_dir = str(tmpdir.join('sources.cache'))
+    retval = update_sources_list(sources_list_dir=fake_sources_list_d, sources_cache_dir=sources_cache_dir)
+    for source, cache_filepath in retval:
+        # the compact rosdistro data is not indexed
+        assert os.path.exists(cache_filepath + KEY_INDEX_CACHE_EXT) == (source.type == TYPE_YAML)
+
+    sources = load_cached_sources_list(sources_cache_dir=sources_cache_dir)
+    assert [type(x.rosdep_data) for x in sources] == [KeyIndex, KeyIndex, RosDistroRosdepData]
+    with open(retval[0][1] + PICKLE_CACHE_EXT, 'rb') as f:
+        assert sources[0].rosdep_data == yaml.safe_load(yaml.dump(pickle.load(f)))
+
+    # key index is ignored once the pickled data is newer
+    st = os.stat(retval[0][1] + KEY_INDEX_CACHE_EXT)
+    os.utime(retval[0][1] + KEY_INDEX_CACHE_EXT, ns=(st.st_atime_ns, st.st_mtime_ns - 10 ** 9))
+    sources2 = load_cached_sources_list(sources_cache_dir=sources_cache_dir)
+    assert isinstance(sources2[0].rosdep_data, dict)
+    assert sources2 == sources
+
+    # the loader releases the key indexes of its sources
+    SourcesListLoader(sources).close()
+    assert sources[0].rosdep_data.closed and sources[1].rosdep_data.closed
+
+
 @pytest.mark.online
 def test_load_cached_sources_list():
     from rosdep2.sources_list import load_cached_sources_list, update_sources_list
@@ -0,0 +1,70 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import binascii
+import os
+import tracemalloc
+
+import pytest
+
+
+def _get_large_rosdep_yaml(num_keys):
+    # random package names so that gzip cannot shrink the data much
+    return ''.join(
+        'key%d:\n  ubuntu: [%s]\n' % (i, binascii.hexlify(os.urandom(16)).decode())
+        for i in range(num_keys)).encode()
+
+
+def test_urlopen_gzip_streams(fake_rosdistro_server):
+    from rosdep2.url_utils import urlopen_gzip
+    body = _get_large_rosdep_yaml(50000)
+    fake_rosdistro_server.add_file('/large.yaml', body)
+    _, gzip_body, etag = fake_rosdistro_server.files['/large.yaml']
+
+    tracemalloc.start()
+    try:
+        f = urlopen_gzip(fake_rosdistro_server.url + '/large.yaml')
+        size = 0
+        for chunk in iter(lambda: f.read(65536), b''):
+            size += len(chunk)
+        f.close()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert size == len(body)
+    assert f.validators == {'ETag': etag}
+    # neither the compressed nor the decompressed data is held in memory
+    assert peak < len(gzip_body) / 4, (peak, len(gzip_body))
+
+
+def test_urlopen_gzip_not_modified(fake_rosdistro_server):
+    from rosdep2.url_utils import urlopen_gzip, NotModified
+    url = fake_rosdistro_server.url + '/rosdep/base.yaml'
+    f = urlopen_gzip(url)
+    data = f.read()
+    f.close()
+    assert data
+    with pytest.raises(NotModified):
+        urlopen_gzip(url, validators=f.validators)
+    f = urlopen_gzip(url, validators={'ETag': '"outdated"'})
+    assert f.read() == data
+    f.close()
+
+
+def test_download_rosdep_data_gzip(fake_rosdistro_server):
+    from rosdep2.sources_list import download_rosdep_data
+    fake_rosdistro_server.add_file('/large.yaml', _get_large_rosdep_yaml(1000))
+    data = download_rosdep_data(fake_rosdistro_server.url + '/large.yaml')
+    assert len(data) == 1000
+    assert len(data['key999']['ubuntu'][0]) == 32
@@ -0,0 +1,85 @@
+# Copyright 2026 Open Source Robotics Foundation, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import importlib
+import os
+import timeit
+
+import pytest
+import yaml
+
+
+def get_yaml_fixtures(valid_only=False):
+    test_dir = os.path.dirname(os.path.abspath(__file__))
+    fixtures = []
+    for dirpath, dirnames, filenames in os.walk(test_dir):
+        for filename in filenames:
+            if filename.endswith(('.yaml', '.rdmanifest')):
+                with open(os.path.join(dirpath, filename), 'rb') as f:
+                    contents = f.read()
+                if valid_only:
+                    try:
+                        yaml.safe_load(contents)
+                    except yaml.YAMLError:
+                        continue
+                fixtures.append(contents)
+    assert fixtures
+    return fixtures
+
+
+def test_safe_load():
+    from rosdep2 import yaml_utils
+    for contents in get_yaml_fixtures():
+        try:
+            expected = yaml.safe_load(contents)
+        except yaml.YAMLError:
+            # some fixtures are intentionally invalid
+            with pytest.raises(yaml.YAMLError):
+                yaml_utils.safe_load(contents)
+            continue
+        assert yaml_utils.safe_load(contents) == expected
+    with pytest.raises(yaml.YAMLError):
+        yaml_utils.safe_load('foo: [bar')
+    # arbitrary Python objects must not be constructed
+    with pytest.raises(yaml.YAMLError):
+        yaml_utils.safe_load('!!python/object/apply:os.getcwd []')
+
+
+def test_safe_load_without_libyaml(monkeypatch):
+    from rosdep2 import yaml_utils
+    monkeypatch.delattr(yaml, 'CSafeLoader', raising=False)
+    try:
+        importlib.reload(yaml_utils)
+        assert yaml_utils.SafeLoader is yaml.SafeLoader
+        assert yaml_utils.safe_load('foo: [bar]') == {'foo': ['bar']}
+    finally:
+        monkeypatch.undo()
+        importlib.reload(yaml_utils)
+
+
+@pytest.mark.benchmark
+def test_benchmark_safe_load():
+    if not yaml.__with_libyaml__:
+        pytest.skip('PyYAML is built without libyaml')
+    fixtures = get_yaml_fixtures(valid_only=True)
+
+    def load_all(loader):
+        for contents in fixtures:
+            yaml.load(contents, Loader=loader)
+
+    python_time = min(timeit.repeat(lambda: load_all(yaml.SafeLoader), number=10, repeat=3))
+    libyaml_time = min(timeit.repeat(lambda: load_all(yaml.CSafeLoader), number=10, repeat=3))
+    print('SafeLoader: %.4fs, CSafeLoader: %.4fs (%.1fx)' % (
+        python_time, libyaml_time, python_time / libyaml_time))
+    assert libyaml_time < python_time